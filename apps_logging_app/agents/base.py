@@ -1,6 +1,7 @@
 from abc import ABC, abstractmethod
 import time
-from typing import List, Dict, Any, Tuple
+from typing import Callable, List, Dict, Any, Tuple
+import uuid
 
 from pathlib import Path
 import logging
@@ -8,11 +9,13 @@ from concurrent.futures import Future
 from threading import Thread, Event
 
 from .data import WorkingDataConnection, WorkingDataStatus
+from .scheduler import QueryScheduler
+from .snapshot import WorkingStateSnapshot
 from ..utils import get_file_id
 from .model import BaseAgentConfig, PathFileConfig, ProducerConnectionConfig, DataConnectionConfig
 from datetime import datetime, timedelta
 from ..producers.data import Message
-from ..databases.data import Query
+from ..databases.data import Query, QueryPriority
 
 class BaseAgent(ABC):
     """
@@ -35,7 +38,9 @@ class BaseAgent(ABC):
             Maps log file names to associated data connections.
         _stop_event (Event): Event used to stop the worker thread.
         _thread (Thread): Background worker thread.
-        next_execute_query_time (datetime): Next scheduled time to execute database queries.
+        _scheduler (QueryScheduler): Per-connection schedule of database queries.
+        _snapshot (Optional[WorkingStateSnapshot]): Persistent snapshot of the working state, if configured.
+        next_snapshot_time (datetime): Next scheduled time to save the working state snapshot.
 
     Example:
         >>> from .config import BaseAgentConfig
@@ -60,6 +65,10 @@ class BaseAgent(ABC):
             config (BaseAgentConfig): Configuration object containing agent 
                 parameters, producer connections, path files, and intervals.
 
+        Raises:
+            ValueError: If a query refers to a reference table its database does not declare
+                (see `_validate_reference_tables`).
+
         Attributes Initialized:
             config (BaseAgentConfig): The agent configuration.
             logger (logging.Logger): Logger for this agent instance.
@@ -69,8 +78,11 @@ class BaseAgent(ABC):
                 Mapping from log file names to associated producer and data connections.
             _stop_event (Event): Event used to signal stopping the background thread.
             _thread (Thread): Background worker thread initialized but not started.
-            next_execute_query_time (datetime): Timestamp for the next scheduled 
-                database query execution.
+            _scheduler (QueryScheduler): Schedule of the database queries, holding every
+                working data connection with a database destination.
+            _snapshot (Optional[WorkingStateSnapshot]): Snapshot store, opened and
+                restored when `config.snapshot` is set.
+            next_snapshot_time (datetime): Timestamp for the next scheduled snapshot.
 
         Example:
             >>> from .config import BaseAgentConfig
@@ -80,13 +92,20 @@ class BaseAgent(ABC):
         """
         self.config: BaseAgentConfig = config
         self.logger = logging.getLogger("__main__." +__name__)
+        self._validate_reference_tables()
         self.working_data_connections: List[WorkingDataConnection] = []
         self._initialize_working_data_connections()
         self.path_file_to_data_connections: Dict[str, List[Tuple[ProducerConnectionConfig, DataConnectionConfig]]] = {}
         self._initialize_path_file_to_data_connections_map()
         self._stop_event = Event()
         self._thread = Thread(target=self._worker, daemon=True)
-        self.next_execute_query_time = datetime.now()
+        self._scheduler = QueryScheduler(self.config.execute_query_interval)
+        self._snapshot: WorkingStateSnapshot | None = None
+        self.next_snapshot_time = datetime.now()
+        if self.config.snapshot:
+            self._snapshot = WorkingStateSnapshot(self.config.snapshot.path, f"{self.config.type}-{self.config.name}")
+            self._restore_snapshot()
+        self._schedule_initial_queries()
         self.logger.info(f"Initialized agent: {self.config.type}-{self.config.name}")
 
 
@@ -117,7 +136,8 @@ class BaseAgent(ABC):
         then waits for the thread to finish its current processing loop and exit.
 
         After calling `stop()`, the agent will no longer read log files, process data 
-        connections, or send messages to producers.
+        connections, or send messages to producers. If a snapshot is configured, 
+        a last snapshot of the working state is saved and the store is closed.
 
         Example:
             >>> agent = BaseAgentSubclass(config)  # subclass must implement abstract methods
@@ -127,9 +147,37 @@ class BaseAgent(ABC):
         """
         self._stop_event.set()
         self._thread.join()
+        if self._snapshot:
+            self._save_snapshot()
+            self._snapshot.close()
 
     # INTERNALS
 
+    def _validate_reference_tables(self) -> None:
+        """
+        Checks that every reference table used by a query is declared by its database.
+
+        `BaseDatabase.lookup` only knows the tables of `config.reference_tables`;
+        an unknown name is reported once here, when the agent is created,
+        instead of failing the query of the data connection at every refresh.
+
+        Raises:
+            ValueError: If a `QueryConfig.reference_table` is not declared by the database of the query.
+        """
+        from ..databases.factory import DatabaseFactory
+
+        for producer_connection in self.config.producer_connections:
+            for data_connection in producer_connection.data_connections:
+                query_config = data_connection.destination_ref
+                if query_config is None or not query_config.reference_table:
+                    continue
+                database_instance = DatabaseFactory.get_instance(query_config.type, query_config.name)
+                if query_config.reference_table not in database_instance.reference_tables:
+                    raise ValueError(
+                        f"Unknown reference table {query_config.reference_table} for database "
+                        f"{query_config.type}-{query_config.name} in data connection {data_connection.name}"
+                    )
+
     def _initialize_working_data_connections(self) -> None:
         """
         Initializes working data connections from the agent's configuration.
@@ -150,7 +198,7 @@ class BaseAgent(ABC):
         """
         for producer_connection in self.config.producer_connections:
             for data_connection in producer_connection.data_connections:
-                working_data_connection = WorkingDataConnection.from_config(producer_connection.type, producer_connection.name, producer_connection.topic, data_connection)
+                working_data_connection = WorkingDataConnection.from_config(producer_connection.type, producer_connection.name, producer_connection.topic, data_connection, producer_connection.key_template)
                 working_data_connection.set_ready_status()
                 self.working_data_connections.append(working_data_connection)
 
@@ -200,8 +248,84 @@ class BaseAgent(ABC):
 
         while not self._stop_event.is_set():
             self._run_once()
+            if self._snapshot and self.next_snapshot_time <= datetime.now():
+                self._save_snapshot()
+                self.next_snapshot_time = datetime.now() + timedelta(seconds=self.config.snapshot.interval)
             time.sleep(self.config.fetch_logs_interval)
 
+    def _restore_snapshot(self) -> None:
+        """
+        Restores the working state saved by a previous run of the agent.
+
+        Live working data connections are appended to `working_data_connections`,
+        with their query configuration and key template taken from the current agent configuration,
+        and path file cursors and file ids are restored, so that reading resumes
+        where the previous run stopped. Entries that expired while the agent was
+        down are discarded.
+
+        Example:
+            >>> agent._restore_snapshot()
+        """
+        working_data_connections, path_file_positions = self._snapshot.load()
+        query_configs = {
+            (producer.type, producer.name, dc.name): (dc.destination_ref, dc.key_template or producer.key_template)
+            for producer in self.config.producer_connections
+            for dc in producer.data_connections
+        }
+
+        restored = 0
+        for working_data_connection in working_data_connections:
+            working_data_connection.query_config, working_data_connection.key_template = query_configs.get(
+                (working_data_connection.producer_type, working_data_connection.producer_name, working_data_connection.name),
+                (None, None)
+            )
+            working_data_connection.check_expired_time()
+            if working_data_connection.status != WorkingDataStatus.EXPIRED:
+                self.working_data_connections.append(working_data_connection)
+                restored += 1
+
+        for path_file in self.config.path_files or []:
+            if path_file.name in path_file_positions:
+                path_file.cursor, path_file.id = path_file_positions[path_file.name]
+
+        self.logger.info(f"Agent: {self.config.type}-{self.config.name}: Restored {restored} working data connections from snapshot")
+
+    def _schedule_initial_queries(self) -> None:
+        """
+        Schedules the first query of the working data connections present at startup.
+
+        Connections created from the configuration start within their jitter
+        window. Connections restored from a snapshot are spread over a whole
+        refresh interval, so that a restart with many live entries does not
+        send all their queries to the database at once.
+        """
+        for working_data_connection in self.working_data_connections:
+            if not working_data_connection.database_name:
+                continue
+            if working_data_connection.data_dict_match is None:
+                self._scheduler.schedule_new(working_data_connection)
+            else:
+                self._scheduler.schedule_new(working_data_connection, spread=self._scheduler.interval(working_data_connection))
+
+    def _save_snapshot(self) -> None:
+        """
+        Saves the changes of the working state to the snapshot store.
+
+        Only working data connections created by a regex match are persisted:
+        the ones built from configuration are recreated at every startup.
+        Errors are logged and do not interrupt the agent.
+
+        Example:
+            >>> agent._save_snapshot()
+        """
+        try:
+            self._snapshot.save(
+                [wdc for wdc in self.working_data_connections if wdc.data_dict_match is not None and wdc.status != WorkingDataStatus.EXPIRED],
+                self.config.path_files or []
+            )
+        except Exception as e:
+            self.logger.error(f"Agent: {self.config.type}-{self.config.name}: Error saving snapshot: {e}")
+
     def _run_once(self) -> None:
         """
         Performs a single iteration of log file processing.
@@ -336,8 +460,9 @@ class BaseAgent(ABC):
         This method performs the full workflow for a batch of log lines:
         1. Matches lines to data connections using `_data_connections_match_regex`.
         2. Transforms and filters matched data via `_data_connections_transformation_and_filtering`.
-        3. Updates the working data connection status and stores results.
-        4. Executes database queries if the scheduled time is reached.
+        3. Updates the working data connection status and stores results whose
+           content digest changed.
+        4. Schedules the queries of the new connections and executes the queries that are due.
         5. Sends messages to producers for updated data connections.
         6. Cleans expired working data connections from the internal list.
 
@@ -355,15 +480,13 @@ class BaseAgent(ABC):
             if wdc.query:
                 wdc.data_dict_query_source = self._create_query_source(wdc)
                 wdc.set_ready_status()
+                if wdc.database_name:
+                    self._scheduler.schedule_new(wdc)
 
-        if self.next_execute_query_time <= datetime.now():
-            self._data_connections_execute_queries()
-            self.next_execute_query_time = datetime.now() + timedelta(seconds=self.config.execute_query_interval)
+        self._data_connections_execute_queries()
 
         for wdc in working_data_connections:
-            dict_result_tmp = self._create_dict_result(wdc)
-            if dict_result_tmp != wdc.data_dict_result:
-                wdc.data_dict_result = dict_result_tmp
+            if wdc.update_dict_result(self._create_dict_result(wdc)):
                 wdc.status = WorkingDataStatus.UPDATED
             else:
                 wdc.set_ready_status()
@@ -408,7 +531,8 @@ class BaseAgent(ABC):
                         producer_connection.type, 
                         producer_connection.name,
                         producer_connection.topic, 
-                        data_connection
+                        data_connection,
+                        producer_connection.key_template
                     )
                     wdc.data_dict_match = match.groupdict()
                     working_data_connections.append(wdc)
@@ -462,12 +586,19 @@ class BaseAgent(ABC):
 
     def _data_connections_execute_queries(self) -> None:
         """
-        Executes database queries for ready working data connections.
+        Executes the database queries that are due.
 
-        Iterates over all `working_data_connections` and, for each connection that 
-        has a `database_name` and a status of `READY`, it:
+        Pops the working data connections whose next query time is reached from
+        the scheduler and, for each connection that has a `database_name` and
+        a status of `READY`, it:
         1. Retrieves a database instance using `DatabaseFactory`.
-        2. Creates a `Query` object using the connection's query and source data.
+        2. If the query is served by a loaded reference table of the database
+            (`query_config.reference_table`), looks the source data up in memory
+            and completes the connection at once, without issuing a query.
+            Otherwise, creates a `Query` object using the connection's query and source data,
+            in the high-priority lane for error data connections. Incremental queries
+            also receive the last watermark of the connection, and streamed queries a
+            chunk callback sending each chunk to the producer (see `_create_stream_sender`).
         3. Enqueues the query asynchronously and sets a callback `_on_done` 
             to handle the result.
         4. Updates the connection status to indicate that the query is running.
@@ -475,6 +606,12 @@ class BaseAgent(ABC):
         If an exception occurs during query execution, the connection is reset 
         to `READY` and an error is logged.
 
+        The query is kept as the `running_query` of the connection until it
+        completes, so that it is cancelled if the connection expires meanwhile.
+
+        Every due connection that is not expired is then rescheduled one refresh
+        interval later, whether its query was dispatched or is still running.
+
         Notes:
             - Queries are executed asynchronously using futures.
             - `_on_done` updates the working data connection with query results.
@@ -485,8 +622,9 @@ class BaseAgent(ABC):
         """
         from ..databases.factory import DatabaseFactory
 
-        for working_data_connection in self.working_data_connections:
-            if working_data_connection.database_name and working_data_connection.status == WorkingDataStatus.READY:                
+        for working_data_connection in self._scheduler.pop_due():
+            self._scheduler.reschedule(working_data_connection)
+            if working_data_connection.database_name and working_data_connection.status == WorkingDataStatus.READY:
                 database_instance = DatabaseFactory.get_instance(
                     working_data_connection.database_type,
                     working_data_connection.database_name
@@ -495,16 +633,86 @@ class BaseAgent(ABC):
                 def _on_done(future: Future[List[Dict[str, Any]]], wdc: WorkingDataConnection = working_data_connection) -> None:
                     wdc.on_query_done(future)
 
+                priority = QueryPriority.HIGH if working_data_connection.is_error else QueryPriority.NORMAL
                 try:
-                    query: Query = Query(working_data_connection.query, working_data_connection.data_dict_query_source)
+                    reference_table = working_data_connection.query_config.reference_table if working_data_connection.query_config else None
+                    if reference_table:
+                        rows = database_instance.lookup(reference_table, working_data_connection.data_dict_query_source)
+                        if rows is not None:
+                            future = Future()
+                            future.set_result(rows)
+                            working_data_connection.set_query_running_status()
+                            _on_done(future)
+                            continue
+                    if working_data_connection.query_config:
+                        params = working_data_connection.data_dict_query_source
+                        incremental = working_data_connection.query_config.incremental
+                        if incremental:
+                            params = {**(params or {}), incremental.watermark_param: working_data_connection.watermark}
+                        on_chunk = self._create_stream_sender(working_data_connection) if working_data_connection.query_config.stream_chunk_rows else None
+                        query: Query = Query.from_config(working_data_connection.query_config, params, name=working_data_connection.name, priority=priority, on_chunk=on_chunk)
+                    else:
+                        query: Query = Query(working_data_connection.query, working_data_connection.data_dict_query_source, name=working_data_connection.name, priority=priority)
+                    working_data_connection.running_query = query
                     future = database_instance.enqueue_query(query)
-                    future.add_done_callback(_on_done)
+                    # A cached result resolves the future at once, running the callback inline
                     working_data_connection.set_query_running_status()
+                    future.add_done_callback(_on_done)
                 except Exception:
+                    working_data_connection.running_query = None
                     working_data_connection.set_ready_status()
                     self.logger.error(f"Agent: {self.config.type}-{self.config.name}: Error executing query: {working_data_connection.query}")
 
 
+    def _create_stream_sender(self, wdc: WorkingDataConnection) -> Callable[[List[Dict[str, Any]], int, bool], None]:
+        """
+        Creates the chunk callback of a streamed query.
+
+        Each chunk of the result is sent to the producer of the data connection
+        as soon as it is fetched, as a message whose payload is:
+
+            {"stream_id": ..., "sequence": 0, "last": False, "rows": [...]}
+
+        `stream_id` identifies one execution of the query and `sequence` numbers
+        its chunks from 0; the chunk flagged `last` completes the stream. A
+        retried query restarts at sequence 0 with a new `stream_id`, so that
+        consumers can discard the chunks of an incomplete stream. The message key
+        is rendered from the first chunk, or is the `stream_id` when the data
+        connection has no ``key_template`` (or its fields are missing), and is
+        used for every chunk of the stream, so that all of them go to the same
+        producer worker and Kafka partition and stay in order.
+
+        The callback runs on the database worker (or on the event loop of an
+        asyncio database), not on the agent thread, so chunks are enqueued
+        without waiting for space: with the ``block`` policy, a chunk finding
+        the producer queue full is handled as with ``drop_newest``.
+
+        Args:
+            wdc (WorkingDataConnection): The working data connection of the query.
+
+        Returns:
+            Callable[[List[Dict[str, Any]], int, bool], None]: The callback to set as `Query.on_chunk`.
+        """
+        from ..producers.factory import ProducerFactory
+
+        producer_instance = ProducerFactory.get_instance(wdc.producer_type, wdc.producer_name)
+        stream_id = None
+        key = None
+
+        def _send_chunk(rows: List[Dict[str, Any]], sequence: int, last: bool) -> None:
+            nonlocal stream_id, key
+            if sequence == 0:
+                stream_id = str(uuid.uuid4())
+                key = wdc.message_key(rows) or stream_id
+            payload = {"stream_id": stream_id, "sequence": sequence, "last": last, "rows": rows}
+            producer_instance.enqueue_message(Message(wdc.topic, wdc.is_error, wdc.is_warning, payload,
+                                                     key=key,
+                                                     source=f"{self.config.type}-{self.config.name}/{wdc.name}"),
+                                             block=False)
+            self.logger.debug(f"Agent: {self.config.type}-{self.config.name}: Sent chunk {sequence} of stream {stream_id} for data with name: {wdc.name}")
+
+        return _send_chunk
+
     def _send_messages_to_producers(self) -> None:
         """
         Sends messages to producers based on updated working data connections.
@@ -515,6 +723,7 @@ class BaseAgent(ABC):
         corresponding producer using `ProducerFactory`.
 
         After sending the message, the working data connection:
+            - Records the sent result with `mark_sent()`, so it is not sent again after a restart.
             - Checks if it has expired using `check_expired_time()`.
             - Resets its status to `READY`.
 
@@ -539,11 +748,17 @@ class BaseAgent(ABC):
             try:
                 if working_data_connection.data_dict_result and working_data_connection.status == WorkingDataStatus.UPDATED:
                     self.logger.info(f"Agent: {self.config.type}-{self.config.name}: Sending message to producer: data with name: {working_data_connection.name} with status {working_data_connection.status}")
-                    message = Message(working_data_connection.topic, working_data_connection.is_error, working_data_connection.is_warning, working_data_connection.data_dict_result)
+                    message = Message(working_data_connection.topic, working_data_connection.is_error, working_data_connection.is_warning, working_data_connection.data_dict_result,
+                                      key=working_data_connection.message_key(),
+                                      source=f"{self.config.type}-{self.config.name}/{working_data_connection.name}")
                     producer_instance.enqueue_message(message)
+                    working_data_connection.mark_sent()
                 elif working_data_connection.list_data_dict_query_result and working_data_connection.status == WorkingDataStatus.UPDATED:
-                    message = Message(working_data_connection.topic, working_data_connection.is_error, working_data_connection.is_warning, working_data_connection.list_data_dict_query_result)
+                    message = Message(working_data_connection.topic, working_data_connection.is_error, working_data_connection.is_warning, working_data_connection.list_data_dict_query_result,
+                                      key=working_data_connection.message_key(),
+                                      source=f"{self.config.type}-{self.config.name}/{working_data_connection.name}")
                     producer_instance.enqueue_message(message)
+                    working_data_connection.mark_sent()
                 working_data_connection.check_expired_time()
                 working_data_connection.set_ready_status()
             except Exception as e:
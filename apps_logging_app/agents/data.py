@@ -1,8 +1,13 @@
+from collections import ChainMap
 from datetime import datetime, timedelta
 from typing import Dict, Any, Optional, List
+import uuid
 from concurrent.futures import Future
 from enum import Enum
-from .model import DataConnectionConfig
+from .model import DataConnectionConfig, QueryConfig
+from ..utils import compute_digest
+from .incremental import merge_incremental_result
+from ..databases.data import Query, QueryTimeoutError, QueryCancelledError
 
 class WorkingDataStatus(Enum):
     """
@@ -31,6 +36,7 @@ class WorkingDataConnection:
     It tracks the connection's status, handles query results asynchronously, and manages expiration times.
 
     Attributes:
+        id (str): Unique identifier of this working entry, used to persist and restore it.
         name (str): Unique name of the connection.
         producer_type (str): Type of the data producer (e.g., service or system).
         producer_name (str): Name of the data producer.
@@ -38,17 +44,27 @@ class WorkingDataConnection:
         database_type (Optional[str]): Type of the database (if applicable).
         database_name (Optional[str]): Name of the database (if applicable).
         query (Optional[str]): Query string used to fetch data (if applicable).
+        query_config (Optional[QueryConfig]): Full query configuration, carrying per-query execution options (if applicable).
         is_error (bool): Indicates whether the connection has an error.
         is_warning (bool): Indicates whether the connection has a warning.
+        key_template (Optional[str]): Template of the key of the messages of the connection (see `message_key`).
         status (WorkingDataStatus): Current status of the connection.
         expired_time (Optional[datetime]): Timestamp when the connection expires.
         data_dict_match (Optional[Dict[str, Any]]): Optional cached data match.
         data_dict_query_source (Optional[Dict[str, Any]]): Optional source data from the query.
         data_dict_result (Optional[List[Dict[str, Any]]]): Optional result of a query.
+        data_dict_result_digest (Optional[str]): Content digest of `data_dict_result`.
         list_data_dict_query_result (Optional[List[Dict[str, Any]]]): List of query results, updated on query completion.
+        list_data_dict_query_result_digest (Optional[str]): Content digest of `list_data_dict_query_result`.
+        unchanged_results (int): Number of consecutive query results equal to the previous one.
+        next_query_time (Optional[float]): Monotonic time at which the next query is due, set by `QueryScheduler`.
+        watermark (Any): Highest watermark returned by the incremental query of this entry, or None.
+        sent_digest (Optional[str]): Digest of the last result handed to the producer, or None.
+        running_query (Optional[Query]): The query issued for this entry and not yet completed, cancelled
+            when the entry expires.
 
     Methods:
-        from_config(producer_type, producer_name, topic, cfg):
+        from_config(producer_type, producer_name, topic, cfg, key_template=None):
             Creates a WorkingDataConnection from a DataConnectionConfig.
         update_expired_time(minutes):
             Updates the expiration time by adding the specified number of minutes.
@@ -60,6 +76,16 @@ class WorkingDataConnection:
             Handles completion of a query future and updates status and results.
         check_expired_time():
             Checks if the connection has expired and updates status accordingly.
+        update_dict_result(dict_result):
+            Stores a new result dictionary if its digest differs from the current one.
+        mark_sent():
+            Records the result just handed to the producer as sent.
+        message_key(rows=None):
+            Renders the key of the messages of the connection from its working data.
+        to_dict():
+            Serializes the connection and its working data to a dictionary.
+        from_dict(data):
+            Restores a WorkingDataConnection serialized with `to_dict()`.
     
     """
 
@@ -72,7 +98,9 @@ class WorkingDataConnection:
                         query: Optional[str] = None,
                         is_error: bool = False,
                         is_warning: bool = False,
-                        expired_time: datetime = None) -> None:
+                        expired_time: datetime = None,
+                        query_config: Optional[QueryConfig] = None,
+                        key_template: Optional[str] = None) -> None:
         """
         Initializes a WorkingDataConnection instance with metadata and optional working data.
 
@@ -91,6 +119,8 @@ class WorkingDataConnection:
             is_error (bool, optional): Flag indicating whether the connection has an error. Defaults to False.
             is_warning (bool, optional): Flag indicating whether the connection has a warning. Defaults to False.
             expired_time (datetime, optional): Expiration timestamp for the connection. Defaults to None.
+            query_config (Optional[QueryConfig], optional): Full query configuration (if applicable). Defaults to None.
+            key_template (Optional[str], optional): Template of the message key. Defaults to None (no key).
 
         Attributes:
             name (str): Unique name of the connection.
@@ -100,17 +130,26 @@ class WorkingDataConnection:
             database_type (str): Type of the database.
             database_name (str): Name of the database.
             query (str): Query used to fetch data.
+            query_config (Optional[QueryConfig]): Full query configuration.
             is_error (bool): Indicates if the connection has an error.
             is_warning (bool): Indicates if the connection has a warning.
+            key_template (Optional[str]): Template of the message key.
             status (WorkingDataStatus): Current status of the connection, initialized as READY.
             expired_time (Optional[datetime]): Expiration timestamp.
             data_dict_match (Optional[Dict[str, Any]]): Optional cached data match.
             data_dict_query_source (Optional[Dict[str, Any]]): Optional source data from a query.
             data_dict_result (Optional[List[Dict[str, Any]]]): Optional result of a query.
+            data_dict_result_digest (Optional[str]): Content digest of `data_dict_result`.
             list_data_dict_query_result (Optional[List[Dict[str, Any]]]): List of query results.
+            list_data_dict_query_result_digest (Optional[str]): Content digest of `list_data_dict_query_result`.
+            unchanged_results (int): Number of consecutive unchanged query results, initialized to 0.
+            next_query_time (Optional[float]): Monotonic time of the next query, initialized to None.
+            watermark (Any): Watermark of the incremental query, initialized to None.
+            sent_digest (Optional[str]): Digest of the last sent result, initialized to None.
         
         """
         # static
+        self.id: str = uuid.uuid4().hex
         self.name: str = name
         self.producer_type: str = producer_type
         self.producer_name: str = producer_name
@@ -118,8 +157,10 @@ class WorkingDataConnection:
         self.database_type: str  = database_type
         self.database_name: str  = database_name
         self.query: str = query
+        self.query_config: Optional[QueryConfig] = query_config
         self.is_error: bool = is_error
         self.is_warning: bool = is_warning
+        self.key_template: Optional[str] = key_template
 
         # working data
         self.status: WorkingDataStatus = WorkingDataStatus.READY
@@ -127,7 +168,14 @@ class WorkingDataConnection:
         self.data_dict_match: Optional[Dict[str, Any]] = None
         self.data_dict_query_source: Optional[Dict[str, Any]] = None
         self.data_dict_result: Optional[List[Dict[str, Any]]] = None
+        self.data_dict_result_digest: Optional[str] = None
         self.list_data_dict_query_result: Optional[List[Dict[str, Any]]] = None
+        self.list_data_dict_query_result_digest: Optional[str] = None
+        self.unchanged_results: int = 0
+        self.next_query_time: Optional[float] = None
+        self.watermark: Any = None
+        self.sent_digest: Optional[str] = None
+        self.running_query: Optional[Query] = None
     
     def __repr__(self) -> str:
         return (
@@ -147,7 +195,8 @@ class WorkingDataConnection:
         )
 
     @classmethod
-    def from_config(cls, producer_type: str, producer_name: str, topic: str, cfg: DataConnectionConfig) -> "WorkingDataConnection":
+    def from_config(cls, producer_type: str, producer_name: str, topic: str, cfg: DataConnectionConfig,
+                    key_template: Optional[str] = None) -> "WorkingDataConnection":
         """
         Creates a WorkingDataConnection instance from a DataConnectionConfig object.
 
@@ -160,12 +209,14 @@ class WorkingDataConnection:
             producer_name (str): Name of the data producer.
             topic (str): Topic associated with the connection.
             cfg (DataConnectionConfig): Configuration object containing connection details, including name, database reference, query, expiration, and error/warning flags.
+            key_template (Optional[str], optional): Key template of the producer connection, used when
+                `cfg.key_template` is not set. Defaults to None.
 
         Returns:
             WorkingDataConnection: A new instance initialized with values from the configuration.
         
         Notes:
-            - If `cfg.destination_ref` is None, database_type, database_name, and query will be set to None.
+            - If `cfg.destination_ref` is None, database_type, database_name, query and query_config will be set to None.
             - If `cfg.expired_time_int` is provided, the expiration time is set to the current time plus the configured number of minutes.
         
         """
@@ -186,6 +237,8 @@ class WorkingDataConnection:
             is_error=cfg.is_error,
             is_warning=cfg.is_warning,
             expired_time=expired_time,
+            query_config=cfg.destination_ref,
+            key_template=cfg.key_template or key_template,
         )
 
     def update_expired_time(self, minutes: int) -> None:
@@ -240,9 +293,15 @@ class WorkingDataConnection:
         an asynchronous query. It retrieves the query result and updates the
         `list_data_dict_query_result` and `status` accordingly:
 
-            - If the result is new (different from the existing data), the result is stored and the status is set to UPDATED.
-            - If the result is the same as the existing data, the status is set to READY.
-            - If an exception occurs while retrieving the result, the expiration time is immediately updated to the current time (effectively expiring the connection).
+            - If the query is streamed (`query_config.stream_chunk_rows`), its rows were already sent chunk by chunk, so the status is set back to READY.
+            - If the query is incremental (`query_config.incremental`), the new rows are first merged into the previous result and the watermark is advanced (see `merge_incremental_result`).
+            - If the result is new (its digest differs from the digest of the existing data), the result and its digest are stored, the status is set to UPDATED and `unchanged_results` is reset.
+            - If the result is the same as the existing data, or empty, the status is set to READY and `unchanged_results` is incremented.
+            - If the query timed out or was cancelled, the status is set back to READY (unless expired), so the query is issued again at the next refresh.
+            - If another exception occurs while retrieving the result, the expiration time is immediately updated to the current time (effectively expiring the connection).
+
+        The digest is taken from the result when the database client computed it
+        while fetching rows (see `QueryResult`), otherwise it is computed here.
 
         Args:
             fut (Future[List[Dict[str, Any]]]): A Future representing the asynchronous
@@ -251,13 +310,32 @@ class WorkingDataConnection:
         Returns:
             None
         """
+        self.running_query = None
         try:
             result = fut.result()
-            if result and self.list_data_dict_query_result != result:
+            incremental = self.query_config.incremental if self.query_config else None
+            if self.query_config and self.query_config.stream_chunk_rows:
+                self.set_ready_status()
+                return
+            if not result:
+                self.unchanged_results += 1
+                self.set_ready_status()
+                return
+            if incremental:
+                result, watermark = merge_incremental_result(self.list_data_dict_query_result, result, incremental)
+                if watermark is not None:
+                    self.watermark = watermark
+            digest = compute_digest(result)
+            if digest != self.list_data_dict_query_result_digest:
                 self.list_data_dict_query_result = result
+                self.list_data_dict_query_result_digest = digest
+                self.unchanged_results = 0
                 self.status = WorkingDataStatus.UPDATED
-            elif result and self.list_data_dict_query_result == result:
+            else:
+                self.unchanged_results += 1
                 self.set_ready_status()
+        except (QueryTimeoutError, QueryCancelledError):
+            self.set_ready_status()
         except Exception:
             self.update_expired_time(0)
 
@@ -267,8 +345,10 @@ class WorkingDataConnection:
         Checks whether the connection has expired and updates its status.
 
         Compares the current time with the `expired_time` attribute. If the current
-        time is later than `expired_time`, the `status` is set to `WorkingDataStatus.EXPIRED`.
-        If `expired_time` is None, no action is taken.
+        time is later than `expired_time`, the `status` is set to `WorkingDataStatus.EXPIRED`
+        and the running query of the connection, if any, is cancelled since its result
+        would be discarded; a query shared with other entries keeps running for
+        them (see `Query.cancel`). If `expired_time` is None, no action is taken.
 
         Returns:
             None
@@ -277,4 +357,164 @@ class WorkingDataConnection:
             return
         if datetime.now() > self.expired_time:
             self.status = WorkingDataStatus.EXPIRED
+            if self.running_query is not None:
+                self.running_query.cancel()
+
+    def update_dict_result(self, dict_result: Optional[Dict[str, Any]]) -> bool:
+        """
+        Stores a new result dictionary if its content differs from the current one.
+
+        The comparison is done on content digests, so an unchanged result costs
+        one hash of the new dictionary instead of a deep comparison, and leaves
+        the stored result untouched.
+
+        Args:
+            dict_result (Optional[Dict[str, Any]]): The freshly built result dictionary.
+
+        Returns:
+            bool: `True` if the result changed and was stored, `False` otherwise.
+        """
+        digest = compute_digest(dict_result)
+        if digest == self.data_dict_result_digest:
+            return False
+        self.data_dict_result = dict_result
+        self.data_dict_result_digest = digest
+        return True
+
+    def mark_sent(self) -> None:
+        """
+        Records the result just handed to the producer as sent.
+
+        The digest of the sent result (the result dictionary if any, the query
+        result otherwise, as in `_send_messages_to_producers`) is kept in
+        `sent_digest` and persisted by `to_dict()`, so that `from_dict()` does
+        not send it again after a restart.
+
+        Returns:
+            None
+        """
+        self.sent_digest = self._pending_digest()
 
+    def _pending_digest(self) -> Optional[str]:
+        if self.data_dict_result:
+            return self.data_dict_result_digest
+        return self.list_data_dict_query_result_digest
+
+    def message_key(self, rows: Optional[List[Dict[str, Any]]] = None) -> Optional[str]:
+        """
+        Renders the key of the messages of the connection from its `key_template`.
+
+        Template fields are looked up, in order, in the regex match, the query
+        source, the result dictionary and the first row of the query result (or
+        of `rows`), so that a key such as ``"{task_cd}"`` works whether
+        ``task_cd`` was captured from the logs or returned by the query.
+
+        Args:
+            rows (Optional[List[Dict[str, Any]]], optional): Rows sent instead of the query
+                result, e.g. a streamed chunk. Defaults to None.
+
+        Returns:
+            Optional[str]: The key, or None if there is no template or one of its fields is missing.
+
+        Example:
+            >>> wdc.key_template = "{task_cd}"
+            >>> wdc.data_dict_match = {"task_cd": "LOAD_SALES"}
+            >>> wdc.message_key()
+            'LOAD_SALES'
+        """
+        if self.key_template is None:
+            return None
+        rows = rows if rows is not None else self.list_data_dict_query_result
+        first_row = rows[0] if isinstance(rows, list) and rows and isinstance(rows[0], dict) else None
+        fields = ChainMap(*[
+            data for data in (self.data_dict_match, self.data_dict_query_source, self.data_dict_result, first_row)
+            if isinstance(data, dict)
+        ])
+        try:
+            return self.key_template.format_map(fields)
+        except (KeyError, IndexError, AttributeError, ValueError):
+            return None
+
+    def to_dict(self) -> Dict[str, Any]:
+        """
+        Serializes the connection and its working data to a dictionary.
+
+        The dictionary only contains JSON-compatible values except for the
+        match, source and result data, which are stored as produced by the
+        agent and the database client. It is used by `WorkingStateSnapshot`
+        to persist live entries across restarts.
+
+        Returns:
+            Dict[str, Any]: The serialized connection.
+        """
+        return {
+            "id": self.id,
+            "name": self.name,
+            "producer_type": self.producer_type,
+            "producer_name": self.producer_name,
+            "topic": self.topic,
+            "database_type": self.database_type,
+            "database_name": self.database_name,
+            "query": self.query,
+            "is_error": self.is_error,
+            "is_warning": self.is_warning,
+            "status": self.status.value,
+            "expired_time": self.expired_time.isoformat() if self.expired_time else None,
+            "data_dict_match": self.data_dict_match,
+            "data_dict_query_source": self.data_dict_query_source,
+            "data_dict_result": self.data_dict_result,
+            "data_dict_result_digest": self.data_dict_result_digest,
+            "list_data_dict_query_result": self.list_data_dict_query_result,
+            "list_data_dict_query_result_digest": self.list_data_dict_query_result_digest,
+            "watermark": self.watermark.isoformat() if isinstance(self.watermark, datetime) else self.watermark,
+            "watermark_is_datetime": isinstance(self.watermark, datetime),
+            "sent_digest": self.sent_digest,
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "WorkingDataConnection":
+        """
+        Restores a WorkingDataConnection serialized with `to_dict()`.
+
+        A connection that was waiting for a query when it was serialized is
+        restored as READY, since the query did not survive the restart. A
+        connection serialized as UPDATED is restored as READY too when its
+        result was already sent (see `mark_sent`), and stays UPDATED, to be sent
+        once, otherwise.
+
+        Args:
+            data (Dict[str, Any]): The serialized connection.
+
+        Returns:
+            WorkingDataConnection: The restored connection.
+        """
+        working_data_connection = cls(
+            name=data["name"],
+            producer_type=data["producer_type"],
+            producer_name=data["producer_name"],
+            topic=data.get("topic"),
+            database_type=data.get("database_type"),
+            database_name=data.get("database_name"),
+            query=data.get("query"),
+            is_error=data.get("is_error", False),
+            is_warning=data.get("is_warning", False),
+            expired_time=datetime.fromisoformat(data["expired_time"]) if data.get("expired_time") else None,
+        )
+        working_data_connection.id = data["id"]
+        working_data_connection.status = WorkingDataStatus(data["status"])
+        working_data_connection.data_dict_match = data.get("data_dict_match")
+        working_data_connection.data_dict_query_source = data.get("data_dict_query_source")
+        working_data_connection.data_dict_result = data.get("data_dict_result")
+        working_data_connection.data_dict_result_digest = data.get("data_dict_result_digest")
+        working_data_connection.list_data_dict_query_result = data.get("list_data_dict_query_result")
+        working_data_connection.list_data_dict_query_result_digest = data.get("list_data_dict_query_result_digest")
+        working_data_connection.watermark = data.get("watermark")
+        if data.get("watermark_is_datetime") and working_data_connection.watermark is not None:
+            working_data_connection.watermark = datetime.fromisoformat(working_data_connection.watermark)
+        working_data_connection.sent_digest = data.get("sent_digest")
+        if working_data_connection.status == WorkingDataStatus.QUERY_RUNNING or (
+                working_data_connection.status == WorkingDataStatus.UPDATED
+                and working_data_connection.sent_digest is not None
+                and working_data_connection.sent_digest == working_data_connection._pending_digest()):
+            working_data_connection.status = WorkingDataStatus.READY
+        return working_data_connection
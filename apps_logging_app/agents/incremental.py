@@ -0,0 +1,93 @@
+from numbers import Number
+from typing import Any, Dict, List, Optional, Tuple
+
+from .model import QueryIncrementalConfig
+from ..databases.data import QueryResult
+
+
+def merge_incremental_result(previous: Optional[List[Dict[str, Any]]],
+                             new_rows: List[Dict[str, Any]],
+                             cfg: QueryIncrementalConfig) -> Tuple[QueryResult, Any]:
+    """
+    Merges the rows of an incremental query into the result of the previous executions.
+
+    Args:
+        previous (Optional[List[Dict[str, Any]]]): The merged result of the previous executions, or None.
+        new_rows (List[Dict[str, Any]]): The rows returned by the latest execution, which only
+            scanned the rows added since the previous watermark.
+        cfg (QueryIncrementalConfig): The incremental settings of the query.
+
+    Returns:
+        Tuple[QueryResult, Any]: The merged rows, without the watermark column, and the
+        highest watermark found in `new_rows` (None if no row carries one).
+
+    Example:
+        >>> cfg = QueryIncrementalConfig(key_columns=["task_cd"])
+        >>> merged, watermark = merge_incremental_result(
+        ...     [{"task_cd": "A1", "delivered": 10}],
+        ...     [{"task_cd": "A1", "delivered": 2, "watermark": 42}],
+        ...     cfg,
+        ... )
+        >>> merged, watermark
+        ([{'task_cd': 'A1', 'delivered': 12}], 42)
+    """
+    watermark = None
+    merged: Dict[Tuple[Any, ...], Dict[str, Any]] = {}
+    for row in previous or []:
+        merged[_row_key(row, cfg)] = dict(row)
+
+    for row in new_rows:
+        row_watermark = _value(row, cfg.watermark_column)
+        if row_watermark is not None and (watermark is None or row_watermark > watermark):
+            watermark = row_watermark
+        row = {column: value for column, value in row.items() if column.lower() != cfg.watermark_column}
+
+        key = _row_key(row, cfg)
+        current = merged.get(key)
+        if current is None or cfg.merge_strategy == "replace":
+            merged[key] = row
+            continue
+        for column, value in row.items():
+            if _is_number(value) and _is_number(current.get(column)) and not _is_key_column(column, row, cfg):
+                current[column] = current[column] + value
+            else:
+                current[column] = value
+
+    return QueryResult(list(merged.values())), watermark
+
+
+def _row_key(row: Dict[str, Any], cfg: QueryIncrementalConfig) -> Tuple[Any, ...]:
+    """
+    Returns the values identifying a row: its key columns, or its non-numeric columns.
+    """
+    if cfg.key_columns is not None:
+        return tuple(_value(row, column) for column in cfg.key_columns)
+    return tuple((column, value) for column, value in sorted(row.items()) if not _is_number(value))
+
+
+def _is_key_column(column: str, row: Dict[str, Any], cfg: QueryIncrementalConfig) -> bool:
+    """
+    Returns whether a column is part of the row key.
+    """
+    if cfg.key_columns is not None:
+        return column.lower() in cfg.key_columns
+    return not _is_number(row.get(column))
+
+
+def _value(row: Dict[str, Any], column: str) -> Any:
+    """
+    Returns the value of a column, looked up case-insensitively.
+    """
+    if column in row:
+        return row[column]
+    for name, value in row.items():
+        if name.lower() == column:
+            return value
+    return None
+
+
+def _is_number(value: Any) -> bool:
+    """
+    Returns whether a value can be summed (booleans excluded).
+    """
+    return isinstance(value, Number) and not isinstance(value, bool)
@@ -1,6 +1,7 @@
 from pydantic import BaseModel, field_validator, model_validator
-from typing import List, Optional, Pattern, Tuple
+from typing import List, Literal, Optional, Pattern, Tuple
 from pathlib import Path
+from string import Formatter
 import re
 
 
@@ -96,6 +97,127 @@ class RegexPatternConfig(BaseModel):
         return v
 
 
+class QueryBatchConfig(BaseModel):
+    """
+    Configuration model for batching queries that differ only in some bind values.
+
+    Queries with the same SQL text and the same values for every parameter
+    not listed in `key_params` are grouped for up to `window_ms` milliseconds
+    (or until `max_size` queries are pending) and executed together. Result
+    rows are routed back to each query by matching `key_columns` against the
+    values of `key_params`.
+
+    When `in_list_template` is set, the group runs as a single statement: the
+    ``{keys}`` placeholder of the template is replaced with one bind tuple per
+    query, e.g. ``(ted.TASK_CD, ted.TASK_OCCUR_NUM) IN ({keys})``. Otherwise
+    the group runs on a single worker through the database client's batch
+    execution hook.
+
+    Attributes:
+        key_params (List[str]): Bind parameters whose values differ between batched queries.
+        key_columns (List[str], optional): Result columns holding the values of `key_params`,
+            in the same order. Defaults to the lower-cased `key_params`.
+        window_ms (float): Maximum time in milliseconds a query waits for its group. Defaults to 50.
+        max_size (int): Maximum number of queries in a group. Defaults to 100.
+        in_list_template (str, optional): SQL text with a ``{keys}`` placeholder used to
+            run the whole group as one statement. Defaults to None.
+    """
+    key_params: List[str]
+    key_columns: Optional[List[str]] = None
+    window_ms: float = 50
+    max_size: int = 100
+    in_list_template: Optional[str] = None
+
+    @model_validator(mode='after')
+    def validate_batch(self) -> "QueryBatchConfig":
+        """
+        Validates the batching settings and fills in the default key columns.
+
+        Returns:
+            QueryBatchConfig: The validated QueryBatchConfig instance.
+
+        Raises:
+            ValueError: If `key_params` is empty, if `key_columns` does not match
+                `key_params` in length, if `window_ms` is negative, if `max_size` is
+                not between 1 and 1000, or if `in_list_template` lacks the ``{keys}``
+                placeholder.
+        """
+        if not self.key_params:
+            raise ValueError("Batch key params cannot be empty")
+        if self.key_columns is None:
+            self.key_columns = [param.lower() for param in self.key_params]
+        if len(self.key_columns) != len(self.key_params):
+            raise ValueError("Batch key columns must match key params")
+        if self.window_ms < 0:
+            raise ValueError("Batch window must be greater than or equal to 0")
+        if not 1 <= self.max_size <= 1000:
+            raise ValueError("Batch max size must be between 1 and 1000")
+        if self.in_list_template is not None and "{keys}" not in self.in_list_template:
+            raise ValueError("Batch in_list_template must contain the {keys} placeholder")
+        return self
+
+
+class QueryIncrementalConfig(BaseModel):
+    """
+    Configuration model for incremental (watermark-based) query refreshes.
+
+    An incremental query only scans the rows added since its previous
+    execution for the same working entry. The query receives the last
+    watermark in the `watermark_param` bind parameter (``None`` on the first
+    execution) and returns, in `watermark_column`, the highest watermark of
+    the rows it scanned, e.g.::
+
+        SELECT TASK_CD, SUM(delivered) AS delivered, MAX(cto.CONTACT_DTTM) AS watermark
+        FROM ... WHERE (:since IS NULL OR cto.CONTACT_DTTM > :since) GROUP BY TASK_CD
+
+    The new rows are then merged into the result of the previous executions:
+        - ``sum``: numeric columns of rows with the same key are added up, which fits
+          counters such as ``SUM(...)`` and ``COUNT(*)``.
+        - ``replace``: a new row replaces the previous row with the same key.
+    Rows with a new key are appended in both cases. The watermark column is
+    removed from the merged rows. Since rows are never subtracted, ``sum``
+    cannot be used for a query over a sliding time window (e.g.
+    ``CONTACT_DTTM > SYSDATE - 1``): the counters would keep the rows that left
+    the window.
+
+    Attributes:
+        watermark_column (str): Result column holding the highest watermark of the scanned rows.
+            Compared case-insensitively. Defaults to ``watermark``.
+        watermark_param (str): Bind parameter receiving the last watermark. Defaults to ``since``.
+        merge_strategy (str): ``sum`` or ``replace``. Defaults to ``sum``.
+        key_columns (List[str], optional): Columns identifying a result row. Defaults to None
+            (every column whose value is not a number).
+    """
+    watermark_column: str = "watermark"
+    watermark_param: str = "since"
+    merge_strategy: Literal["sum", "replace"] = "sum"
+    key_columns: Optional[List[str]] = None
+
+    @model_validator(mode='after')
+    def validate_incremental(self) -> "QueryIncrementalConfig":
+        """
+        Validates the incremental settings and normalizes column names to lower case.
+
+        Returns:
+            QueryIncrementalConfig: The validated QueryIncrementalConfig instance.
+
+        Raises:
+            ValueError: If `watermark_column` or `watermark_param` is empty.
+        """
+        if not self.watermark_column or not self.watermark_param:
+            raise ValueError("Incremental watermark column and param cannot be empty")
+        self.watermark_column = self.watermark_column.lower()
+        if self.key_columns is not None:
+            self.key_columns = [column.lower() for column in self.key_columns]
+        return self
+
+
+SLIDING_WINDOW_PATTERN = re.compile(
+    r"\b(SYSDATE|SYSTIMESTAMP|CURRENT_DATE|CURRENT_TIMESTAMP|LOCALTIMESTAMP|NOW\s*\(|GETDATE\s*\()",
+    re.IGNORECASE,
+)
+
+
 class QueryConfig(BaseModel):
     """
     Configuration model for a database query.
@@ -108,10 +230,188 @@ class QueryConfig(BaseModel):
         type (str): Type of the database (e.g., 'postgres', 'mysql').
         name (str): Unique name for the query.
         query (str): The query string to be executed.
+        cache_ttl (float, optional): Time-to-live in seconds of the results of this
+            query in the process-wide query result cache. Identical queries (same
+            database, SQL text and bind values) issued within this time are served
+            from the cache. Defaults to None (no caching).
+        batch (QueryBatchConfig, optional): Batching of queries sharing this SQL text.
+            Defaults to None (each query runs on its own).
+        refresh_interval (float, optional): Interval in seconds between two executions
+            of the query for the same working entry. Defaults to None (the agent's
+            `execute_query_interval`).
+        jitter (float): Fraction of the refresh interval by which each execution is
+            randomly anticipated or delayed, to spread load. Must be between 0 and 1.
+            Defaults to 0.1.
+        backoff_factor (float): Factor applied to the refresh interval for every
+            consecutive unchanged result. Must be at least 1. Defaults to 1 (no backoff).
+        max_refresh_interval (float, optional): Upper bound in seconds of the refresh
+            interval grown by `backoff_factor`. Defaults to None (8 times the refresh interval).
+        arraysize (int, optional): Number of rows fetched per round-trip. Defaults to None
+            (driver default).
+        prefetchrows (int, optional): Number of rows returned with the execute round-trip.
+            Defaults to None (driver default).
+        result_format (str): Shape of the query result: ``rows`` (a list of dictionaries,
+            one per row) or ``columnar`` (the column names once and one value list per
+            row). Defaults to ``rows``.
+        incremental (QueryIncrementalConfig, optional): Watermark-based incremental refresh
+            settings. Requires the ``rows`` result format. Defaults to None (every refresh
+            re-runs the full query).
+        stream_chunk_rows (int, optional): Streams the result in chunks of this number of
+            rows, each sent to the producer as a sequenced message, instead of sending the
+            whole result as one message. Requires the ``rows`` result format and excludes
+            `cache_ttl`, `batch` and `incremental`. Defaults to None (no streaming).
+        timeout (float, optional): Time in seconds from its issue by which the query must
+            be completed. Past it, a queued query is dropped and a running statement is
+            aborted by the driver call timeout; the agent issues the query again at its
+            next refresh. Defaults to None (no deadline).
+        reference_table (str, optional): Name of a reference table of the database (see
+            `BaseDatabaseConfig.reference_tables`) serving this query from memory: the bind
+            values of the query are looked up on the key columns of the table, and `query`
+            only runs while the table is not loaded yet. Requires the ``rows`` result format
+            and excludes `incremental` and `stream_chunk_rows`. Defaults to None.
     """
     type: str
     name: str
     query: str
+    cache_ttl: Optional[float] = None
+    batch: Optional[QueryBatchConfig] = None
+    refresh_interval: Optional[float] = None
+    jitter: float = 0.1
+    backoff_factor: float = 1
+    max_refresh_interval: Optional[float] = None
+    arraysize: Optional[int] = None
+    prefetchrows: Optional[int] = None
+    result_format: Literal["rows", "columnar"] = "rows"
+    incremental: Optional[QueryIncrementalConfig] = None
+    stream_chunk_rows: Optional[int] = None
+    timeout: Optional[float] = None
+    reference_table: Optional[str] = None
+
+    @field_validator('cache_ttl')
+    def validate_cache_ttl(cls, value) -> Optional[float]:
+        """
+        Validates the `cache_ttl` field of the QueryConfig model.
+
+        Args:
+            cls: The QueryConfig class.
+            value (Optional[float]): The value of the `cache_ttl` field to validate.
+
+        Returns:
+            Optional[float]: The validated cache_ttl value.
+
+        Raises:
+            ValueError: If `cache_ttl` is less than or equal to 0.
+        """
+        if value is not None and value <= 0:
+            raise ValueError("Cache TTL must be greater than 0")
+        return value
+
+    @field_validator('timeout')
+    def validate_timeout(cls, value) -> Optional[float]:
+        """
+        Validates the `timeout` field of the QueryConfig model.
+
+        Args:
+            cls: The QueryConfig class.
+            value (Optional[float]): The value of the `timeout` field to validate.
+
+        Returns:
+            Optional[float]: The validated timeout value.
+
+        Raises:
+            ValueError: If `timeout` is less than or equal to 0.
+        """
+        if value is not None and value <= 0:
+            raise ValueError("Timeout must be greater than 0")
+        return value
+
+    @model_validator(mode='after')
+    def validate_refresh(self) -> "QueryConfig":
+        """
+        Validates the refresh scheduling settings of the QueryConfig model.
+
+        Returns:
+            QueryConfig: The validated QueryConfig instance.
+
+        Raises:
+            ValueError: If `refresh_interval` or `max_refresh_interval` is less than or
+                equal to 0, if `jitter` is not between 0 and 1, if `backoff_factor`
+                is less than 1, if `incremental` is set with a non-``rows`` result format or sums
+                a query over a sliding time window (see `SLIDING_WINDOW_PATTERN`), or if
+                `stream_chunk_rows` is less than or equal to 0 or combined with an incompatible setting,
+                or if `reference_table` is combined with an incompatible setting.
+        """
+        if self.refresh_interval is not None and self.refresh_interval <= 0:
+            raise ValueError("Refresh interval must be greater than 0")
+        if self.max_refresh_interval is not None and self.max_refresh_interval <= 0:
+            raise ValueError("Max refresh interval must be greater than 0")
+        if not 0 <= self.jitter <= 1:
+            raise ValueError("Jitter must be between 0 and 1")
+        if self.backoff_factor < 1:
+            raise ValueError("Backoff factor must be greater than or equal to 1")
+        if self.incremental is not None and self.result_format != "rows":
+            raise ValueError("Incremental queries require the rows result format")
+        if self.incremental is not None and self.incremental.merge_strategy == "sum" and SLIDING_WINDOW_PATTERN.search(self.query):
+            raise ValueError("Incremental sum merge cannot be used with a sliding time window, use the replace merge strategy or a full query")
+        if self.stream_chunk_rows is not None:
+            if self.stream_chunk_rows <= 0:
+                raise ValueError("Stream chunk rows must be greater than 0")
+            if self.result_format != "rows":
+                raise ValueError("Streamed queries require the rows result format")
+            if self.cache_ttl is not None or self.batch is not None or self.incremental is not None:
+                raise ValueError("Streamed queries cannot be cached, batched or incremental")
+        if self.reference_table is not None:
+            if self.result_format != "rows" or self.incremental is not None or self.stream_chunk_rows is not None:
+                raise ValueError("Reference table lookups require the rows result format and cannot be incremental or streamed")
+        return self
+
+    @field_validator('arraysize', 'prefetchrows')
+    def validate_fetch_size(cls, value, info) -> Optional[int]:
+        """
+        Validates the `arraysize` and `prefetchrows` fields of the QueryConfig model.
+
+        Args:
+            cls: The QueryConfig class.
+            value (Optional[int]): The value of the field to validate.
+            info: Validation context, providing the field name.
+
+        Returns:
+            Optional[int]: The validated value.
+
+        Raises:
+            ValueError: If `arraysize` is less than or equal to 0, or `prefetchrows` is less than 0.
+        """
+        if value is None:
+            return value
+        if info.field_name == 'arraysize' and value <= 0:
+            raise ValueError("Arraysize must be greater than 0")
+        if value < 0:
+            raise ValueError("Prefetchrows must be greater than or equal to 0")
+        return value
+
+def validate_key_template(value: Optional[str]) -> Optional[str]:
+    """
+    Checks that a message key template only references fields by name.
+
+    Args:
+        value (Optional[str]): The key template, in `str.format` syntax.
+
+    Returns:
+        Optional[str]: The key template.
+
+    Raises:
+        ValueError: If the template is malformed, has no field, or has a positional field.
+
+    Example:
+        >>> validate_key_template("{task_cd}-{env}")
+        '{task_cd}-{env}'
+    """
+    if value is None:
+        return value
+    fields = [field for _, field, _, _ in Formatter().parse(value) if field is not None]
+    if not fields or any(not field or field.isdigit() for field in fields):
+        raise ValueError("Key template must reference fields by name, e.g. '{task_cd}'")
+    return value
 
 class DataConnectionConfig(BaseModel):
     """
@@ -131,6 +431,10 @@ class DataConnectionConfig(BaseModel):
             representing the destination database or table.
         expired_time_int (int, optional): Optional expiration time in seconds
             for the data connection.
+        key_template (str, optional): Template of the key of the messages, e.g. ``"{task_cd}"``,
+            whose fields are taken from the regex match, the query source, the result,
+            or the first row of the query result. Overrides the template of the producer
+            connection. Defaults to None.
     """
     name: str
     is_error: bool
@@ -138,6 +442,24 @@ class DataConnectionConfig(BaseModel):
     source_ref: RegexPatternConfig = None
     destination_ref: Optional[QueryConfig] = None
     expired_time_int: Optional[int] = None
+    key_template: Optional[str] = None
+
+    @field_validator('key_template')
+    def validate_key_template(cls, value) -> Optional[str]:
+        """
+        Validates the `key_template` field of the DataConnectionConfig model.
+
+        Args:
+            cls: The DataConnectionConfig class.
+            value (Optional[str]): The value of the `key_template` field to validate.
+
+        Returns:
+            Optional[str]: The validated key template.
+
+        Raises:
+            ValueError: If the template is malformed or does not reference fields by name.
+        """
+        return validate_key_template(value)
 
 class ProducerConnectionConfig(BaseModel):
     """
@@ -153,11 +475,68 @@ class ProducerConnectionConfig(BaseModel):
         topic (str): Messaging topic or stream that the producer writes to.
         data_connections (List[DataConnectionConfig]): List of data connections
             handled by this producer.
+        key_template (str, optional): Default key template of the messages of the data
+            connections (see `DataConnectionConfig.key_template`). Defaults to None.
     """
     type: str
     name: str
     topic: str
     data_connections: List[DataConnectionConfig]
+    key_template: Optional[str] = None
+
+    @field_validator('key_template')
+    def validate_key_template(cls, value) -> Optional[str]:
+        """
+        Validates the `key_template` field of the ProducerConnectionConfig model.
+
+        Args:
+            cls: The ProducerConnectionConfig class.
+            value (Optional[str]): The value of the `key_template` field to validate.
+
+        Returns:
+            Optional[str]: The validated key template.
+
+        Raises:
+            ValueError: If the template is malformed or does not reference fields by name.
+        """
+        return validate_key_template(value)
+
+
+class SnapshotConfig(BaseModel):
+    """
+    Configuration model for the persistent working-state snapshot of an agent.
+
+    When configured, the agent periodically writes its live working data
+    connections and its path file cursors to a local SQLite database, and
+    restores them at startup, so that a restart neither loses the entries
+    still being enriched nor rescans the logs from the beginning.
+
+    Attributes:
+        path (Path): Path of the SQLite database file. Created if missing.
+        interval (float): Interval in seconds between two snapshots.
+            Must be greater than 0. Defaults to 60.
+    """
+    path: Path
+    interval: float = 60
+
+    @field_validator('interval')
+    def validate_interval(cls, value) -> float:
+        """
+        Validates the `interval` field of the SnapshotConfig model.
+
+        Args:
+            cls: The SnapshotConfig class.
+            value (float): The value of the `interval` field to validate.
+
+        Returns:
+            float: The validated interval value.
+
+        Raises:
+            ValueError: If `interval` is less than or equal to 0.
+        """
+        if value <= 0:
+            raise ValueError("Snapshot interval must be greater than 0")
+        return value
 
 
 class BaseAgentConfig(BaseModel):
@@ -180,8 +559,10 @@ class BaseAgentConfig(BaseModel):
             configurations that the agent uses to produce or process data.
         fetch_logs_interval (float): Interval in seconds for fetching logs.
             Must be greater than 0. Defaults to 120.
-        execute_query_interval (float): Interval in seconds for executing queries.
-            Must be greater than 0. Defaults to 600.
+        execute_query_interval (float): Default interval in seconds between two executions
+            of the query of a working entry. Must be greater than 0. Defaults to 600.
+        snapshot (SnapshotConfig, optional): Optional persistent snapshot of the
+            working state, restored at startup.
     """
     type: str
     name: str
@@ -190,6 +571,7 @@ class BaseAgentConfig(BaseModel):
     producer_connections: List[ProducerConnectionConfig]
     fetch_logs_interval: float = 120
     execute_query_interval: float = 600
+    snapshot: Optional[SnapshotConfig] = None
     
 
     @field_validator('buffer_rows')
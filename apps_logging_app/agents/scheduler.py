@@ -0,0 +1,141 @@
+import heapq
+import itertools
+import random
+import time
+from typing import List, Tuple
+
+from .data import WorkingDataConnection, WorkingDataStatus
+
+
+class QueryScheduler:
+    """
+    Priority queue of working data connections ordered by their next query time.
+
+    Every working data connection with a database destination gets its own
+    next-due time instead of sharing a single agent-wide tick. The refresh
+    interval comes from its `QueryConfig.refresh_interval` (or the agent's
+    `execute_query_interval`), is randomized by `QueryConfig.jitter`, and can
+    grow by `QueryConfig.backoff_factor` for every consecutive unchanged
+    result, up to `QueryConfig.max_refresh_interval`. Together with the
+    randomized first run of new entries, this spreads queries evenly over the
+    interval instead of firing them all at the same instant.
+
+    Entries are removed lazily: a connection that expired, or that was
+    rescheduled since an entry was pushed, is skipped when its entry is popped.
+
+    Attributes:
+        default_interval (float): Refresh interval in seconds for connections whose query does not declare one.
+        _heap (List[Tuple[float, int, WorkingDataConnection]]): Heap of (due time, sequence, connection).
+        _sequence (itertools.count): Tie-breaker keeping the heap ordering stable.
+
+    Example:
+        >>> scheduler = QueryScheduler(default_interval=600)
+        >>> scheduler.schedule_new(wdc)
+        >>> for wdc in scheduler.pop_due():
+        ...     run_query(wdc)
+        ...     scheduler.reschedule(wdc)
+    """
+
+    def __init__(self, default_interval: float) -> None:
+        """
+        Initializes an empty scheduler.
+
+        Args:
+            default_interval (float): Refresh interval in seconds for connections whose query does not declare one.
+        """
+        self.default_interval = default_interval
+        self._heap: List[Tuple[float, int, WorkingDataConnection]] = []
+        self._sequence = itertools.count()
+
+    def __len__(self) -> int:
+        return len(self._heap)
+
+    # PUBLIC API
+
+    def schedule_new(self, wdc: WorkingDataConnection, spread: float | None = None) -> None:
+        """
+        Schedules the first query of a connection.
+
+        The first query runs after a random delay of up to `spread` seconds, so
+        that the many connections created by a burst of matches (or restored at
+        startup) do not all query at the same instant.
+
+        Args:
+            wdc (WorkingDataConnection): The connection to schedule.
+            spread (float | None, optional): Maximum initial delay in seconds. Defaults to
+                the jitter window of the connection (``jitter * interval``).
+        """
+        if spread is None:
+            spread = self._jitter(wdc) * self.interval(wdc)
+        self._push(wdc, random.uniform(0, spread))
+
+    def reschedule(self, wdc: WorkingDataConnection) -> None:
+        """
+        Schedules the next query of a connection, one refresh interval from now.
+
+        The interval is multiplied by ``backoff_factor ** unchanged_results``,
+        capped at `max_refresh_interval`, then randomized by ``± jitter``.
+
+        Args:
+            wdc (WorkingDataConnection): The connection to reschedule.
+        """
+        interval = self.interval(wdc)
+        query_config = wdc.query_config
+        if query_config and query_config.backoff_factor > 1 and wdc.unchanged_results:
+            max_interval = query_config.max_refresh_interval or interval * 8
+            interval = min(interval * query_config.backoff_factor ** wdc.unchanged_results, max_interval)
+        jitter = self._jitter(wdc)
+        self._push(wdc, interval * random.uniform(1 - jitter, 1 + jitter))
+
+    def pop_due(self, now: float | None = None) -> List[WorkingDataConnection]:
+        """
+        Removes and returns the connections whose query is due.
+
+        Args:
+            now (float | None, optional): Current `time.monotonic()` value. Defaults to now.
+
+        Returns:
+            List[WorkingDataConnection]: The due connections, earliest first. Expired
+            connections and stale entries are discarded.
+        """
+        now = time.monotonic() if now is None else now
+        due: List[WorkingDataConnection] = []
+        while self._heap and self._heap[0][0] <= now:
+            due_time, _, wdc = heapq.heappop(self._heap)
+            if wdc.next_query_time != due_time or wdc.status == WorkingDataStatus.EXPIRED:
+                continue
+            due.append(wdc)
+        return due
+
+    def interval(self, wdc: WorkingDataConnection) -> float:
+        """
+        Returns the base refresh interval of a connection, in seconds.
+
+        Args:
+            wdc (WorkingDataConnection): The connection.
+
+        Returns:
+            float: Its `QueryConfig.refresh_interval`, or `default_interval`.
+        """
+        if wdc.query_config and wdc.query_config.refresh_interval:
+            return wdc.query_config.refresh_interval
+        return self.default_interval
+
+    # INTERNALS
+
+    def _push(self, wdc: WorkingDataConnection, delay: float) -> None:
+        """
+        Pushes a connection onto the heap, due `delay` seconds from now.
+
+        Args:
+            wdc (WorkingDataConnection): The connection to schedule.
+            delay (float): Delay in seconds before the query is due.
+        """
+        wdc.next_query_time = time.monotonic() + delay
+        heapq.heappush(self._heap, (wdc.next_query_time, next(self._sequence), wdc))
+
+    def _jitter(self, wdc: WorkingDataConnection) -> float:
+        """
+        Returns the jitter fraction applied to the refresh interval of a connection.
+        """
+        return wdc.query_config.jitter if wdc.query_config else 0.1
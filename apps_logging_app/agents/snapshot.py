@@ -0,0 +1,253 @@
+import json
+import logging
+import sqlite3
+import threading
+from datetime import date, datetime, time
+from decimal import Decimal
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Tuple
+
+from .data import WorkingDataConnection
+from .model import PathFileConfig
+from ..utils import compute_digest
+
+
+TYPE_TAG = "__type__"
+"""Key of the JSON objects standing for a typed value in a snapshot payload."""
+
+TYPE_DECODERS: Dict[str, Callable[[str], Any]] = {
+    "decimal": Decimal,
+    "datetime": datetime.fromisoformat,
+    "date": date.fromisoformat,
+    "time": time.fromisoformat,
+}
+"""Decoder of each tagged value type, keyed by its tag."""
+
+STATE_VALUES = 6
+"""Number of leading values of `_state_of` compared by value; the others are compared by identity."""
+
+
+class WorkingStateSnapshot:
+    """
+    Persists the working state of an agent to a local SQLite database.
+
+    The snapshot stores two kinds of state for a single agent:
+        - the live `WorkingDataConnection` entries created by regex matches,
+          so that long-lived entries (e.g. ``expired_time_int: 1440``) keep
+          being enriched after a restart;
+        - the cursor and file identifier of every path file, so that the agent
+          resumes reading its logs where it stopped instead of rescanning them.
+
+    Saving is incremental: the state of every entry written (see `_state_of`:
+    its status, expiration, watermark, sent marker and result digests, and the
+    identity of its match, source and result objects) is kept in memory, and
+    only the entries whose state changed since are serialized and upserted,
+    while entries that are no longer alive are deleted. Unchanged entries,
+    query results included, are neither encoded nor hashed again. All changes
+    of a save are written in a single transaction, and the database runs in
+    WAL mode, so a save costs a few page writes even with thousands of live
+    entries.
+
+    A single SQLite file can be shared by several agents: every row is keyed
+    by the agent key (``"<type>-<name>"``).
+
+    Payloads are JSON, with the ``Decimal``, ``datetime``, ``date`` and ``time``
+    values returned by the databases stored as tagged objects (see
+    `TYPE_DECODERS`), so that restored query results keep their types, e.g.
+    for the ``sum`` merge of incremental queries.
+
+    Attributes:
+        path (Path): Path of the SQLite database file.
+        agent_key (str): Key identifying the agent owning the snapshot rows.
+        logger (logging.Logger): Logger instance for snapshot operations.
+        _connection (sqlite3.Connection): Connection to the snapshot database.
+        _lock (threading.Lock): Lock serializing access to the connection.
+        _saved_states (Dict[str, Tuple[Any, ...]]): State of each entry currently stored, keyed by entry id.
+
+    Example:
+        >>> snapshot = WorkingStateSnapshot(Path("state/agents.db"), "sasdm-sasdm-agent")
+        >>> entries, cursors = snapshot.load()
+        >>> snapshot.save(agent.working_data_connections, agent.config.path_files)
+    """
+
+    def __init__(self, path: Path, agent_key: str) -> None:
+        """
+        Opens (and creates if needed) the snapshot database.
+
+        Args:
+            path (Path): Path of the SQLite database file. Parent directories are created if missing.
+            agent_key (str): Key identifying the agent owning the snapshot rows.
+        """
+        self.path = Path(path)
+        self.agent_key = agent_key
+        self.logger = logging.getLogger("__main__." + __name__)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._connection = sqlite3.connect(str(self.path), check_same_thread=False)
+        self._lock = threading.Lock()
+        self._saved_states: Dict[str, Tuple[Any, ...]] = {}
+        with self._lock:
+            self._connection.execute("PRAGMA journal_mode=WAL")
+            self._connection.execute("PRAGMA synchronous=NORMAL")
+            self._connection.execute(
+                "CREATE TABLE IF NOT EXISTS working_data_connections ("
+                "agent TEXT NOT NULL, id TEXT NOT NULL, digest TEXT NOT NULL, payload TEXT NOT NULL, "
+                "PRIMARY KEY (agent, id))"
+            )
+            self._connection.execute(
+                "CREATE TABLE IF NOT EXISTS path_files ("
+                "agent TEXT NOT NULL, name TEXT NOT NULL, cursor INTEGER NOT NULL, file_id TEXT, "
+                "PRIMARY KEY (agent, name))"
+            )
+            self._connection.commit()
+
+    # PUBLIC API
+
+    def load(self) -> Tuple[List[WorkingDataConnection], Dict[str, Tuple[int, Any]]]:
+        """
+        Loads the working entries and path file positions stored for the agent.
+
+        Entries are restored in bulk with a single query per table. The states
+        of the loaded entries are remembered, so the next `save()` only writes
+        entries that changed after the restore.
+
+        Returns:
+            Tuple[List[WorkingDataConnection], Dict[str, Tuple[int, Any]]]:
+                The restored working data connections, and a mapping from path
+                file name to its ``(cursor, file_id)``.
+        """
+        with self._lock:
+            entry_rows = self._connection.execute(
+                "SELECT id, payload FROM working_data_connections WHERE agent = ?",
+                (self.agent_key,)
+            ).fetchall()
+            path_file_rows = self._connection.execute(
+                "SELECT name, cursor, file_id FROM path_files WHERE agent = ?",
+                (self.agent_key,)
+            ).fetchall()
+
+        working_data_connections: List[WorkingDataConnection] = []
+        for entry_id, payload in entry_rows:
+            try:
+                working_data_connection = WorkingDataConnection.from_dict(json.loads(payload, object_hook=_decode_value))
+                working_data_connections.append(working_data_connection)
+                self._saved_states[entry_id] = _state_of(working_data_connection)
+            except Exception as e:
+                self.logger.error(f"Snapshot {self.agent_key}: Skipping unreadable working data connection {entry_id}: {e}")
+
+        path_files: Dict[str, Tuple[int, Any]] = {}
+        for name, cursor, file_id in path_file_rows:
+            path_files[name] = (cursor, tuple(json.loads(file_id)) if file_id else None)
+
+        self.logger.info(f"Snapshot {self.agent_key}: Loaded {len(working_data_connections)} working data connections")
+        return working_data_connections, path_files
+
+    def save(self, working_data_connections: List[WorkingDataConnection], path_files: List[PathFileConfig]) -> None:
+        """
+        Writes the changes of the working state since the last save.
+
+        Args:
+            working_data_connections (List[WorkingDataConnection]): The entries to persist. Entries
+                missing from this list are deleted from the snapshot.
+            path_files (List[PathFileConfig]): The path files whose cursor and file id are persisted.
+        """
+        upserts: List[Tuple[str, str, str, str]] = []
+        alive: Dict[str, Tuple[Any, ...]] = {}
+        for working_data_connection in working_data_connections:
+            state = _state_of(working_data_connection)
+            alive[working_data_connection.id] = state
+            if not _same_state(self._saved_states.get(working_data_connection.id), state):
+                payload = json.dumps(working_data_connection.to_dict(), default=_encode_value)
+                upserts.append((self.agent_key, working_data_connection.id, compute_digest(payload), payload))
+        deletes = [(self.agent_key, entry_id) for entry_id in self._saved_states if entry_id not in alive]
+
+        positions = [
+            (self.agent_key, path_file.name, path_file.cursor, json.dumps(list(path_file.id)) if path_file.id is not None else None)
+            for path_file in path_files
+        ]
+
+        with self._lock:
+            with self._connection:
+                if upserts:
+                    self._connection.executemany(
+                        "INSERT OR REPLACE INTO working_data_connections (agent, id, digest, payload) VALUES (?, ?, ?, ?)",
+                        upserts
+                    )
+                if deletes:
+                    self._connection.executemany(
+                        "DELETE FROM working_data_connections WHERE agent = ? AND id = ?",
+                        deletes
+                    )
+                if positions:
+                    self._connection.executemany(
+                        "INSERT OR REPLACE INTO path_files (agent, name, cursor, file_id) VALUES (?, ?, ?, ?)",
+                        positions
+                    )
+        self._saved_states = alive
+        self.logger.debug(f"Snapshot {self.agent_key}: Saved {len(upserts)} changed and deleted {len(deletes)} working data connections")
+
+    def close(self) -> None:
+        """
+        Closes the connection to the snapshot database.
+        """
+        with self._lock:
+            self._connection.close()
+
+
+def _encode_value(value: Any) -> Any:
+    """
+    JSON encoder hook of the snapshot payloads: tags the typed values of `TYPE_DECODERS`
+    and stores any other value that is not JSON serializable as a string.
+    """
+    if isinstance(value, Decimal):
+        return {TYPE_TAG: "decimal", "value": str(value)}
+    if isinstance(value, datetime):
+        return {TYPE_TAG: "datetime", "value": value.isoformat()}
+    if isinstance(value, date):
+        return {TYPE_TAG: "date", "value": value.isoformat()}
+    if isinstance(value, time):
+        return {TYPE_TAG: "time", "value": value.isoformat()}
+    return str(value)
+
+
+def _decode_value(value: Dict[str, Any]) -> Any:
+    """
+    JSON decoder hook of the snapshot payloads: restores the values tagged by `_encode_value`.
+    """
+    tag = value.get(TYPE_TAG)
+    if len(value) != 2 or not isinstance(tag, str) or tag not in TYPE_DECODERS:
+        return value
+    return TYPE_DECODERS[tag](value["value"])
+
+
+def _state_of(working_data_connection: WorkingDataConnection) -> Tuple[Any, ...]:
+    """
+    Returns what tells whether an entry changed since it was saved, without encoding it.
+
+    The working data of an entry is replaced, not modified in place, when it
+    changes: the agent assigns new match and source dicts, and a query result
+    is stored with its digest. The state therefore holds the scalar fields and
+    the result digests, compared by value, and the match, source and result
+    objects, compared by identity (they are kept referenced, so their identity
+    cannot be reused). The metadata of an entry never changes after its creation.
+    """
+    return (
+        working_data_connection.status,
+        working_data_connection.expired_time,
+        working_data_connection.watermark,
+        working_data_connection.sent_digest,
+        working_data_connection.data_dict_result_digest,
+        working_data_connection.list_data_dict_query_result_digest,
+        working_data_connection.data_dict_match,
+        working_data_connection.data_dict_query_source,
+        working_data_connection.data_dict_result,
+        working_data_connection.list_data_dict_query_result,
+    )
+
+
+def _same_state(saved: Any, state: Tuple[Any, ...]) -> bool:
+    """
+    Returns whether two states of `_state_of` are the same.
+    """
+    return (saved is not None
+            and saved[:STATE_VALUES] == state[:STATE_VALUES]
+            and all(a is b for a, b in zip(saved[STATE_VALUES:], state[STATE_VALUES:])))
@@ -0,0 +1,154 @@
+from abc import abstractmethod
+from concurrent.futures import Future
+from typing import Any, Coroutine, Dict, List
+import asyncio
+
+from .base import BaseDatabase
+from .data import Query
+from ..orchestration.event_loop import run_coroutine
+
+
+class AsyncBaseDatabase(BaseDatabase):
+    """
+    Abstract base class for database clients built on an asyncio driver.
+
+    `AsyncBaseDatabase` keeps everything a `BaseDatabase` offers to agents:
+    `enqueue_query` returns a `concurrent.futures.Future`, and the queue,
+    priority lanes, result cache, single-flight collapsing, batching and
+    retries behave the same. Only the execution differs: queries run as
+    coroutines on the process-wide event loop (see `get_event_loop`) instead
+    of on a thread pool, so the number of concurrent in-flight queries is no
+    longer tied to the number of OS threads. The thread pool of `BaseDatabase`
+    is never used and therefore never starts a thread.
+
+    `config.max_workers` bounds the number of queries in flight at once; with
+    an async driver it can be raised to hundreds or thousands, the actual
+    number of database connections being bounded by the driver pool.
+
+    Result and failure callbacks run on the event loop thread and must not
+    block. `Query.cancel` cancels the coroutine of a running query, which the
+    driver turns into an abort of the running statement.
+
+    Subclasses must implement `_query_async`, `is_connected`, `connect` and
+    `close`. `connect` and `close` are synchronous, as they are called by the
+    orchestrator; they can use `_run_sync` to await driver coroutines.
+
+    Example:
+        >>> class MyAsyncDatabase(AsyncBaseDatabase):
+        ...     async def _query_async(self, task):
+        ...         async with self.pool.acquire() as conn:
+        ...             return await conn.fetchall(task.query, task.params)
+    """
+
+    # INTERNALS
+
+    def _run_query(self, task: Query) -> Future:
+        """
+        Schedules `_query_async` on the shared event loop.
+
+        The query can be interrupted by `Query.cancel` until the coroutine completes.
+
+        Args:
+            task (Query): The query to execute.
+
+        Returns:
+            Future: A `concurrent.futures.Future` resolved with the result of the query.
+        """
+        future = run_coroutine(self._query_async(task))
+        task.interrupt = future.cancel
+        return future
+
+    def _run_batch(self, tasks: List[Query]) -> Future:
+        """
+        Schedules `_execute_batch_async` on the shared event loop.
+
+        Args:
+            tasks (List[Query]): The queries of the group.
+
+        Returns:
+            Future: A `concurrent.futures.Future` resolved with the results of the group.
+        """
+        return run_coroutine(self._execute_batch_async(tasks))
+
+    async def _execute_batch_async(self, tasks: List[Query]) -> Dict[int, List[Dict[str, Any]]]:
+        """
+        Executes a batch group and routes the result rows back to each query.
+
+        Asynchronous counterpart of `BaseDatabase._execute_batch`.
+
+        Args:
+            tasks (List[Query]): The queries of the group.
+
+        Returns:
+            Dict[int, List[Dict[str, Any]]]: The result of each query, keyed by ``id(query)``.
+        """
+        statement = self._build_batch_statement(tasks)
+        if statement is None:
+            results = await self._query_batch_async(tasks)
+            return {id(task): result for task, result in zip(tasks, results)}
+        rows = await self._query_async(statement)
+        for task in tasks:
+            task.timings.update(statement.timings)
+        return self._demux_batch(tasks, rows)
+
+    async def _query_batch_async(self, tasks: List[Query]) -> List[List[Dict[str, Any]]]:
+        """
+        Executes a batch group without IN-list rewrite.
+
+        The default implementation runs the queries of the group concurrently.
+
+        Args:
+            tasks (List[Query]): The queries of the group.
+
+        Returns:
+            List[List[Dict[str, Any]]]: The result of each query, in the same order as `tasks`.
+
+        Raises:
+            Exception: If any query fails; the whole group is then retried query by query.
+        """
+        return list(await asyncio.gather(*(self._query_async(task) for task in tasks)))
+
+    def _query(self, task: Query) -> List[Dict[str, Any]]:
+        """
+        Executes a query synchronously by waiting for `_query_async`.
+
+        Provided for callers outside the event loop; it must never be called
+        from the event loop thread.
+
+        Args:
+            task (Query): The query to execute.
+
+        Returns:
+            List[Dict[str, Any]]: The result of the query.
+        """
+        return self._run_sync(self._query_async(task))
+
+    def _run_sync(self, coro: Coroutine[Any, Any, Any]) -> Any:
+        """
+        Runs a coroutine on the shared event loop and waits for its result.
+
+        Args:
+            coro (Coroutine[Any, Any, Any]): The coroutine to run.
+
+        Returns:
+            Any: The result of the coroutine.
+        """
+        return run_coroutine(coro).result()
+
+    @abstractmethod
+    async def _query_async(self, task: Query) -> List[Dict[str, Any]]:
+        """
+        Executes a single database query on the event loop and returns the results.
+
+        Args:
+            task (Query): The query object containing the SQL statement, parameters
+                and fetch settings.
+
+        Returns:
+            List[Dict[str, Any]]: The result of the query, as a `QueryResult`, or a
+            `ColumnarResult` when `task.result_format` is ``columnar``.
+
+        Raises:
+            Exception: If the query execution fails, which triggers the retry logic.
+        """
+        pass
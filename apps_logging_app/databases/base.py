@@ -1,14 +1,20 @@
 from abc import ABC, abstractmethod
-from typing import Dict, Any, List
+from typing import Dict, Any, List, Optional, Sequence, Tuple
 import logging
-from queue import Queue, Empty
-from threading import Thread, Event
+from queue import Empty, Full
+from threading import Thread, Event, Lock, BoundedSemaphore
 from concurrent.futures import ThreadPoolExecutor, Future
 import time
 import random
 
 from .model import BaseDatabaseConfig
-from .data import Query
+from .data import Query, QueryResult, QueryPriority, ColumnarResult, QueryTimeoutError, QueryCancelledError, ResultBuilder, normalize_batch_key
+from .cache import QUERY_RESULT_CACHE
+from .routing import EndpointRouter, is_endpoint_error
+from .reference import ReferenceTable
+from .metrics import QueryMetrics, stage_timer
+from ..orchestration.queues import PriorityLaneQueue
+from ..orchestration.delay_queue import DELAY_QUEUE, RateMeter
 
 class BaseDatabase(ABC):
     """
@@ -22,11 +28,42 @@ class BaseDatabase(ABC):
     Attributes:
         config (BaseDatabaseConfig): Configuration object containing database settings.
         logger (logging.Logger): Logger instance for database operations and query handling.
-        _queue (Queue): Thread-safe queue holding pending `Query` objects.
+        _queue (PriorityLaneQueue): Thread-safe queue holding pending `Query` objects, one lane per
+            `QueryPriority`, bounded by `config.max_queue_size`.
         _stop_event (Event): Event used to signal the dispatcher thread to stop.
         _executor (ThreadPoolExecutor): Executor for running queries concurrently.
         _dispatcher (Thread): Thread responsible for pulling queries from the queue and dispatching them.
+        _worker_slots (BoundedSemaphore): Free executor workers. The dispatcher only takes a query from the
+            queue when a worker is free, so pending queries wait in the bounded `_queue` rather than in the
+            unbounded work queue of the executor.
         orchestrator: Reference to an orchestrator managing database connections (set externally).
+        _in_flight (Dict[Any, List[Query]]): Queries currently executing, keyed by `Query.key()`. The first
+            query of each list is the one actually executed; the others wait for its result.
+        _in_flight_lock (Lock): Lock protecting `_in_flight` and `collapsed_queries`.
+        collapsed_queries (int): Number of queries that were not executed because an identical query was in flight.
+        _pending_batches (Dict[Any, List[Query]]): Queries waiting for their batch group to be submitted, keyed by `Query.batch_key()`.
+        _batch_deadlines (Dict[Any, float]): Monotonic time at which each pending batch group must be submitted.
+        _batches_lock (Lock): Lock protecting the pending batch groups.
+        batched_queries (int): Number of queries executed as part of a batch group.
+        batch_executions (int): Number of batch groups executed.
+        _queue_stats_lock (Lock): Lock protecting the queue counters.
+        rejected_queries (int): Number of queries refused because the queue was full.
+        dropped_queries (int): Number of queued queries replaced by a newer identical query (``drop_oldest`` policy).
+        dequeued_queries (int): Number of queries taken from the queue by the dispatcher.
+        queue_wait_total (float): Total time in seconds spent in the queue by the dequeued queries.
+        queue_wait_max (float): Longest time in seconds spent in the queue by a query.
+        _retries (RateMeter): Retries scheduled over the last minute.
+        delayed_retries (int): Number of failed queries waiting for their backoff deadline in `DELAY_QUEUE`.
+        timed_out_queries (int): Number of queries completed with a `QueryTimeoutError` because their deadline passed.
+        cancelled_queries (int): Number of queries completed with a `QueryCancelledError` because their issuer cancelled them.
+        router (EndpointRouter): Selects the primary or replica endpoint of each query and keeps their
+            in-flight and latency counters. Subclasses keep one connection pool per endpoint and run each
+            query inside ``with self.router.route() as endpoint``.
+        reference_tables (Dict[str, ReferenceTable]): In-memory snapshots of the tables declared in
+            `config.reference_tables`, keyed by name, served by `lookup`.
+        query_metrics (QueryMetrics): Per-query-name histograms of the queue wait, pool acquire, execute,
+            fetch and total times and of the row counts, and slow-query log (see `config.slow_query_threshold`).
+            Subclasses time the pool acquire, execute and fetch stages with `metrics.stage_timer`.
     
     """
 
@@ -40,22 +77,55 @@ class BaseDatabase(ABC):
 
         Initializes the following internal components:
             - `logger`: Logger instance scoped to the module for logging database events.
-            - `_queue`: Thread-safe queue for pending `Query` objects.
+            - `_queue`: Thread-safe priority-lane queue for pending `Query` objects, bounded by `config.max_queue_size`.
             - `_stop_event`: Event used to signal the dispatcher thread to stop.
             - `_executor`: ThreadPoolExecutor for concurrent query execution, limited by `config.max_workers`.
             - `_dispatcher`: Daemon thread responsible for dispatching queries from the queue to the executor.
+            - `_worker_slots`: Semaphore counting the free executor workers.
             - `orchestrator`: Initially set to None; intended to manage database connection state externally.
+            - `_in_flight`, `_in_flight_lock`, `collapsed_queries`: State used to collapse identical in-flight queries.
+            - `_pending_batches`, `_batch_deadlines`, `_batches_lock`, `batched_queries`, `batch_executions`: State used to batch queries.
+            - `_queue_stats_lock`, `rejected_queries`, `dropped_queries`, `dequeued_queries`, `queue_wait_total`, `queue_wait_max`: Queue depth and wait counters.
+            - `_retries`, `delayed_retries`: Retry rate and delayed retry backlog.
+            - `timed_out_queries`, `cancelled_queries`: Queries dropped past their deadline or cancelled.
+            - `router`: Routing of queries over the primary and replica endpoints, according to `config.routing_strategy`.
+            - `reference_tables`: The declared reference tables, loaded by `start()`.
+            - `query_metrics`: Per-query-name latency and row count histograms.
+            - `_columns_cache`: Lower-cased column names of each SQL text already executed, see `_columns`.
 
         Logs an informational message indicating that the database has been initialized.
         
         """
         self.config = config
         self.logger = logging.getLogger("__main__." + __name__)
-        self._queue = Queue()
+        self._queue = PriorityLaneQueue(maxsize=self.config.max_queue_size, lanes=len(QueryPriority))
         self._stop_event = Event()
         self._executor = ThreadPoolExecutor(max_workers=self.config.max_workers)
         self._dispatcher = Thread(target=self._dispatch, daemon=True)
+        self._worker_slots = BoundedSemaphore(self.config.max_workers)
         self.orchestrator = None
+        self._in_flight: Dict[Any, List[Query]] = {}
+        self._in_flight_lock = Lock()
+        self.collapsed_queries = 0
+        self._pending_batches: Dict[Any, List[Query]] = {}
+        self._batch_deadlines: Dict[Any, float] = {}
+        self._batches_lock = Lock()
+        self.batched_queries = 0
+        self.batch_executions = 0
+        self._queue_stats_lock = Lock()
+        self.rejected_queries = 0
+        self.dropped_queries = 0
+        self.dequeued_queries = 0
+        self.queue_wait_total = 0.0
+        self.queue_wait_max = 0.0
+        self._retries = RateMeter()
+        self.delayed_retries = 0
+        self.timed_out_queries = 0
+        self.cancelled_queries = 0
+        self.router = EndpointRouter.from_config(self.config, self._is_endpoint_error)
+        self.reference_tables: Dict[str, ReferenceTable] = {table.name: ReferenceTable(table) for table in self.config.reference_tables}
+        self.query_metrics = QueryMetrics(f"{self.config.type}-{self.config.name}", self.logger, self.config.slow_query_threshold)
+        self._columns_cache: Dict[str, Tuple[str, ...]] = {}
         self.logger.info(f"Initialized database: {self.config.type}-{self.config.name}")
 
     # PUBLIC API
@@ -70,16 +140,58 @@ class BaseDatabase(ABC):
 
         Once started, the dispatcher thread will keep running until `stop()`
         is called, allowing the database to handle incoming queries concurrently.
+
+        The first load of every reference table is queued at once; the tables
+        are then reloaded in the background (see `_refresh_reference_table`).
         """
         self._dispatcher.start()
+        for table in self.reference_tables.values():
+            self._refresh_reference_table(table)
+
+    def lookup(self, table: str, params: Dict[str, Any] | None) -> QueryResult | None:
+        """
+        Returns the rows of a reference table matching the given key values, from memory.
+
+        Args:
+            table (str): The name of a table declared in `config.reference_tables`.
+            params (Dict[str, Any] | None): Values of the key columns of the table, looked
+                up case-insensitively and compared as strings; other entries are ignored.
+
+        Returns:
+            QueryResult | None: The matching rows (possibly none), or None if the table has
+            not been loaded yet.
+
+        Raises:
+            KeyError: If no reference table has this name.
+        """
+        return self.reference_tables[table].lookup(params)
 
 
-    def enqueue_query(self, query: Query) -> Future[List[Dict[str, Any]]]:
+    def enqueue_query(self, query: Query, force: bool = False) -> Future[List[Dict[str, Any]]]:
         """
         Adds a database query to the internal queue for asynchronous execution.
 
+        Queries declaring a `cache_ttl` are first looked up in the process-wide
+        `QUERY_RESULT_CACHE`: on a hit, the returned `Future` is already resolved
+        with the cached result and the query is not enqueued. The cached result is
+        shared with every caller of the same query and must not be modified.
+
+        Queries are queued in the lane of their `priority`, so that queries of
+        error data connections are dispatched before routine refreshes. When
+        `config.max_queue_size` is set and the queue is full, the
+        `config.queue_full_policy` applies:
+            - ``block``: waits up to `config.queue_put_timeout` seconds for space.
+            - ``reject``: fails at once.
+            - ``drop_oldest``: replaces the oldest queued query with the same SQL text
+              and bind values; its `Future` receives the result of the new query. If
+              no such query is queued, the query is rejected.
+
         Args:
             query (Query): The query object containing the SQL (or equivalent) statement, parameters, and a `Future` to hold the result.
+            force (bool, optional): Queue the query even if the queue is full, without applying
+                `config.queue_full_policy`. Used for internal queries that must neither wait for
+                space nor be lost, such as the reference table refreshes, which run on the shared
+                `DELAY_QUEUE` timer thread. Defaults to False.
 
         Returns:
             Future[List[Dict[str, Any]]]: A `Future` object that will eventually
@@ -87,20 +199,52 @@ class BaseDatabase(ABC):
             if the query fails.
 
         Raises:
-            Exception: If the query cannot be added to the queue, e.g., if the queue is full or another error occurs during insertion.
+            queue.Full: If the queue is full and the query could not be queued according to `config.queue_full_policy`.
+            Exception: If another error occurs during insertion.
 
         Notes:
             - The query is processed asynchronously by the dispatcher thread and executed using the thread pool executor.
             - The returned `Future` allows callers to wait for or retrieve the result once the query has been executed.
         
         """
+        if query.cache_ttl:
+            cached = QUERY_RESULT_CACHE.get(self._cache_key(query))
+            if cached is not None:
+                query.future.set_result(cached)
+                self.logger.debug(f"Client DB {self.config.type}-{self.config.name}: Query served from cache: {query.name}")
+                return query.future
+
+        query.on_cancel = self._cancel_query
+        query.enqueued_at = time.monotonic()
         try:
-            self._queue.put(query)
-            return query.future
+            if force:
+                dropped = self._queue.put(query, lane=query.priority, force=True)
+            elif self.config.queue_full_policy == "drop_oldest":
+                key = query.key()
+                dropped = self._queue.put(query, lane=query.priority, evict=lambda queued: queued.key() == key)
+            else:
+                dropped = self._queue.put(
+                    query,
+                    lane=query.priority,
+                    block=self.config.queue_full_policy == "block",
+                    timeout=self.config.queue_put_timeout
+                )
+        except Full:
+            with self._queue_stats_lock:
+                self.rejected_queries += 1
+            self.logger.warning(f"Client DB {self.config.type}-{self.config.name}: Queue full, query rejected: {query.name}")
+            raise
         except Exception as e:
-            self.logger.error(f"Client DB {self.config.type}-{self.config.name}: Queue full or error putting query: {e}")
+            self.logger.error(f"Client DB {self.config.type}-{self.config.name}: Error putting query: {e}")
             raise
 
+        if dropped is not None:
+            with self._queue_stats_lock:
+                self.dropped_queries += 1
+            query.future.add_done_callback(lambda f, dropped=dropped: self._chain_future(f, dropped.future))
+            self.logger.debug(f"Client DB {self.config.type}-{self.config.name}: Queue full, oldest identical query replaced: {query.name}")
+        return query.future
+
     def stop(self, timeout: float | None = None) -> None:
         """
         Gracefully stops the database dispatcher and shuts down resources.
@@ -125,6 +269,76 @@ class BaseDatabase(ABC):
         self.close()
         self.logger.info(f"Database {self.config.type}-{self.config.name} shut down")
 
+    def invalidate_cache(self, query: str | None = None, params: Dict[str, Any] | None = None) -> int:
+        """
+        Removes cached results of this database from the query result cache.
+
+        Args:
+            query (str | None, optional): Only remove results of this SQL text. Defaults to None (all queries).
+            params (Dict[str, Any] | None, optional): Only remove results for these bind values. Defaults to None.
+
+        Returns:
+            int: The number of removed cache entries.
+        """
+        return QUERY_RESULT_CACHE.invalidate(database=f"{self.config.type}-{self.config.name}", query=query, params=params)
+
+    def get_metrics(self) -> Dict[str, Any]:
+        """
+        Returns a snapshot of the dispatcher counters of this database.
+
+        Returns:
+            Dict[str, Any]: Queue depth (total and per priority lane), queue bound,
+            rejected and dropped queries, average and maximum queue wait in seconds,
+            retries per second over the last minute, failed queries waiting for
+            their retry deadline, timed out and cancelled queries, number of distinct queries in flight, of queries collapsed onto an
+            identical in-flight query, of queries waiting in batch groups, of
+            batched queries and of batch executions, the in-flight, latency and
+            health counters of each endpoint and of each reference table, and the
+            latency and row count histograms of each query name (see `get_query_metrics`).
+        """
+        lane_sizes = self._queue.lane_sizes()
+        with self._queue_stats_lock, self._in_flight_lock, self._batches_lock:
+            return {
+                "queued_queries": sum(lane_sizes),
+                "queued_queries_by_priority": {priority.name.lower(): lane_sizes[priority] for priority in QueryPriority},
+                "max_queue_size": self.config.max_queue_size,
+                "rejected_queries": self.rejected_queries,
+                "dropped_queries": self.dropped_queries,
+                "queue_wait_avg": self.queue_wait_total / self.dequeued_queries if self.dequeued_queries else 0.0,
+                "queue_wait_max": self.queue_wait_max,
+                "retries_per_second": self._retries.rate(),
+                "delayed_retries": self.delayed_retries,
+                "timed_out_queries": self.timed_out_queries,
+                "cancelled_queries": self.cancelled_queries,
+                "in_flight_queries": len(self._in_flight),
+                "collapsed_queries": self.collapsed_queries,
+                "pending_batched_queries": sum(len(group) for group in self._pending_batches.values()),
+                "batched_queries": self.batched_queries,
+                "batch_executions": self.batch_executions,
+                "endpoints": self.router.get_metrics(),
+                "reference_tables": {name: table.get_metrics() for name, table in self.reference_tables.items()},
+                **self.query_metrics.get_metrics(),
+            }
+
+    def get_query_metrics(self, name: str | None = None) -> Dict[str, Any]:
+        """
+        Returns the latency and row count histograms of the executed queries.
+
+        Args:
+            name (str | None, optional): Name of a query. Defaults to None (every query).
+
+        Returns:
+            Dict[str, Any]: For each query name (``unnamed`` for queries without name), the
+            completed and failed queries and the count, average, maximum and 50th/95th/99th
+            percentiles of the ``queue_wait``, ``pool_acquire``, ``execute``, ``fetch`` and
+            ``total`` times in seconds and of the ``rows`` returned. With `name`, only the
+            histograms of that query, empty if it never completed.
+        """
+        queries = self.query_metrics.get_metrics()["queries"]
+        if name is not None:
+            return queries.get(name, {})
+        return queries
+
     @abstractmethod
     def is_connected(self) -> bool:
         """
@@ -188,86 +402,715 @@ class BaseDatabase(ABC):
 
         This internal method runs in the `_dispatcher` daemon thread. It monitors
         the internal `_queue` for incoming `Query` objects and executes them
-        asynchronously using the `_executor` thread pool.
+        asynchronously using the `_executor` thread pool. Queries are taken
+        from the highest-priority non-empty lane first.
+
+        A query is only taken from the queue when an executor worker is free, so
+        that the depth of `_queue` reflects the real backlog and its bound applies.
 
         For each query:
-            - Ensures the database connection via the `orchestrator`.
-            - Submits the query to `_query` for execution.
-            - Attaches a callback (`_callback`) to handle the result, exceptions, and retry logic.
+            - Completes it without executing it if it was cancelled or its deadline has
+              passed while it was queued (see `_complete_stale`).
+            - Collapses it onto an identical query (same SQL text and bind values) already
+              in flight, if any: the query is not executed and its `Future` receives the
+              result or the error of the in-flight one.
+            - If the query declares `batch` settings, adds it to the pending group of
+              queries sharing its SQL text and non-key parameters. A group is submitted to
+              `_execute_batch` when it reaches `batch.max_size` queries or when the oldest
+              query has waited `batch.window_ms` milliseconds.
+            - Otherwise ensures the database connection via the `orchestrator` and submits
+              the query to `_query` for execution.
+            - Attaches a callback to handle the result, exceptions, and retry logic
+              (see `_on_query_done`).
 
         Retry Logic:
             - If a query fails, it checks `task.retries` against `config.max_retries`.
-            - Retries the query with exponential backoff and random jitter.
+            - Retries the query with exponential backoff and random jitter, through the shared
+              `DELAY_QUEUE` so that no worker is held during the backoff.
             - Marks the orchestrator as disconnected if an error occurs.
             - Sets the exception on the `Query.future` if maximum retries are reached.
+            - Queries of a failed batch are retried one by one, without batching.
 
         Notes:
             - This method is intended to be run in a separate thread and should not be called directly by external code.
-            - Query completion, retry handling, and logging are all managed internally via the `_callback` function.
+            - Query completion, retry handling, and logging are all managed internally via `_on_query_done`.
             - `_queue.task_done()` is called after each query to signal completion to `Queue.join()`.
+            - Pending batch groups are submitted when the dispatcher stops.
         
         """
         self.orchestrator.ensure_connected()
 
         while not self._stop_event.is_set():
+            if not self._worker_slots.acquire(timeout=self._next_dispatch_timeout()):
+                self._flush_batches()
+                continue
             try:
-                task: Query = self._queue.get(timeout=0.5)
+                task: Query = self._queue.get(timeout=self._next_dispatch_timeout())
             except Empty:
+                self._worker_slots.release()
+                self._flush_batches()
                 continue
 
-            self.orchestrator.ensure_connected()
-            future = self._executor.submit(self._query, task)
-            self.logger.info(f"Client DB {self.config.type}-{self.config.name}: Query dispatched: {task.query}")
-           
-            def _callback(f, task=task):
-                """
-                Callback function executed when a query future completes.
-
-                Handles the result, exceptions, and retry logic for a single `Query`.
-
-                Args:
-                    f (Future): The `Future` object returned by the thread pool executor
-                        for the submitted query.
-                    task (Query): The query object associated with this future.
-
-                Behavior:
-                    - If the query succeeds, sets the result on `task.future` and logs completion.
-                    - If the query fails:
-                        - Logs a warning and marks the orchestrator as disconnected.
-                        - Checks if the query can be retried based on `task.retries` and `config.max_retries`.
-                        - Retries the query with exponential backoff plus random jitter.
-                        - If maximum retries are reached, sets the exception on `task.future`.
-                    - Calls `_queue.task_done()` in the `finally` block to signal that the query has been processed, regardless of success or failure.
-
-                Notes:
-                    - This function is intended to be used as a callback for `Future.add_done_callback`.
-                    - Retry delays use the formula `2 ** retries + random.uniform(0, 10)` seconds.
-                    - Ensures that the queue and future are always properly updated.
-                
-                """
-                try:
-                    result = f.result()
-                    task.future.set_result(result)
-                    self.logger.info(f"Client DB {self.config.type}-{self.config.name}: Query completed: {task.query}")
-                except Exception as e:
-                    self.logger.warning(f"Client DB {self.config.type}-{self.config.name}: Query failed: {task.query}: {e}")
-                    self.orchestrator.mark_disconnected()
-
-                    retries = task.retries
-
-                    if retries < self.config.max_retries:
-                        task.retries += 1
-                        backoff = (2 ** retries) + random.uniform(0, 10)
-                        self.logger.info(f"Client DB {self.config.type}-{self.config.name}: Retrying query in {backoff} seconds: {task.query}")
-                        time.sleep(backoff)
-                        self._queue.put(task)
-                    else:
-                        self.logger.error(f"Client DB {self.config.type}-{self.config.name}: Max retry reached for query: {task.query}")
-                        task.future.set_exception(e)
-                finally:
-                    self._queue.task_done()
-            
-            future.add_done_callback(_callback)
+            self._record_queue_wait(task)
+            stale = self._stale_error(task)
+            if stale is not None:
+                self._worker_slots.release()
+                self._complete_stale(task, stale)
+                self._queue.task_done()
+            elif not self._register_in_flight(task):
+                self._worker_slots.release()
+                self._queue.task_done()
+            elif task.batch and task.retries == 0:
+                self._worker_slots.release()
+                self._add_to_batch(task)
+            else:
+                self.orchestrator.ensure_connected()
+                task.dispatched_at = time.monotonic()
+                future = self._run_query(task)
+                self.logger.debug(f"Client DB {self.config.type}-{self.config.name}: Query dispatched: {task.query}")
+                future.add_done_callback(lambda f, task=task: self._on_query_done(f, task))
+
+            self._flush_batches()
+
+        self._flush_batches(force=True)
+
+    def _on_query_done(self, f: Future, task: Query) -> None:
+        """
+        Callback function executed when a query future completes.
+
+        Handles the result, exceptions, and retry logic for a single `Query`.
+
+        Args:
+            f (Future): The `Future` object returned by the thread pool executor
+                for the submitted query.
+            task (Query): The query object associated with this future.
+
+        Behavior:
+            - If the query succeeds, stores the result in the query result cache when the query declares a `cache_ttl`, sets the result on `task.future` and on the futures of the collapsed identical queries, and records its timings (see `QueryMetrics.record`).
+            - If the query fails, hands it to `_on_query_failed` for retry handling.
+            - Frees the executor worker slot and calls `_queue.task_done()` in the `finally` block to signal that the query has been processed, regardless of success or failure.
+
+        Notes:
+            - This function is intended to be used as a callback for `Future.add_done_callback`.
+            - Ensures that the queue and future are always properly updated.
+        
+        """
+        try:
+            result = f.result()
+            self._on_query_succeeded(task, result)
+        except Exception as e:
+            self._on_query_failed(task, e)
+        finally:
+            self._worker_slots.release()
+            self._queue.task_done()
+
+    def _on_query_succeeded(self, task: Query, result: List[Dict[str, Any]]) -> None:
+        """
+        Completes a query that executed successfully.
+
+        Args:
+            task (Query): The executed query.
+            result (List[Dict[str, Any]]): Its result rows.
+        """
+        if task.cache_ttl:
+            QUERY_RESULT_CACHE.put(self._cache_key(task), result, task.cache_ttl)
+        self._complete_in_flight(task, result=result)
+        self.query_metrics.record(task, result)
+        self.logger.debug(f"Client DB {self.config.type}-{self.config.name}: Query completed: {task.query}")
+
+    def _on_query_failed(self, task: Query, e: Exception) -> None:
+        """
+        Retries a failed query or completes it with its error.
+
+        Behavior:
+            - A query that was cancelled or whose deadline has passed is not retried and
+              completes with a `QueryCancelledError` or `QueryTimeoutError`.
+            - Logs a warning and marks the orchestrator as disconnected.
+            - Checks if the query can be retried based on `task.retries` and `config.max_retries`.
+            - Schedules the query on the shared `DELAY_QUEUE`, which puts it back in the
+              queue after an exponential backoff plus random jitter. The worker thread is
+              not held while waiting.
+            - If maximum retries are reached, sets the exception on `task.future` and on the futures of the collapsed identical queries.
+
+        Notes:
+            - Retry delays use the formula `2 ** retries + random.uniform(0, 10)` seconds.
+            - Retried queries are queued even if the queue is full, so that they are never lost.
+
+        Args:
+            task (Query): The failed query.
+            e (Exception): The error raised by the execution.
+        """
+        stale = self._stale_error(task)
+        if stale is not None:
+            self._complete_stale(task, stale)
+            return
+
+        self.logger.warning(f"Client DB {self.config.type}-{self.config.name}: Query failed: {task.query}: {e}")
+        self.orchestrator.mark_disconnected()
+
+        retries = task.retries
+
+        if retries < self.config.max_retries:
+            task.retries += 1
+            backoff = (2 ** retries) + random.uniform(0, 10)
+            self.logger.info(f"Client DB {self.config.type}-{self.config.name}: Retrying query in {backoff} seconds: {task.query}")
+            self._retries.mark()
+            with self._queue_stats_lock:
+                self.delayed_retries += 1
+            DELAY_QUEUE.schedule(backoff, lambda task=task, e=e: self._requeue(task, e))
+        else:
+            self.logger.error(f"Client DB {self.config.type}-{self.config.name}: Max retry reached for query: {task.query}")
+            self._complete_in_flight(task, exception=e)
+            self.query_metrics.record(task, failed=True)
+
+    def _requeue(self, task: Query, e: Exception) -> None:
+        """
+        Puts a failed query back in the queue once its backoff has elapsed.
+
+        Runs on the `DELAY_QUEUE` timer thread. If the database was stopped in
+        the meantime, the query is completed with its last error instead.
+
+        Args:
+            task (Query): The query to retry.
+            e (Exception): The error of its last execution.
+        """
+        with self._queue_stats_lock:
+            self.delayed_retries -= 1
+        if self._stop_event.is_set():
+            self._complete_in_flight(task, exception=e)
+            return
+        task.enqueued_at = time.monotonic()
+        task.timings = {}
+        self._queue.put(task, lane=task.priority, force=True)
+
+    def _refresh_reference_table(self, table: ReferenceTable) -> None:
+        """
+        Queues the query loading a reference table.
+
+        The query goes through the queue like any other, so it uses the
+        workers, routing and retries of the database. It is queued even if the
+        queue is full (see `enqueue_query`), since this runs on the shared
+        `DELAY_QUEUE` timer thread, which must not wait for space: that would
+        hold back every retry scheduled in the process. When it completes,
+        `_on_reference_table_loaded` swaps in the new snapshot and schedules
+        the next refresh on `DELAY_QUEUE`. Nothing is done once the database
+        is stopped.
+
+        Args:
+            table (ReferenceTable): The table to reload.
+        """
+        if self._stop_event.is_set():
+            return
+        query = Query(table.config.query, {}, name=f"reference-{table.config.name}")
+        try:
+            future = self.enqueue_query(query, force=True)
+        except Exception as e:
+            self._on_reference_table_loaded(table, query.future, error=e)
+            return
+        future.add_done_callback(lambda f, table=table: self._on_reference_table_loaded(table, f))
+
+    def _on_reference_table_loaded(self, table: ReferenceTable, f: Future, error: Exception | None = None) -> None:
+        """
+        Swaps in the snapshot of a reference table and schedules its next refresh.
+
+        A failed load keeps the previous snapshot.
+
+        Args:
+            table (ReferenceTable): The reloaded table.
+            f (Future): The future of the loading query.
+            error (Exception | None, optional): The error raised when queuing the query, if any. Defaults to None.
+        """
+        try:
+            if error is not None:
+                raise error
+            table.swap(f.result())
+            self.logger.info(f"Client DB {self.config.type}-{self.config.name}: Reference table loaded: {table.config.name}")
+        except Exception as e:
+            table.mark_failed()
+            self.logger.warning(f"Client DB {self.config.type}-{self.config.name}: Reference table refresh failed: {table.config.name}: {e}")
+        if not self._stop_event.is_set():
+            DELAY_QUEUE.schedule(table.config.refresh_interval, lambda table=table: self._refresh_reference_table(table))
+
+    def _is_endpoint_error(self, error: BaseException) -> bool:
+        """
+        Returns whether an error raised by a query counts as a failure of its endpoint.
+
+        The default implementation is `routing.is_endpoint_error`. Subclasses can
+        override it to recognize the error codes of their driver, e.g. to exclude
+        the errors raised when a statement is interrupted.
+
+        Args:
+            error (BaseException): The error raised while the query ran.
+
+        Returns:
+            bool: `True` if the error counts against the health of the endpoint.
+        """
+        return is_endpoint_error(error)
+
+    def _stale_error(self, task: Query) -> Optional[Exception]:
+        """
+        Returns the error completing a query that must not be executed anymore.
+
+        Args:
+            task (Query): The query to check.
+
+        Returns:
+            Optional[Exception]: A `QueryCancelledError` if the query was cancelled, a
+            `QueryTimeoutError` if its deadline has passed, otherwise None.
+        """
+        if task.cancelled:
+            return QueryCancelledError(f"Query cancelled: {task.name}")
+        remaining = task.remaining()
+        if remaining is not None and remaining <= 0:
+            return QueryTimeoutError(f"Query deadline exceeded: {task.name}")
+        return None
+
+    def _cancel_query(self, task: Query) -> None:
+        """
+        Cancels a queued or running query (see `Query.cancel`).
+
+        A query collapsed onto an identical in-flight query is detached from its
+        group, and the executed query of a group is detached while other queries
+        still wait for its result: in both cases only the cancelled query is
+        completed with a `QueryCancelledError` and the execution goes on. The
+        execution is aborted (see `Query.abort`) only when nobody else waits for
+        it, including when the last waiter of a detached execution is cancelled.
+
+        Args:
+            task (Query): The query to cancel.
+        """
+        abort: Optional[Query] = task
+        with self._in_flight_lock:
+            group = self._in_flight.get(task.key())
+            if group is not None and any(query is task for query in group):
+                waiting = [query for query in group if query is not task and not query.future.done()]
+                if group[0] is not task:
+                    group.remove(task)
+                    abort = group[0] if not waiting else None
+                elif waiting:
+                    abort = None
+        if abort is task:
+            task.abort()
+            return
+
+        with self._queue_stats_lock:
+            self.cancelled_queries += 1
+        if not task.future.done():
+            task.future.set_exception(QueryCancelledError(f"Query cancelled: {task.name}"))
+        self.logger.debug(f"Client DB {self.config.type}-{self.config.name}: Query detached from its in-flight group: {task.name}")
+        if abort is not None:
+            abort.abort()
+
+    def _complete_stale(self, task: Query, error: Exception) -> None:
+        """
+        Completes a cancelled or timed out query with its error and counts it.
+
+        When the query is the one executed for its key (a retry, or a query that
+        failed), the queries collapsed onto it are completed with the same error,
+        except on a timeout: the deadline of the executed query is not the one
+        of the queries collapsed onto it, so those whose own deadline has not
+        passed are detached, as in `_cancel_query`, and the first of them is
+        queued again to be executed for the others.
+
+        Args:
+            task (Query): The cancelled or timed out query.
+            error (Exception): The error returned by `_stale_error`.
+        """
+        with self._queue_stats_lock:
+            if isinstance(error, QueryCancelledError):
+                self.cancelled_queries += 1
+            else:
+                self.timed_out_queries += 1
+        leader: Optional[Query] = None
+        with self._in_flight_lock:
+            key = task.key()
+            group = self._in_flight.get(key)
+            executed = group is not None and group[0] is task
+            if executed and isinstance(error, QueryTimeoutError) and not self._stop_event.is_set():
+                waiting = [query for query in group[1:] if not query.future.done() and self._stale_error(query) is None]
+                if waiting:
+                    self._in_flight[key] = waiting
+                    leader = waiting[0]
+                    group = [query for query in group if query not in waiting]
+        if leader is not None:
+            for query in group:
+                if not query.future.done():
+                    query.future.set_exception(self._stale_error(query) or error)
+            leader.enqueued_at = time.monotonic()
+            leader.timings = {}
+            self._queue.put(leader, lane=leader.priority, force=True)
+            self.logger.debug(f"Client DB {self.config.type}-{self.config.name}: {error}, query queued again for the queries collapsed onto it: {leader.name}")
+            return
+        if executed:
+            self._complete_in_flight(task, exception=error)
+        elif not task.future.done():
+            task.future.set_exception(error)
+        self.logger.debug(f"Client DB {self.config.type}-{self.config.name}: {error}")
+
+    def _record_queue_wait(self, task: Query) -> None:
+        """
+        Updates the queue wait counters with the time a query spent in the queue.
+
+        Args:
+            task (Query): The query just taken from the queue.
+        """
+        if task.enqueued_at is None:
+            return
+        wait = time.monotonic() - task.enqueued_at
+        task.timings["queue_wait"] = wait
+        with self._queue_stats_lock:
+            self.dequeued_queries += 1
+            self.queue_wait_total += wait
+            self.queue_wait_max = max(self.queue_wait_max, wait)
+
+    @staticmethod
+    def _chain_future(source: Future, target: Future) -> None:
+        """
+        Copies the outcome of a completed future onto another future.
+
+        Args:
+            source (Future): The completed future.
+            target (Future): The future to resolve, left untouched if already done.
+        """
+        if target.done():
+            return
+        if source.exception() is not None:
+            target.set_exception(source.exception())
+        else:
+            target.set_result(source.result())
+
+    def _next_dispatch_timeout(self) -> float:
+        """
+        Returns how long the dispatcher may wait for a new query.
+
+        Returns:
+            float: At most 0.5 seconds, less if a pending batch group is due earlier.
+        """
+        with self._batches_lock:
+            if not self._batch_deadlines:
+                return 0.5
+            return min(0.5, max(0.0, min(self._batch_deadlines.values()) - time.monotonic()))
+
+    def _add_to_batch(self, task: Query) -> None:
+        """
+        Adds a query to the pending group of its batch key.
+
+        The group deadline is set by the first query of the group, from its
+        `batch.window_ms`. A group reaching `batch.max_size` is submitted at once.
+
+        Args:
+            task (Query): A query declaring `batch` settings.
+        """
+        key = task.batch_key()
+        with self._batches_lock:
+            group = self._pending_batches.setdefault(key, [])
+            if not group:
+                self._batch_deadlines[key] = time.monotonic() + task.batch.window_ms / 1000
+            group.append(task)
+            full = len(group) >= task.batch.max_size
+        if full:
+            self._submit_batch(key)
+
+    def _flush_batches(self, force: bool = False) -> None:
+        """
+        Submits the pending batch groups whose deadline has passed.
+
+        Args:
+            force (bool, optional): Submit every pending group regardless of its deadline. Defaults to False.
+        """
+        now = time.monotonic()
+        with self._batches_lock:
+            due = [key for key, deadline in self._batch_deadlines.items() if force or deadline <= now]
+        for key in due:
+            self._submit_batch(key)
+
+    def _submit_batch(self, key: Any) -> None:
+        """
+        Submits a pending batch group to the executor.
+
+        Args:
+            key (Any): The batch key of the group, as returned by `Query.batch_key()`.
+        """
+        with self._batches_lock:
+            tasks = self._pending_batches.pop(key, [])
+            self._batch_deadlines.pop(key, None)
+        if not tasks:
+            return
+
+        self._worker_slots.acquire()
+        self.orchestrator.ensure_connected()
+        with self._batches_lock:
+            self.batched_queries += len(tasks)
+            self.batch_executions += 1
+        now = time.monotonic()
+        for task in tasks:
+            task.dispatched_at = now
+        future = self._run_batch(tasks)
+        self.logger.debug(f"Client DB {self.config.type}-{self.config.name}: Batch of {len(tasks)} queries dispatched: {tasks[0].query}")
+
+        def _callback(f: Future, tasks: List[Query] = tasks) -> None:
+            """
+            Callback function executed when a batch future completes.
+
+            On success, each query of the group is completed with its own rows. On
+            failure, each query goes through the retry logic of `_on_query_failed`
+            and is retried on its own. `_queue.task_done()` is called once per query,
+            and the executor worker slot of the group is freed.
+            """
+            try:
+                results = f.result()
+            except Exception as e:
+                results = None
+                error = e
+            try:
+                for task in tasks:
+                    try:
+                        if results is not None:
+                            self._on_query_succeeded(task, results[id(task)])
+                        else:
+                            self._on_query_failed(task, error)
+                    finally:
+                        self._queue.task_done()
+            finally:
+                self._worker_slots.release()
+
+        future.add_done_callback(_callback)
+
+    def _execute_batch(self, tasks: List[Query]) -> Dict[int, List[Dict[str, Any]]]:
+        """
+        Executes a batch group and routes the result rows back to each query.
+
+        When the group declares an `in_list_template`, the group runs as a single
+        statement through `_query`: the ``{keys}`` placeholder is replaced with one
+        bind tuple per query and the rows are demultiplexed by `key_columns`.
+        Otherwise the group is handed to `_query_batch`. The IN-list statement
+        always fetches rows; the result of a query asking for the ``columnar``
+        format is converted after demultiplexing, and its stage timings are
+        copied to every query of the group.
+
+        Args:
+            tasks (List[Query]): The queries of the group, sharing SQL text and non-key parameters.
+
+        Returns:
+            Dict[int, List[Dict[str, Any]]]: The result of each query, keyed by ``id(query)``.
+        """
+        statement = self._build_batch_statement(tasks)
+        if statement is None:
+            return {id(task): result for task, result in zip(tasks, self._query_batch(tasks))}
+        rows = self._query(statement)
+        for task in tasks:
+            task.timings.update(statement.timings)
+        return self._demux_batch(tasks, rows)
+
+    def _build_batch_statement(self, tasks: List[Query]) -> Query | None:
+        """
+        Builds the single IN-list statement of a batch group.
+
+        Args:
+            tasks (List[Query]): The queries of the group.
+
+        Returns:
+            Query | None: The statement, or None if the group declares no `in_list_template`.
+        """
+        batch = tasks[0].batch
+        if not batch.in_list_template:
+            return None
+
+        params = {k: v for k, v in (tasks[0].params or {}).items() if k not in batch.key_params}
+        tuples = []
+        for i, task in enumerate(tasks):
+            names = []
+            for j, param in enumerate(batch.key_params):
+                name = f"batch_key_{i}_{j}"
+                params[name] = task.params[param]
+                names.append(f":{name}")
+            tuples.append(names[0] if len(names) == 1 else f"({', '.join(names)})")
+        return Query(
+            batch.in_list_template.replace("{keys}", ", ".join(tuples)),
+            params,
+            name=tasks[0].name,
+            arraysize=tasks[0].arraysize,
+            prefetchrows=tasks[0].prefetchrows
+        )
+
+    def _demux_batch(self, tasks: List[Query], rows: List[Dict[str, Any]]) -> Dict[int, List[Dict[str, Any]]]:
+        """
+        Routes the rows of an IN-list statement back to the queries of its group.
+
+        Key columns and key parameters are compared through `normalize_batch_key`,
+        so that a row matches its query even when the driver returns the key with
+        another type than the bound parameter (e.g. ``Decimal('1.0')`` for ``1``).
+
+        Args:
+            tasks (List[Query]): The queries of the group.
+            rows (List[Dict[str, Any]]): The rows returned by the statement.
+
+        Returns:
+            Dict[int, List[Dict[str, Any]]]: The result of each query, keyed by ``id(query)``.
+        """
+        batch = tasks[0].batch
+        rows_by_key: Dict[tuple, QueryResult] = {}
+        for row in rows:
+            rows_by_key.setdefault(tuple(normalize_batch_key(row[column]) for column in batch.key_columns), QueryResult()).append_row(row)
+        samples = [next((row[column] for row in rows if row[column] is not None), None) for column in batch.key_columns]
+
+        results: Dict[int, List[Dict[str, Any]]] = {}
+        for task in tasks:
+            key = tuple(normalize_batch_key(task.params[param], like) for param, like in zip(batch.key_params, samples))
+            result = rows_by_key.get(key)
+            result = result.finalize() if result is not None else QueryResult([])
+            results[id(task)] = ColumnarResult.from_rows(result) if task.result_format == "columnar" else result
+        return results
+
+    def _query_batch(self, tasks: List[Query]) -> List[List[Dict[str, Any]]]:
+        """
+        Executes a batch group without IN-list rewrite.
+
+        The default implementation runs the queries one after the other on the
+        calling worker, so the whole group uses a single executor slot. Subclasses
+        can override it to use driver-level facilities, e.g. one pooled connection
+        and one prepared cursor for the whole group.
+
+        Args:
+            tasks (List[Query]): The queries of the group.
+
+        Returns:
+            List[List[Dict[str, Any]]]: The result of each query, in the same order as `tasks`.
+
+        Raises:
+            Exception: If any query fails; the whole group is then retried query by query.
+        """
+        return [self._query(task) for task in tasks]
+
+    def _run_query(self, task: Query) -> Future:
+        """
+        Starts the execution of a query and returns the future of its result.
+
+        The default implementation runs `_query` on the thread pool executor.
+        Subclasses can override it to run queries elsewhere, e.g. on an event loop.
+
+        Args:
+            task (Query): The query to execute.
+
+        Returns:
+            Future: A `concurrent.futures.Future` resolved with the result of `_query`.
+        """
+        return self._executor.submit(self._query, task)
+
+    def _run_batch(self, tasks: List[Query]) -> Future:
+        """
+        Starts the execution of a batch group and returns the future of its results.
+
+        Args:
+            tasks (List[Query]): The queries of the group.
+
+        Returns:
+            Future: A `concurrent.futures.Future` resolved with the results of `_execute_batch`.
+        """
+        return self._executor.submit(self._execute_batch, tasks)
+
+    def _register_in_flight(self, task: Query) -> bool:
+        """
+        Registers a query as in flight, or collapses it onto an identical in-flight query.
+
+        Args:
+            task (Query): The query taken from the queue.
+
+        Returns:
+            bool: `True` if the query must be executed (it is the first of its key, or
+            a retry of the in-flight one), `False` if it was collapsed and will be
+            completed together with the in-flight query.
+        """
+        key = task.key()
+        with self._in_flight_lock:
+            group = self._in_flight.get(key)
+            if group is None:
+                self._in_flight[key] = [task]
+                return True
+            if group[0] is task:
+                return True
+            group.append(task)
+            self.collapsed_queries += 1
+        self.logger.debug(f"Client DB {self.config.type}-{self.config.name}: Query collapsed onto in-flight query: {task.name}")
+        return False
+
+    def _complete_in_flight(self, task: Query, result: Any = None, exception: BaseException | None = None) -> None:
+        """
+        Resolves the future of an executed query and of the queries collapsed onto it.
+
+        Args:
+            task (Query): The executed query.
+            result (Any, optional): The query result, when it succeeded. Defaults to None.
+            exception (BaseException | None, optional): The final error, when it failed. Defaults to None.
+        """
+        with self._in_flight_lock:
+            group = self._in_flight.pop(task.key(), [task])
+        for query in group:
+            if query.future.done():
+                continue
+            if exception is not None:
+                query.future.set_exception(exception)
+            else:
+                query.future.set_result(result)
+
+    def _fetch(self, cur: Any, task: Query) -> List[Dict[str, Any]]:
+        """
+        Executes a query on a DB-API cursor and converts its rows.
+
+        The execute and fetch stages are timed on `task.timings`, and the rows
+        are read with ``fetchmany`` and converted by a `ResultBuilder`, so
+        that results are never materialized twice. Clients set the driver
+        specific settings of the cursor (fetch sizes, timeouts) before calling
+        it; clients of asynchronous drivers use `ResultBuilder` directly.
+
+        Args:
+            cur (Any): An open DB-API cursor.
+            task (Query): The query to execute.
+
+        Returns:
+            List[Dict[str, Any]]: The result built according to `task.result_format` and `task.streaming`.
+        """
+        with stage_timer(task, "execute"):
+            cur.execute(task.query, task.params or {})
+        columns = self._columns(task.query, cur.description or ())
+
+        with stage_timer(task, "fetch"):
+            result = ResultBuilder(task, columns)
+            while rows := cur.fetchmany(result.fetch_rows):
+                result.feed(rows)
+            return result.close()
+
+    def _columns(self, sql: str, description: Sequence[Sequence[Any]]) -> Tuple[str, ...]:
+        """
+        Returns the lower-cased column names of a statement, cached by SQL text.
+
+        The cached names are recomputed if the number of columns changed, e.g.
+        for a ``SELECT *`` on a table altered since the last execution.
+
+        Args:
+            sql (str): The SQL text of the statement.
+            description (Sequence[Sequence[Any]]): The DB-API ``cursor.description`` of the statement.
+
+        Returns:
+            Tuple[str, ...]: The column names, in the order of the row values.
+        """
+        columns = self._columns_cache.get(sql)
+        if columns is None or len(columns) != len(description):
+            columns = tuple(col[0].lower() for col in description)
+            self._columns_cache[sql] = columns
+        return columns
+
+    def _cache_key(self, query: Query):
+        """
+        Builds the query result cache key of a query executed on this database.
+
+        Args:
+            query (Query): The query.
+
+        Returns:
+            Hashable: The cache key, made of the database identifier, the SQL text, the normalized parameters and the result format.
+        """
+        return QUERY_RESULT_CACHE.make_key(f"{self.config.type}-{self.config.name}", query.query, query.params, query.result_format)
 
     @abstractmethod
     def _query(self, task: Query) -> List[Dict[str, Any]]:
@@ -278,6 +1121,10 @@ class BaseDatabase(ABC):
         query execution for the specific database type. It is called internally
         by the dispatcher in a worker thread.
 
+        Implementations should honour the fetch settings of the query
+        (`arraysize`, `prefetchrows`) when the driver supports them, and return
+        a `ColumnarResult` when `task.result_format` is ``columnar``.
+
         Args:
             task (Query): The query object containing the SQL (or equivalent)
                 statement, parameters, and metadata such as retry count.
@@ -0,0 +1,200 @@
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Optional, Tuple
+import threading
+import time
+
+from .data import normalize_params
+
+
+class QueryResultCache:
+    """
+    Thread-safe, size-bounded LRU cache of query results with per-entry TTL.
+
+    Entries are keyed on ``(database, SQL text, normalized bind parameters, result format)``,
+    where ``database`` is the ``"<type>-<name>"`` identifier of the database
+    instance. Each entry carries its own expiry time, so queries can declare
+    different time-to-live values. When the cache is full, the least recently
+    used entry is evicted; expired entries are dropped lazily when looked up.
+
+    Cached results are shared between all callers and must be treated as
+    read-only.
+
+    Attributes:
+        max_entries (int): Maximum number of entries kept in the cache.
+        _entries (OrderedDict): Cached results and their expiry times, in LRU order.
+        _lock (threading.Lock): Lock protecting entries and counters.
+        hits (int): Number of lookups served from the cache.
+        misses (int): Number of lookups not found or expired.
+        evictions (int): Number of entries evicted because the cache was full.
+        expirations (int): Number of entries dropped because their TTL elapsed.
+        invalidations (int): Number of entries removed through `invalidate`.
+
+    Example:
+        >>> cache = QueryResultCache(max_entries=1000)
+        >>> key = cache.make_key("oracle-sasdb", "SELECT 1 FROM dual", {})
+        >>> cache.put(key, [{"1": 1}], ttl=60)
+        >>> cache.get(key)
+        [{'1': 1}]
+    """
+
+    def __init__(self, max_entries: int = 10000) -> None:
+        """
+        Initializes an empty cache.
+
+        Args:
+            max_entries (int, optional): Maximum number of entries kept in the cache. Defaults to 10000.
+
+        Raises:
+            ValueError: If `max_entries` is less than or equal to 0.
+        """
+        if max_entries <= 0:
+            raise ValueError("Max entries must be greater than 0")
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[Hashable, Tuple[float, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+
+    # PUBLIC API
+
+    @staticmethod
+    def make_key(database: str, query: str, params: Optional[Dict[str, Any]], result_format: str = "rows") -> Tuple[str, str, Hashable, str]:
+        """
+        Builds the cache key of a query.
+
+        Args:
+            database (str): Identifier of the database instance, e.g. ``"oracle-sasdb_ciexpit_owner"``.
+            query (str): The SQL text.
+            params (Optional[Dict[str, Any]]): The bind parameters.
+            result_format (str, optional): The result format of the query. Defaults to ``rows``.
+
+        Returns:
+            Tuple[str, str, Hashable, str]: The cache key.
+        """
+        return (database, query, normalize_params(params), result_format)
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        """
+        Returns the cached result for a key, or None if missing or expired.
+
+        Args:
+            key (Hashable): A key built with `make_key`.
+
+        Returns:
+            Optional[Any]: The cached result, or None.
+        """
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            expires_at, result = entry
+            if expires_at <= now:
+                del self._entries[key]
+                self.expirations += 1
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return result
+
+    def put(self, key: Hashable, result: Any, ttl: float) -> None:
+        """
+        Stores a result for `ttl` seconds, evicting the least recently used entries if full.
+
+        Args:
+            key (Hashable): A key built with `make_key`.
+            result (Any): The query result to cache.
+            ttl (float): Time-to-live of the entry in seconds.
+        """
+        expires_at = time.monotonic() + ttl
+        with self._lock:
+            self._entries[key] = (expires_at, result)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate(self, database: Optional[str] = None, query: Optional[str] = None, params: Optional[Dict[str, Any]] = None) -> int:
+        """
+        Removes the entries matching all the given criteria.
+
+        Calling it without arguments empties the cache.
+
+        Args:
+            database (Optional[str], optional): Only remove entries of this database. Defaults to None.
+            query (Optional[str], optional): Only remove entries of this SQL text. Defaults to None.
+            params (Optional[Dict[str, Any]], optional): Only remove entries with these bind values. Defaults to None.
+
+        Returns:
+            int: The number of removed entries.
+        """
+        normalized_params = normalize_params(params) if params is not None else None
+        with self._lock:
+            keys = [
+                key for key in self._entries
+                if (database is None or key[0] == database)
+                and (query is None or key[1] == query)
+                and (normalized_params is None or key[2] == normalized_params)
+            ]
+            for key in keys:
+                del self._entries[key]
+            self.invalidations += len(keys)
+        return len(keys)
+
+    def clear(self) -> None:
+        """
+        Removes all entries and resets the counters.
+        """
+        with self._lock:
+            self._entries.clear()
+            self.hits = 0
+            self.misses = 0
+            self.evictions = 0
+            self.expirations = 0
+            self.invalidations = 0
+
+    def hit_ratio(self) -> float:
+        """
+        Returns the fraction of lookups served from the cache.
+
+        Returns:
+            float: Hits divided by lookups, or 0.0 if no lookup was made.
+        """
+        with self._lock:
+            lookups = self.hits + self.misses
+            return self.hits / lookups if lookups else 0.0
+
+    def get_metrics(self) -> Dict[str, Any]:
+        """
+        Returns a snapshot of the cache counters.
+
+        Returns:
+            Dict[str, Any]: Size, capacity, hits, misses, hit ratio, evictions, expirations and invalidations.
+        """
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "max_entries": self.max_entries,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": self.hits / lookups if lookups else 0.0,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "invalidations": self.invalidations,
+            }
+
+
+QUERY_RESULT_CACHE = QueryResultCache()
+"""
+Process-wide query result cache shared by all database instances.
+
+`BaseDatabase` looks up queries with a `cache_ttl` in this cache before
+enqueueing them, and stores their results after a successful execution.
+It can be inspected with `get_metrics()` and emptied with `invalidate()`.
+"""
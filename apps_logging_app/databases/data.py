@@ -1,5 +1,121 @@
-from typing import Any, Dict
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple, Hashable, TYPE_CHECKING
 from concurrent.futures import Future
+from datetime import date, datetime, time as dt_time
+from decimal import Decimal, InvalidOperation
+from enum import IntEnum
+import time
+
+from ..utils import ResultDigest
+
+if TYPE_CHECKING:
+    from ..agents.model import QueryConfig, QueryBatchConfig
+
+
+def normalize_params(params: Optional[Dict[str, Any]]) -> Tuple[Tuple[str, Hashable], ...]:
+    """
+    Returns a hashable, order-independent representation of query parameters.
+
+    Parameters are sorted by name; lists, tuples and sets become tuples and
+    nested dictionaries are normalized recursively. Values that still cannot
+    be hashed are replaced by their ``repr``.
+
+    Args:
+        params (Optional[Dict[str, Any]]): The bind parameters of a query.
+
+    Returns:
+        Tuple[Tuple[str, Hashable], ...]: The normalized parameters.
+    """
+    def _normalize(value: Any) -> Hashable:
+        if isinstance(value, dict):
+            return normalize_params(value)
+        if isinstance(value, (list, tuple)):
+            return tuple(_normalize(v) for v in value)
+        if isinstance(value, set):
+            return tuple(sorted(_normalize(v) for v in value))
+        try:
+            hash(value)
+            return value
+        except TypeError:
+            return repr(value)
+
+    return tuple(sorted((str(k), _normalize(v)) for k, v in (params or {}).items()))
+
+
+def normalize_batch_key(value: Any, like: Any = None) -> Hashable:
+    """
+    Returns the value of a batch key column in a form comparable across types.
+
+    Rows of an IN-list statement are routed back to their queries by comparing
+    the key columns of each row with the key parameters of each query, but the
+    driver does not return the type that was bound: an ``int`` parameter comes
+    back as a ``Decimal`` or a ``float``, a ``date`` as a ``datetime``. Numbers
+    are therefore compared as ``Decimal`` and datetimes at midnight as dates.
+    When `like` (a value of the column returned by the database) is given, a
+    parameter is first converted to its type: strings are parsed as numbers or
+    ISO dates, and non-string values are formatted as strings.
+
+    Args:
+        value (Any): The value of the column or of the parameter.
+        like (Any, optional): A value of the column, used to convert a parameter. Defaults to None.
+
+    Returns:
+        Hashable: The normalized value.
+
+    Example:
+        >>> normalize_batch_key(Decimal("1.0")) == normalize_batch_key(1)
+        True
+        >>> normalize_batch_key("2024-01-31", like=datetime(2024, 1, 1)) == normalize_batch_key(datetime(2024, 1, 31))
+        True
+    """
+    if like is not None and value is not None:
+        if isinstance(like, str) and not isinstance(value, str):
+            value = value.isoformat() if isinstance(value, (date, datetime)) else str(value)
+        elif isinstance(value, str) and not isinstance(like, str):
+            try:
+                if isinstance(like, (date, datetime)):
+                    value = datetime.fromisoformat(value.strip())
+                elif isinstance(like, (int, float, Decimal)) and not isinstance(like, bool):
+                    value = Decimal(value.strip())
+            except (ValueError, InvalidOperation):
+                pass
+    if isinstance(value, bool):
+        return value
+    if isinstance(value, (int, Decimal)):
+        return Decimal(value)
+    if isinstance(value, float):
+        return Decimal(repr(value))
+    if isinstance(value, datetime):
+        return value.date() if value.tzinfo is None and value.time() == dt_time() else value
+    try:
+        hash(value)
+        return value
+    except TypeError:
+        return repr(value)
+
+class QueryTimeoutError(TimeoutError):
+    """
+    Raised when a query is not completed before its deadline (see `QueryConfig.timeout`).
+    """
+
+
+class QueryCancelledError(Exception):
+    """
+    Raised when a query is cancelled by its issuer before completing (see `Query.cancel`).
+    """
+
+
+class QueryPriority(IntEnum):
+    """
+    Priority lane of a query in the database queue.
+
+    Lower values are dispatched first.
+
+    Attributes:
+        HIGH: Queries of error data connections, dispatched before any routine query.
+        NORMAL: Routine refresh queries.
+    """
+    HIGH = 0
+    NORMAL = 1
 
 class Query:
     """
@@ -14,14 +130,54 @@ class Query:
         params (Dict[str, Any]): A dictionary of parameters for the query.
         retries (int): The number of times the query has been retried.
         future (Future): A Future object representing the result of the query.
+        name (Optional[str]): Optional logical name of the query, used in logs and metrics.
+        cache_ttl (Optional[float]): Time-to-live in seconds of the result in the query result cache, or None to bypass the cache.
+        batch (Optional[QueryBatchConfig]): Batching settings, or None to execute the query on its own.
+        priority (QueryPriority): Priority lane of the query in the database queue.
+        arraysize (Optional[int]): Rows fetched per round-trip, or None for the driver default.
+        prefetchrows (Optional[int]): Rows returned with the execute round-trip, or None for the driver default.
+        result_format (str): ``rows`` for a `QueryResult`, ``columnar`` for a `ColumnarResult`.
+        enqueued_at (Optional[float]): Monotonic time at which the query was last queued, set by the database.
+        stream_chunk_rows (Optional[int]): Number of rows per chunk of a streamed result, or None to return the whole result.
+        on_chunk (Optional[Callable[[List[Dict[str, Any]], int, bool], None]]): Callback receiving each chunk of a
+            streamed result with its sequence number and whether it is the last one. Streaming is only enabled when
+            both `stream_chunk_rows` and `on_chunk` are set.
+        deadline (Optional[float]): Monotonic time by which the query must be completed, or None for no deadline.
+        cancelled (bool): Whether the query was cancelled by its issuer.
+        interrupt (Optional[Callable[[], None]]): Set by the database while the query executes, to abort the
+            running statement on `abort()`.
+        on_cancel (Optional[Callable[[Query], None]]): Set by the database when the query is queued, to handle
+            `cancel()` for the queries collapsed onto the same execution.
+        dispatched_at (Optional[float]): Monotonic time at which the query was last handed to an executor worker.
+        timings (Dict[str, float]): Time in seconds spent in each stage of the last attempt (see
+            `databases.metrics.STAGES`), filled by the database.
+        row_count (Optional[int]): Number of rows returned, set by the database when it cannot be
+            counted on the result (e.g. streamed results).
     """
-    def __init__(self, query: str, params: Dict[str, Any]) -> None:
+    def __init__(self, query: str, params: Dict[str, Any], name: Optional[str] = None, cache_ttl: Optional[float] = None,
+                 batch: Optional["QueryBatchConfig"] = None, priority: QueryPriority = QueryPriority.NORMAL,
+                 arraysize: Optional[int] = None, prefetchrows: Optional[int] = None, result_format: str = "rows",
+                 stream_chunk_rows: Optional[int] = None,
+                 on_chunk: Optional[Callable[[List[Dict[str, Any]], int, bool], None]] = None,
+                 timeout: Optional[float] = None) -> None:
         """
         Initializes a Query instance with the given query string and parameters.
 
         Args:
             query (str): The query string to be executed.
             params (Dict[str, Any]): A dictionary of parameters to use with the query.
+            name (Optional[str], optional): Logical name of the query. Defaults to None.
+            cache_ttl (Optional[float], optional): Time-to-live in seconds of the result in the query result cache. Defaults to None (no caching).
+            batch (Optional[QueryBatchConfig], optional): Batching settings. Defaults to None (no batching).
+            priority (QueryPriority, optional): Priority lane of the query. Defaults to `QueryPriority.NORMAL`.
+            arraysize (Optional[int], optional): Rows fetched per round-trip. Defaults to None (driver default).
+            prefetchrows (Optional[int], optional): Rows returned with the execute round-trip. Defaults to None (driver default).
+            result_format (str, optional): ``rows`` or ``columnar``. Defaults to ``rows``.
+            stream_chunk_rows (Optional[int], optional): Rows per chunk of a streamed result. Defaults to None (no streaming).
+            on_chunk (Optional[Callable[[List[Dict[str, Any]], int, bool], None]], optional): Chunk callback of a
+                streamed result. Defaults to None.
+            timeout (Optional[float], optional): Time in seconds from now by which the query must be completed.
+                Defaults to None (no deadline).
 
         Attributes:
             query (str): Stores the query string.
@@ -33,13 +189,471 @@ class Query:
         self.params = params
         self.retries = 0
         self.future: Future = Future()
+        self.name = name
+        self.cache_ttl = cache_ttl
+        self.batch = batch
+        self.priority = priority
+        self.arraysize = arraysize
+        self.prefetchrows = prefetchrows
+        self.result_format = result_format
+        self.stream_chunk_rows = stream_chunk_rows
+        self.on_chunk = on_chunk
+        self.deadline: Optional[float] = time.monotonic() + timeout if timeout else None
+        self.cancelled = False
+        self.interrupt: Optional[Callable[[], None]] = None
+        self.on_cancel: Optional[Callable[["Query"], None]] = None
+        self.enqueued_at: Optional[float] = None
+        self.dispatched_at: Optional[float] = None
+        self.timings: Dict[str, float] = {}
+        self.row_count: Optional[int] = None
+
+    @classmethod
+    def from_config(cls, cfg: "QueryConfig", params: Dict[str, Any], name: Optional[str] = None,
+                    priority: QueryPriority = QueryPriority.NORMAL,
+                    on_chunk: Optional[Callable[[List[Dict[str, Any]], int, bool], None]] = None) -> "Query":
+        """
+        Creates a Query from a query configuration and its bind parameters.
+
+        Per-query execution options declared in the configuration are copied
+        onto the query, so that the database client can honour them.
+
+        Args:
+            cfg (QueryConfig): The query configuration of a data connection.
+            params (Dict[str, Any]): The bind parameters of the query.
+            name (Optional[str], optional): Logical name of the query, usually the data connection name. Defaults to None.
+            priority (QueryPriority, optional): Priority lane of the query. Defaults to `QueryPriority.NORMAL`.
+            on_chunk (Optional[Callable[[List[Dict[str, Any]], int, bool], None]], optional): Chunk callback, used
+                when the configuration declares `stream_chunk_rows`. Defaults to None.
+
+        Returns:
+            Query: A new query initialized from the configuration.
+        """
+        return cls(
+            cfg.query,
+            params,
+            name=name,
+            cache_ttl=cfg.cache_ttl,
+            batch=cfg.batch,
+            priority=priority,
+            arraysize=cfg.arraysize,
+            prefetchrows=cfg.prefetchrows,
+            result_format=cfg.result_format,
+            stream_chunk_rows=cfg.stream_chunk_rows,
+            on_chunk=on_chunk,
+            timeout=cfg.timeout
+        )
+
+    @property
+    def streaming(self) -> bool:
+        """
+        bool: Whether the result of the query is delivered in chunks to `on_chunk`.
+        """
+        return bool(self.stream_chunk_rows and self.on_chunk)
+
+    def remaining(self) -> Optional[float]:
+        """
+        Returns the time left before the deadline of the query.
+
+        Returns:
+            Optional[float]: Seconds left, negative once the deadline has passed, or None
+            if the query has no deadline.
+        """
+        if self.deadline is None:
+            return None
+        return self.deadline - time.monotonic()
+
+    def call_timeout_ms(self) -> int:
+        """
+        Returns the driver call timeout enforcing the deadline of the query.
+
+        Database clients apply it to the connection before each execution, so
+        that a round-trip still running at the deadline is aborted by the driver.
+
+        Returns:
+            int: Milliseconds left before the deadline (at least 1), or 0 if the query
+            has no deadline.
+
+        Raises:
+            QueryTimeoutError: If the deadline has already passed.
+        """
+        remaining = self.remaining()
+        if remaining is None:
+            return 0
+        if remaining <= 0:
+            raise QueryTimeoutError(f"Query deadline exceeded: {self.name}")
+        return max(1, int(remaining * 1000))
+
+    def cancel(self) -> None:
+        """
+        Cancels the query.
+
+        Once queued, the query is cancelled by its database (see `on_cancel`):
+        when identical queries share its execution, only this query is detached
+        and completed with a `QueryCancelledError`, and the execution goes on for
+        the others. Otherwise the query is aborted (see `abort`).
+        """
+        if self.on_cancel is not None:
+            self.on_cancel(self)
+        else:
+            self.abort()
+
+    def abort(self) -> None:
+        """
+        Aborts the query, whoever waits for its result.
+
+        A queued query is skipped by the dispatcher and a query that fails is not
+        retried; both complete with a `QueryCancelledError`, as do the queries
+        collapsed onto it. A running query is aborted through `interrupt` when
+        the database client supports it, otherwise it runs to completion.
+        """
+        self.cancelled = True
+        interrupt = self.interrupt
+        if interrupt is not None:
+            try:
+                interrupt()
+            except Exception:
+                pass
+
+    def key(self) -> Tuple[Hashable, ...]:
+        """
+        Returns a hashable key identifying the query by SQL text, bind values and result format.
+
+        Two queries with the same key return the same result when executed
+        against the same database at the same time. A streamed query delivers
+        its rows to its own callback, so its key also contains the query
+        identity and it is never collapsed with another query.
+
+        Returns:
+            Tuple[Hashable, ...]: The SQL text, the normalized parameters and the result
+            format, followed by ``id(self)`` for a streamed query.
+        """
+        if self.streaming:
+            return (self.query, normalize_params(self.params), self.result_format, id(self))
+        return (self.query, normalize_params(self.params), self.result_format)
+
+    def batch_key(self) -> Tuple[str, Optional[str], Tuple[Tuple[str, Hashable], ...]]:
+        """
+        Returns a hashable key identifying the batch group of the query.
+
+        Queries share a group when they have the same SQL text, the same batch
+        template and the same values for every parameter that is not a batch key
+        parameter. Must only be called on queries with `batch` settings.
+
+        Returns:
+            Tuple[str, Optional[str], Tuple[Tuple[str, Hashable], ...]]: The SQL text, the
+            IN-list template and the normalized non-key parameters.
+        """
+        key_params = set(self.batch.key_params)
+        shared_params = {k: v for k, v in (self.params or {}).items() if k not in key_params}
+        return (self.query, self.batch.in_list_template, normalize_params(shared_params))
 
     def __repr__(self) -> str:
         return (
             f"{self.__class__.__name__}("
+            f"name={self.name!r}, "
             f"query={self.query!r}, "
             f"params={self.params!r}, "
             f"retries={self.retries!r}, "
+            f"priority={self.priority.name}, "
             f"future_done={self.future.done()}"
             f")"
         )
+
+
+
+class QueryResult(list):
+    """
+    List of result rows carrying a content digest computed while fetching.
+
+    `QueryResult` behaves exactly like the ``List[Dict[str, Any]]`` returned
+    by `BaseDatabase._query`, so existing consumers are unaffected, but it
+    also exposes a `digest` of its content. Database clients build it row by
+    row with `append_row`, which feeds each row into an incremental
+    `ResultDigest`; consumers can then detect unchanged results by comparing
+    digests instead of comparing every row.
+
+    Attributes:
+        digest (Optional[str]): Hexadecimal content digest of the rows, available after `finalize()`.
+    """
+
+    def __init__(self, rows: Optional[List[Dict[str, Any]]] = None) -> None:
+        """
+        Initializes a QueryResult, optionally from already materialized rows.
+
+        Args:
+            rows (Optional[List[Dict[str, Any]]]): Rows to add. When provided, the digest is finalized immediately.
+        """
+        super().__init__()
+        self._digest = ResultDigest()
+        self.digest: Optional[str] = None
+        if rows is not None:
+            for row in rows:
+                self.append_row(row)
+            self.finalize()
+
+    def append_row(self, row: Dict[str, Any]) -> None:
+        """
+        Appends a row and feeds it into the incremental digest.
+
+        Args:
+            row (Dict[str, Any]): The row to append.
+        """
+        self.append(row)
+        self._digest.update(row)
+
+    def finalize(self) -> "QueryResult":
+        """
+        Computes the final digest once all rows have been appended.
+
+        Returns:
+            QueryResult: The result itself, to allow ``return result.finalize()``.
+        """
+        self.digest = self._digest.hexdigest()
+        return self
+
+
+
+class ColumnarResult(dict):
+    """
+    Query result holding the column names once and one value list per row.
+
+    `ColumnarResult` is a dictionary with two keys, ``columns`` and ``rows``,
+    so it is serialized as is by producers (e.g. as
+    ``{"columns": ["a", "b"], "rows": [[1, 2], [3, 4]]}``) without ever being
+    expanded into one dictionary per row. For large results this avoids
+    allocating a dictionary per row and repeating the column names in every
+    row of the produced message.
+
+    Like `QueryResult`, it carries a content `digest` computed while the rows
+    are appended, and it is falsy when it has no rows.
+
+    Attributes:
+        digest (Optional[str]): Hexadecimal content digest of the columns and rows, available after `finalize()`.
+
+    Example:
+        >>> result = ColumnarResult(["task_cd", "total"])
+        >>> result.append_row(("A1", 12))
+        >>> result.finalize()["rows"]
+        [('A1', 12)]
+    """
+
+    def __init__(self, columns: List[str]) -> None:
+        """
+        Initializes an empty columnar result.
+
+        Args:
+            columns (List[str]): The column names, in the order of the row values.
+        """
+        super().__init__(columns=list(columns), rows=[])
+        self._digest = ResultDigest()
+        self._digest.update(self["columns"])
+        self.digest: Optional[str] = None
+
+    @classmethod
+    def from_rows(cls, rows: List[Dict[str, Any]], columns: Optional[List[str]] = None) -> "ColumnarResult":
+        """
+        Builds a finalized columnar result from row dictionaries.
+
+        Args:
+            rows (List[Dict[str, Any]]): The rows to convert.
+            columns (Optional[List[str]], optional): The column names. Defaults to the keys of the first row.
+
+        Returns:
+            ColumnarResult: The finalized result.
+        """
+        if columns is None:
+            columns = list(rows[0].keys()) if rows else []
+        result = cls(columns)
+        for row in rows:
+            result.append_row(tuple(row.get(column) for column in columns))
+        return result.finalize()
+
+    def __bool__(self) -> bool:
+        return bool(self["rows"])
+
+    @property
+    def columns(self) -> List[str]:
+        """
+        List[str]: The column names.
+        """
+        return self["columns"]
+
+    @property
+    def rows(self) -> List[Tuple[Any, ...]]:
+        """
+        List[Tuple[Any, ...]]: The row values, in the order of `columns`.
+        """
+        return self["rows"]
+
+    def append_row(self, row: Tuple[Any, ...]) -> None:
+        """
+        Appends a row of values and feeds it into the incremental digest.
+
+        Args:
+            row (Tuple[Any, ...]): The values of the row, in the order of `columns`.
+        """
+        self["rows"].append(row)
+        self._digest.update(row)
+
+    def finalize(self) -> "ColumnarResult":
+        """
+        Computes the final digest once all rows have been appended.
+
+        Returns:
+            ColumnarResult: The result itself, to allow ``return result.finalize()``.
+        """
+        self.digest = self._digest.hexdigest()
+        return self
+
+
+class ResultStream:
+    """
+    Delivers the rows of a streamed query to its `on_chunk` callback.
+
+    Database clients feed `ResultStream` with the row tuples of each
+    ``fetchmany(task.stream_chunk_rows)`` call instead of accumulating them.
+    A chunk is held back until the next one is fetched, so that the last
+    chunk can be flagged as such; at most two chunks are therefore kept in
+    memory, whatever the size of the result. A result without rows produces
+    a single, empty, last chunk.
+
+    Chunks are numbered from 0. A query that is retried after a failure
+    streams its result again from sequence 0, which lets consumers discard
+    the chunks of the failed attempt.
+
+    Attributes:
+        task (Query): The streamed query.
+        columns (Sequence[str]): The column names of the rows.
+        sequence (int): Sequence number of the next chunk delivered.
+        row_count (int): Number of rows delivered so far.
+        _pending (Optional[List[Sequence[Any]]]): The chunk held back until the next one is fetched.
+
+    Example:
+        >>> stream = ResultStream(task, columns)
+        >>> while rows := cur.fetchmany(task.stream_chunk_rows):
+        ...     stream.feed(rows)
+        >>> return stream.close()
+    """
+
+    def __init__(self, task: Query, columns: Sequence[str]) -> None:
+        """
+        Initializes an empty stream.
+
+        Args:
+            task (Query): The streamed query, whose `on_chunk` receives the chunks.
+            columns (Sequence[str]): The column names of the rows.
+        """
+        self.task = task
+        self.columns = columns
+        self.sequence = 0
+        self.row_count = 0
+        self._pending: Optional[List[Sequence[Any]]] = None
+
+    def feed(self, rows: List[Sequence[Any]]) -> None:
+        """
+        Adds the rows of a fetch and delivers the previous chunk.
+
+        Args:
+            rows (List[Sequence[Any]]): The row values returned by a fetch, in the order of `columns`.
+        """
+        if self._pending is not None:
+            self._emit(self._pending, last=False)
+        self._pending = rows
+
+    def close(self) -> "QueryResult":
+        """
+        Delivers the last chunk.
+
+        Returns:
+            QueryResult: An empty result: the rows were delivered to `on_chunk`.
+        """
+        self._emit(self._pending or [], last=True)
+        self._pending = None
+        self.task.row_count = self.row_count
+        return QueryResult([])
+
+    def _emit(self, rows: List[Sequence[Any]], last: bool) -> None:
+        """
+        Converts a chunk to row dictionaries and hands it to the query callback.
+        """
+        chunk = [dict(zip(self.columns, row)) for row in rows]
+        self.task.on_chunk(chunk, self.sequence, last)
+        self.sequence += 1
+        self.row_count += len(chunk)
+
+
+class ResultBuilder:
+    """
+    Converts the row tuples fetched from a cursor into the result of a query.
+
+    Database clients feed `ResultBuilder` with the rows of each
+    ``fetchmany(builder.fetch_rows)`` call, whatever the driver: the rows are
+    handed to a `ResultStream` for a streamed query, kept as is in a
+    `ColumnarResult` for a ``columnar`` query, and converted to row
+    dictionaries of a `QueryResult` otherwise. Clients of synchronous and
+    asynchronous drivers then only differ in how they call ``fetchmany``.
+
+    Attributes:
+        columns (Sequence[str]): The column names of the rows.
+        fetch_rows (int): Number of rows to request per fetch: `Query.stream_chunk_rows`
+            for a streamed query, else `Query.arraysize` or `DEFAULT_FETCH_ROWS`.
+
+    Example:
+        >>> result = ResultBuilder(task, columns)
+        >>> while rows := cur.fetchmany(result.fetch_rows):
+        ...     result.feed(rows)
+        >>> return result.close()
+    """
+
+    DEFAULT_FETCH_ROWS = 100
+
+    def __init__(self, task: Query, columns: Sequence[str]) -> None:
+        """
+        Initializes an empty result for a query.
+
+        Args:
+            task (Query): The executed query, whose `streaming` and `result_format` select the result type.
+            columns (Sequence[str]): The column names of the rows.
+        """
+        self.columns = columns
+        self._stream: Optional[ResultStream] = None
+        self._columnar: Optional[ColumnarResult] = None
+        self._rows: Optional[QueryResult] = None
+        if task.streaming:
+            self.fetch_rows = task.stream_chunk_rows
+            self._stream = ResultStream(task, columns)
+        else:
+            self.fetch_rows = task.arraysize or self.DEFAULT_FETCH_ROWS
+            if task.result_format == "columnar":
+                self._columnar = ColumnarResult(columns)
+            else:
+                self._rows = QueryResult()
+
+    def feed(self, rows: List[Sequence[Any]]) -> None:
+        """
+        Adds the rows returned by a fetch.
+
+        Args:
+            rows (List[Sequence[Any]]): The row values, in the order of `columns`.
+        """
+        if self._stream is not None:
+            self._stream.feed(rows)
+        elif self._columnar is not None:
+            for row in rows:
+                self._columnar.append_row(row)
+        else:
+            for row in rows:
+                self._rows.append_row(dict(zip(self.columns, row)))
+
+    def close(self) -> "QueryResult | ColumnarResult":
+        """
+        Completes the result once all rows have been fetched.
+
+        Returns:
+            QueryResult | ColumnarResult: The finalized result, empty for a streamed query.
+        """
+        if self._stream is not None:
+            return self._stream.close()
+        if self._columnar is not None:
+            return self._columnar.finalize()
+        return self._rows.finalize()
@@ -0,0 +1,278 @@
+from bisect import bisect_left
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional, Sequence
+import threading
+import time
+
+from .data import Query
+
+
+LATENCY_BUCKETS: Sequence[float] = (
+    0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60
+)
+"""Upper bounds in seconds of the latency histogram buckets; a last bucket holds larger values."""
+
+ROW_BUCKETS: Sequence[float] = (0, 1, 10, 100, 1000, 10000, 100000)
+"""Upper bounds of the row count histogram buckets; a last bucket holds larger values."""
+
+STAGES: Sequence[str] = ("queue_wait", "pool_acquire", "execute", "fetch", "total")
+"""
+Stages timed for every query:
+
+    - ``queue_wait``: time spent in the database queue.
+    - ``pool_acquire``: time waiting for a pooled connection.
+    - ``execute``: time of the execute round-trip.
+    - ``fetch``: time fetching and converting the rows.
+    - ``total``: time from dispatch to completion, retries excluded.
+"""
+
+
+class Histogram:
+    """
+    Fixed-bucket histogram with count, sum, maximum and approximate percentiles.
+
+    Buckets are fixed at creation, so recording a value is a binary search and
+    an increment, and memory does not grow with the number of values.
+    Percentiles are estimated as the upper bound of the bucket holding them.
+
+    Attributes:
+        bounds (Sequence[float]): Upper bounds of the buckets, in increasing order.
+        counts (List[int]): Number of values in each bucket, the last one holding values above every bound.
+        count (int): Number of recorded values.
+        total (float): Sum of the recorded values.
+        max (float): Largest recorded value.
+
+    Example:
+        >>> histogram = Histogram(LATENCY_BUCKETS)
+        >>> histogram.record(0.012)
+        >>> histogram.percentile(0.5)
+        0.025
+    """
+
+    def __init__(self, bounds: Sequence[float]) -> None:
+        """
+        Initializes an empty histogram.
+
+        Args:
+            bounds (Sequence[float]): Upper bounds of the buckets, in increasing order.
+        """
+        self.bounds = bounds
+        self.counts: List[int] = [0] * (len(bounds) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def record(self, value: float) -> None:
+        """
+        Adds a value to the histogram.
+
+        Args:
+            value (float): The value to add.
+        """
+        self.counts[bisect_left(self.bounds, value)] += 1
+        self.count += 1
+        self.total += value
+        self.max = max(self.max, value)
+
+    def percentile(self, fraction: float) -> float:
+        """
+        Returns an upper estimate of a percentile.
+
+        Args:
+            fraction (float): The percentile, between 0 and 1 (e.g. 0.95).
+
+        Returns:
+            float: The upper bound of the bucket holding the percentile, the maximum
+            for the last bucket, or 0 if the histogram is empty.
+        """
+        if not self.count:
+            return 0.0
+        rank = fraction * self.count
+        seen = 0
+        for i, bucket_count in enumerate(self.counts):
+            seen += bucket_count
+            if seen >= rank and bucket_count:
+                return self.bounds[i] if i < len(self.bounds) else self.max
+        return self.max
+
+    def snapshot(self) -> Dict[str, Any]:
+        """
+        Returns the summary and the buckets of the histogram.
+
+        Returns:
+            Dict[str, Any]: Count, average, maximum, 50th/95th/99th percentiles, and the
+            number of values per bucket keyed by upper bound (``inf`` for the last one).
+        """
+        return {
+            "count": self.count,
+            "avg": self.total / self.count if self.count else 0.0,
+            "max": self.max,
+            "p50": self.percentile(0.5),
+            "p95": self.percentile(0.95),
+            "p99": self.percentile(0.99),
+            "buckets": {str(bound): n for bound, n in zip(list(self.bounds) + ["inf"], self.counts)},
+        }
+
+
+class QueryStats:
+    """
+    Stage latency and row count histograms of the queries sharing a name.
+
+    Attributes:
+        stages (Dict[str, Histogram]): One latency histogram per stage of `STAGES`.
+        rows (Histogram): Histogram of the number of rows returned.
+        completed (int): Number of queries completed successfully.
+        failed (int): Number of queries completed with an error.
+    """
+
+    def __init__(self) -> None:
+        """
+        Initializes empty histograms.
+        """
+        self.stages: Dict[str, Histogram] = {stage: Histogram(LATENCY_BUCKETS) for stage in STAGES}
+        self.rows = Histogram(ROW_BUCKETS)
+        self.completed = 0
+        self.failed = 0
+
+    def snapshot(self) -> Dict[str, Any]:
+        """
+        Returns the snapshot of every histogram and the completion counters.
+
+        Returns:
+            Dict[str, Any]: Completed and failed queries, one histogram per stage, and the row histogram.
+        """
+        return {
+            "completed": self.completed,
+            "failed": self.failed,
+            **{stage: histogram.snapshot() for stage, histogram in self.stages.items()},
+            "rows": self.rows.snapshot(),
+        }
+
+
+class QueryMetrics:
+    """
+    Per-query-name timings of a database client, with a slow-query log.
+
+    Database clients time the stages of each query with `stage_timer`, which
+    accumulates them on `Query.timings`; `BaseDatabase` hands the completed
+    query to `record`, which adds its timings and row count to the histograms
+    of its name. Queries without name are grouped under ``unnamed``.
+
+    A query whose total time reaches `slow_query_threshold` is logged at
+    WARNING level with its stage timings. Bind values are never logged, only
+    bind names and value types, since they can carry personal or business data.
+
+    Attributes:
+        database (str): ``<type>-<name>`` identifier of the database, used in logs.
+        slow_query_threshold (Optional[float]): Total time in seconds from which a query is logged, or None.
+        logger: Logger of the slow-query log.
+        _stats (Dict[str, QueryStats]): Statistics of each query name.
+        _lock (threading.Lock): Lock protecting the statistics.
+        slow_queries (int): Number of queries logged as slow.
+    """
+
+    def __init__(self, database: str, logger: Any, slow_query_threshold: Optional[float] = None) -> None:
+        """
+        Initializes empty statistics.
+
+        Args:
+            database (str): ``<type>-<name>`` identifier of the database.
+            logger: Logger of the slow-query log.
+            slow_query_threshold (Optional[float], optional): Threshold of the slow-query log in seconds.
+                Defaults to None (disabled).
+        """
+        self.database = database
+        self.slow_query_threshold = slow_query_threshold
+        self.logger = logger
+        self._stats: Dict[str, QueryStats] = {}
+        self._lock = threading.Lock()
+        self.slow_queries = 0
+
+    # PUBLIC API
+
+    def record(self, task: Query, result: Any = None, failed: bool = False) -> None:
+        """
+        Records the timings and row count of a completed query.
+
+        Args:
+            task (Query): The completed query.
+            result (Any, optional): Its result, used to count rows when `task.row_count` is not set. Defaults to None.
+            failed (bool, optional): Whether the query completed with an error. Defaults to False.
+        """
+        timings = dict(task.timings)
+        if task.dispatched_at is not None:
+            timings["total"] = time.monotonic() - task.dispatched_at
+        rows = task.row_count
+        if rows is None and result is not None:
+            rows = len(result["rows"]) if isinstance(result, dict) else len(result)
+
+        with self._lock:
+            stats = self._stats.setdefault(task.name or "unnamed", QueryStats())
+            if failed:
+                stats.failed += 1
+            else:
+                stats.completed += 1
+                if rows is not None:
+                    stats.rows.record(rows)
+            for stage, value in timings.items():
+                stats.stages[stage].record(value)
+            slow = self.slow_query_threshold is not None and timings.get("total", 0.0) >= self.slow_query_threshold
+            if slow:
+                self.slow_queries += 1
+
+        if slow:
+            stages = ", ".join(f"{stage} {value:.3f}s" for stage, value in timings.items() if stage != "total")
+            self.logger.warning(
+                f"Client DB {self.database}: Slow query {task.name or 'unnamed'}: {timings['total']:.3f}s "
+                f"({stages}, rows {rows}): {task.query} binds: {redact_params(task.params)}"
+            )
+
+    def get_metrics(self) -> Dict[str, Any]:
+        """
+        Returns the statistics of every query name.
+
+        Returns:
+            Dict[str, Any]: The snapshot of the statistics of each query name, and the
+            number of slow queries.
+        """
+        with self._lock:
+            return {
+                "slow_queries": self.slow_queries,
+                "queries": {name: stats.snapshot() for name, stats in self._stats.items()},
+            }
+
+
+@contextmanager
+def stage_timer(task: Query, stage: str) -> Iterator[None]:
+    """
+    Adds the duration of the ``with`` block to a stage of `task.timings`.
+
+    Durations accumulate, so a stage can be timed in several blocks (e.g. one
+    per fetched chunk).
+
+    Args:
+        task (Query): The timed query.
+        stage (str): One of `STAGES`.
+    """
+    start = time.monotonic()
+    try:
+        yield
+    finally:
+        task.timings[stage] = task.timings.get(stage, 0.0) + time.monotonic() - start
+
+
+def redact_params(params: Optional[Dict[str, Any]]) -> str:
+    """
+    Describes bind parameters without their values.
+
+    Args:
+        params (Optional[Dict[str, Any]]): The bind parameters of a query.
+
+    Returns:
+        str: The parameter names with the type of their value, e.g. ``task_cd=<str>, since=<NoneType>``.
+
+    Example:
+        >>> redact_params({"task_cd": "A1", "since": None})
+        'task_cd=<str>, since=<NoneType>'
+    """
+    return ", ".join(f"{name}=<{type(value).__name__}>" for name, value in (params or {}).items())
@@ -1,5 +1,5 @@
 from pydantic import BaseModel, field_validator
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, List, Literal
 import re
 from concurrent.futures import Future
 
@@ -106,6 +106,64 @@ class ConnectionConfig(BaseModel):
             raise ValueError('Port must be an integer between 1 and 65535')
         return v
 
+class ReferenceTableConfig(BaseModel):
+    """
+    Declares a reference table kept in memory by a database client.
+
+    The whole result of `query` is loaded at start-up, indexed on
+    `key_columns` and reloaded every `refresh_interval` seconds. Agents then
+    look rows up in memory (see `QueryConfig.reference_table`) instead of
+    running a query per match.
+
+    Attributes:
+        name (str): Unique name of the table within the database.
+        query (str): Query returning the whole table.
+        key_columns (List[str]): Columns of the lookup key, lower-cased.
+        refresh_interval (float): Interval in seconds between two reloads. Defaults to 300.
+    """
+    name: str
+    query: str
+    key_columns: List[str]
+    refresh_interval: float = 300
+
+    @field_validator('key_columns')
+    def validate_key_columns(cls, value):
+        """
+        Validates the `key_columns` field of the ReferenceTableConfig.
+
+        Args:
+            cls (Type[ReferenceTableConfig]): The class being validated.
+            value (List[str]): The key columns to validate.
+
+        Returns:
+            List[str]: The lower-cased key columns.
+
+        Raises:
+            ValueError: If `key_columns` is empty.
+        """
+        if not value:
+            raise ValueError("Key columns cannot be empty")
+        return [column.lower() for column in value]
+
+    @field_validator('refresh_interval')
+    def validate_refresh_interval(cls, value):
+        """
+        Validates the `refresh_interval` field of the ReferenceTableConfig.
+
+        Args:
+            cls (Type[ReferenceTableConfig]): The class being validated.
+            value (float): The refresh interval to validate.
+
+        Returns:
+            float: The validated `refresh_interval` value.
+
+        Raises:
+            ValueError: If `refresh_interval` is less than or equal to 0.
+        """
+        if value <= 0:
+            raise ValueError("Refresh interval must be greater than 0")
+        return value
+
 class BaseDatabaseConfig(BaseModel):
     """
     Represents the configuration for a database, including authentication,
@@ -124,6 +182,23 @@ class BaseDatabaseConfig(BaseModel):
         replica (Optional[ConnectionConfig]): Optional configuration for a replica connection. Defaults to None.
         max_retries (int): Maximum number of retry attempts for database operations. Defaults to 5.
         max_workers (int): Maximum number of concurrent workers for executing queries. Defaults to 10.
+        max_queue_size (int): Maximum number of queries waiting to be dispatched. Defaults to 0 (unbounded).
+        queue_full_policy (str): Behaviour of `enqueue_query` when the queue is full: ``block`` waits up to
+            `queue_put_timeout` seconds for space, ``reject`` fails at once, ``drop_oldest`` replaces the oldest
+            queued query with the same SQL text and bind values (rejecting if there is none). Defaults to ``block``.
+        queue_put_timeout (float): Maximum wait in seconds of the ``block`` policy. Defaults to 5.
+        routing_strategy (str): How queries are spread over the primary and the replica, each with its own
+            connection pool: ``failover`` uses the replica only while the primary is unhealthy, ``round_robin``
+            alternates, ``least_outstanding`` picks the endpoint with the fewest queries in flight and
+            ``replica_preferred`` uses the replica with fallback to the primary. Defaults to ``failover``.
+        endpoint_failure_threshold (int): Consecutive failures after which an endpoint is considered unhealthy.
+            Defaults to 3.
+        endpoint_cooldown (float): Time in seconds during which an unhealthy endpoint is avoided. Defaults to 30.
+        reference_tables (List[ReferenceTableConfig]): Tables loaded in memory and refreshed in the background,
+            served by `BaseDatabase.lookup`. Defaults to none.
+        slow_query_threshold (Optional[float]): Total time in seconds from dispatch to completion from which a
+            query is logged at WARNING level with its stage timings and redacted bind values. Defaults to None
+            (no slow-query log).
     """
     type: str
     name: str
@@ -133,6 +208,14 @@ class BaseDatabaseConfig(BaseModel):
     replica: Optional[ConnectionConfig] = None
     max_retries: int = 5
     max_workers: int = 10
+    max_queue_size: int = 0
+    queue_full_policy: Literal["block", "reject", "drop_oldest"] = "block"
+    queue_put_timeout: float = 5
+    routing_strategy: Literal["failover", "round_robin", "least_outstanding", "replica_preferred"] = "failover"
+    endpoint_failure_threshold: int = 3
+    endpoint_cooldown: float = 30
+    reference_tables: List[ReferenceTableConfig] = []
+    slow_query_threshold: Optional[float] = None
 
     
     @field_validator('max_retries')
@@ -176,3 +259,104 @@ class BaseDatabaseConfig(BaseModel):
         if value <= 0:
             raise ValueError("Max workers must be greater than 0")
         return value
+
+    @field_validator('max_queue_size')
+    def validate_max_queue_size(cls, value):
+        """
+        Validates the `max_queue_size` field of the BaseDatabaseConfig.
+
+        Ensures that the maximum queue size is not negative (0 means unbounded).
+
+        Args:
+            cls (Type[BaseDatabaseConfig]): The class being validated.
+            value (int): The maximum queue size to validate.
+
+        Returns:
+            int: The validated `max_queue_size` value.
+
+        Raises:
+            ValueError: If `max_queue_size` is less than 0.
+        """
+        if value < 0:
+            raise ValueError("Max queue size must be greater than or equal to 0")
+        return value
+
+    @field_validator('queue_put_timeout')
+    def validate_queue_put_timeout(cls, value):
+        """
+        Validates the `queue_put_timeout` field of the BaseDatabaseConfig.
+
+        Ensures that the time waited for space in a full queue is greater than 0.
+
+        Args:
+            cls (Type[BaseDatabaseConfig]): The class being validated.
+            value (float): The timeout to validate.
+
+        Returns:
+            float: The validated `queue_put_timeout` value.
+
+        Raises:
+            ValueError: If `queue_put_timeout` is less than or equal to 0.
+        """
+        if value <= 0:
+            raise ValueError("Queue put timeout must be greater than 0")
+        return value
+
+    @field_validator('endpoint_failure_threshold', 'endpoint_cooldown')
+    def validate_endpoint_health(cls, value, info):
+        """
+        Validates the `endpoint_failure_threshold` and `endpoint_cooldown` fields of the BaseDatabaseConfig.
+
+        Args:
+            cls (Type[BaseDatabaseConfig]): The class being validated.
+            value (float): The value to validate.
+            info: Validation context, providing the field name.
+
+        Returns:
+            float: The validated value.
+
+        Raises:
+            ValueError: If the value is less than or equal to 0.
+        """
+        if value <= 0:
+            raise ValueError(f"{info.field_name.replace('_', ' ').capitalize()} must be greater than 0")
+        return value
+
+    @field_validator('reference_tables')
+    def validate_reference_tables(cls, value):
+        """
+        Validates the `reference_tables` field of the BaseDatabaseConfig.
+
+        Args:
+            cls (Type[BaseDatabaseConfig]): The class being validated.
+            value (List[ReferenceTableConfig]): The reference tables to validate.
+
+        Returns:
+            List[ReferenceTableConfig]: The validated reference tables.
+
+        Raises:
+            ValueError: If two reference tables have the same name.
+        """
+        names = [table.name for table in value]
+        if len(names) != len(set(names)):
+            raise ValueError("Reference table names must be unique")
+        return value
+
+    @field_validator('slow_query_threshold')
+    def validate_slow_query_threshold(cls, value):
+        """
+        Validates the `slow_query_threshold` field of the BaseDatabaseConfig.
+
+        Args:
+            cls (Type[BaseDatabaseConfig]): The class being validated.
+            value (Optional[float]): The threshold to validate.
+
+        Returns:
+            Optional[float]: The validated `slow_query_threshold` value.
+
+        Raises:
+            ValueError: If `slow_query_threshold` is less than 0.
+        """
+        if value is not None and value < 0:
+            raise ValueError("Slow query threshold must be greater than or equal to 0")
+        return value
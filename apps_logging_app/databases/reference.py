@@ -0,0 +1,168 @@
+from typing import Any, Dict, List, Optional, Tuple
+import threading
+import time
+
+from .data import QueryResult
+from .model import ReferenceTableConfig
+
+
+class ReferenceSnapshot:
+    """
+    Immutable, indexed copy of a reference table at one point in time.
+
+    Attributes:
+        rows (List[Dict[str, Any]]): The rows of the table.
+        index (Dict[Tuple[Optional[str], ...], QueryResult]): The rows of each key, keyed by
+            the values of the key columns (see `key_of`).
+        loaded_at (float): Monotonic time at which the snapshot was loaded.
+    """
+
+    def __init__(self, rows: List[Dict[str, Any]], key_columns: List[str]) -> None:
+        """
+        Builds the hash index of a set of rows.
+
+        Args:
+            rows (List[Dict[str, Any]]): The rows of the table.
+            key_columns (List[str]): The lower-cased columns of the index key.
+        """
+        self.rows = rows
+        self.loaded_at = time.monotonic()
+        groups: Dict[Tuple[Optional[str], ...], List[Dict[str, Any]]] = {}
+        for row in rows:
+            groups.setdefault(key_of(row, key_columns), []).append(row)
+        self.index: Dict[Tuple[Optional[str], ...], QueryResult] = {key: QueryResult(group) for key, group in groups.items()}
+
+
+def key_of(values: Dict[str, Any], key_columns: List[str]) -> Tuple[Optional[str], ...]:
+    """
+    Returns the index key of a row or of lookup values.
+
+    Key values are compared as strings, so that values extracted from log
+    lines (always strings) match numeric columns.
+
+    Args:
+        values (Dict[str, Any]): A row, or the values of a lookup, with lower-cased names.
+        key_columns (List[str]): The lower-cased columns of the index key.
+
+    Returns:
+        Tuple[Optional[str], ...]: The string value of each key column, None for a missing or NULL value.
+    """
+    return tuple(None if values.get(column) is None else str(values[column]) for column in key_columns)
+
+
+class ReferenceTable:
+    """
+    In-memory snapshot of a small, slowly changing table, served by key lookups.
+
+    The table is loaded with `config.query` and indexed on
+    `config.key_columns`. Each refresh builds a whole new `ReferenceSnapshot`
+    and swaps it in with a single assignment, so lookups never lock and never
+    see a partially loaded table: they are served by the previous snapshot
+    until the new one is complete. A failed refresh keeps the previous
+    snapshot.
+
+    Scheduling the refreshes is left to the owner (see
+    `BaseDatabase._refresh_reference_table`).
+
+    Attributes:
+        config (ReferenceTableConfig): The declaration of the table.
+        _snapshot (Optional[ReferenceSnapshot]): The current snapshot, None until the first load.
+        _stats_lock (threading.Lock): Lock protecting the counters.
+        hits (int): Number of lookups finding at least one row.
+        misses (int): Number of lookups finding no row.
+        refreshes (int): Number of snapshots loaded.
+        failed_refreshes (int): Number of refreshes that failed.
+
+    Example:
+        >>> table = ReferenceTable(ReferenceTableConfig(name="tasks", query="SELECT * FROM tasks", key_columns=["task_cd"]))
+        >>> table.swap([{"task_cd": "A1", "owner": "ops"}])
+        >>> table.lookup({"TASK_CD": "A1"})
+        [{'task_cd': 'A1', 'owner': 'ops'}]
+    """
+
+    def __init__(self, config: ReferenceTableConfig) -> None:
+        """
+        Initializes a reference table without snapshot.
+
+        Args:
+            config (ReferenceTableConfig): The declaration of the table.
+        """
+        self.config = config
+        self._snapshot: Optional[ReferenceSnapshot] = None
+        self._stats_lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.refreshes = 0
+        self.failed_refreshes = 0
+
+    # PUBLIC API
+
+    @property
+    def loaded(self) -> bool:
+        """
+        bool: Whether a snapshot has been loaded.
+        """
+        return self._snapshot is not None
+
+    def lookup(self, params: Optional[Dict[str, Any]]) -> Optional[QueryResult]:
+        """
+        Returns the rows whose key columns equal the given values.
+
+        Args:
+            params (Optional[Dict[str, Any]]): Values of the key columns, looked up
+                case-insensitively and compared as strings; other entries are ignored.
+
+        Returns:
+            Optional[QueryResult]: The matching rows, empty if there is none, or None if
+            no snapshot has been loaded yet. The rows are shared and must not be modified.
+        """
+        snapshot = self._snapshot
+        if snapshot is None:
+            return None
+        values = {str(name).lower(): value for name, value in (params or {}).items()}
+        rows = snapshot.index.get(key_of(values, self.config.key_columns))
+        with self._stats_lock:
+            if rows:
+                self.hits += 1
+            else:
+                self.misses += 1
+        return rows if rows is not None else QueryResult([])
+
+    def swap(self, rows: List[Dict[str, Any]]) -> None:
+        """
+        Replaces the current snapshot with a new one built from `rows`.
+
+        Args:
+            rows (List[Dict[str, Any]]): The rows of the table, as returned by `config.query`.
+        """
+        snapshot = ReferenceSnapshot(list(rows), self.config.key_columns)
+        self._snapshot = snapshot
+        with self._stats_lock:
+            self.refreshes += 1
+
+    def mark_failed(self) -> None:
+        """
+        Records a failed refresh. The current snapshot is kept.
+        """
+        with self._stats_lock:
+            self.failed_refreshes += 1
+
+    def get_metrics(self) -> Dict[str, Any]:
+        """
+        Returns a snapshot of the table counters.
+
+        Returns:
+            Dict[str, Any]: Rows and keys of the current snapshot, its age in seconds
+            (None if not loaded), lookup hits and misses, and successful and failed refreshes.
+        """
+        snapshot = self._snapshot
+        with self._stats_lock:
+            return {
+                "rows": len(snapshot.rows) if snapshot else 0,
+                "keys": len(snapshot.index) if snapshot else 0,
+                "age": time.monotonic() - snapshot.loaded_at if snapshot else None,
+                "hits": self.hits,
+                "misses": self.misses,
+                "refreshes": self.refreshes,
+                "failed_refreshes": self.failed_refreshes,
+            }
@@ -0,0 +1,291 @@
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, List, Optional
+import itertools
+import threading
+import time
+
+from .model import BaseDatabaseConfig, ConnectionConfig
+
+
+ENDPOINT_ERROR_NAMES = ("OperationalError", "InterfaceError")
+
+
+def is_endpoint_error(error: BaseException) -> bool:
+    """
+    Returns whether an error raised by a query tells something about the health of its endpoint.
+
+    Connection errors and the DB-API ``OperationalError`` and ``InterfaceError``
+    families (lost connections, unreachable servers, closed pools) count against
+    the endpoint. SQL errors, timeouts and cancellations are raised by the query
+    itself and would be raised by any endpoint, so they do not.
+
+    Args:
+        error (BaseException): The error raised while the query ran.
+
+    Returns:
+        bool: `True` if the error counts as a failure of the endpoint.
+    """
+    if isinstance(error, TimeoutError) or not isinstance(error, Exception):
+        return False
+    if isinstance(error, (ConnectionError, EOFError)):
+        return True
+    return any(cls.__name__ in ENDPOINT_ERROR_NAMES for cls in type(error).__mro__)
+
+
+class Endpoint:
+    """
+    A database server that queries can be routed to, with its load and latency counters.
+
+    Attributes:
+        name (str): Name of the endpoint, ``primary`` or ``replica``.
+        connection (Optional[ConnectionConfig]): Address of the server, None for an in-process database.
+        is_replica (bool): Whether the endpoint is a read replica.
+        in_flight (int): Number of queries currently running on the endpoint.
+        executed (int): Number of queries completed on the endpoint, failed ones included.
+        failures (int): Number of queries that failed on the endpoint.
+        consecutive_failures (int): Number of failures since the last success.
+        latency_total (float): Total execution time in seconds of the completed queries.
+        latency_max (float): Longest execution time in seconds of a query.
+        latency_ewma (Optional[float]): Exponentially weighted moving average of the execution time.
+        unhealthy_until (float): Monotonic time until which the endpoint is avoided, 0 if healthy.
+    """
+
+    EWMA_WEIGHT = 0.2
+
+    def __init__(self, name: str, connection: Optional[ConnectionConfig], is_replica: bool) -> None:
+        """
+        Initializes an endpoint with empty counters.
+
+        Args:
+            name (str): Name of the endpoint.
+            connection (Optional[ConnectionConfig]): Address of the server.
+            is_replica (bool): Whether the endpoint is a read replica.
+        """
+        self.name = name
+        self.connection = connection
+        self.is_replica = is_replica
+        self.in_flight = 0
+        self.executed = 0
+        self.failures = 0
+        self.consecutive_failures = 0
+        self.latency_total = 0.0
+        self.latency_max = 0.0
+        self.latency_ewma: Optional[float] = None
+        self.unhealthy_until = 0.0
+
+    def is_healthy(self, now: float) -> bool:
+        """
+        Returns whether the endpoint can receive queries.
+
+        Args:
+            now (float): The current monotonic time.
+
+        Returns:
+            bool: `False` while the endpoint is cooling down after repeated failures.
+        """
+        return now >= self.unhealthy_until
+
+    def get_metrics(self) -> Dict[str, Any]:
+        """
+        Returns a snapshot of the endpoint counters.
+
+        Returns:
+            Dict[str, Any]: In-flight, executed and failed queries, average, moving
+            average and maximum latency in seconds, and health.
+        """
+        return {
+            "host": self.connection.host if self.connection else None,
+            "in_flight": self.in_flight,
+            "executed": self.executed,
+            "failures": self.failures,
+            "latency_avg": self.latency_total / self.executed if self.executed else 0.0,
+            "latency_ewma": self.latency_ewma or 0.0,
+            "latency_max": self.latency_max,
+            "healthy": self.is_healthy(time.monotonic()),
+        }
+
+
+class EndpointRouter:
+    """
+    Routes the queries of a database client over its primary and replica servers.
+
+    The database client keeps one connection pool per endpoint and asks the
+    router which one to use for each query. Strategies:
+
+        - ``failover``: every query goes to the primary; the replica is only used
+          while the primary is unhealthy.
+        - ``round_robin``: queries alternate between the healthy endpoints.
+        - ``least_outstanding``: each query goes to the healthy endpoint with the
+          fewest queries in flight, the lowest moving average latency breaking ties.
+        - ``replica_preferred``: queries go to the replica, with fallback to the
+          primary while the replica is unhealthy.
+
+    An endpoint becomes unhealthy for `cooldown` seconds after
+    `failure_threshold` consecutive failures, an error counting as a failure
+    only when `is_endpoint_error` says so. When every endpoint is unhealthy
+    the router still returns one, the first of the strategy's order, so that
+    queries keep being attempted and retried.
+
+    Attributes:
+        endpoints (List[Endpoint]): The primary endpoint, followed by the replica if configured.
+        strategy (str): The routing strategy.
+        failure_threshold (int): Consecutive failures after which an endpoint becomes unhealthy.
+        cooldown (float): Time in seconds during which an unhealthy endpoint is avoided.
+        is_endpoint_error (Callable[[BaseException], bool]): Tells whether an error counts as a failure of the endpoint.
+        _round_robin (itertools.count): Counter used by the ``round_robin`` strategy.
+        _lock (threading.Lock): Lock protecting the endpoint counters.
+
+    Example:
+        >>> router = EndpointRouter.from_config(config)
+        >>> with router.route() as endpoint:
+        ...     with pools[endpoint.name].acquire() as conn:
+        ...         ...
+    """
+
+    def __init__(self, endpoints: List[Endpoint], strategy: str = "failover", failure_threshold: int = 3,
+                 cooldown: float = 30, is_endpoint_error: Callable[[BaseException], bool] = is_endpoint_error) -> None:
+        """
+        Initializes a router over the given endpoints.
+
+        Args:
+            endpoints (List[Endpoint]): The endpoints, primary first.
+            strategy (str, optional): The routing strategy. Defaults to ``failover``.
+            failure_threshold (int, optional): Consecutive failures making an endpoint unhealthy. Defaults to 3.
+            cooldown (float, optional): Time in seconds an unhealthy endpoint is avoided. Defaults to 30.
+            is_endpoint_error (Callable[[BaseException], bool], optional): Classifier of the errors raised
+                by queries. Defaults to the module-level `is_endpoint_error`.
+        """
+        self.endpoints = endpoints
+        self.strategy = strategy
+        self.failure_threshold = failure_threshold
+        self.cooldown = cooldown
+        self.is_endpoint_error = is_endpoint_error
+        self._round_robin = itertools.count()
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_config(cls, config: BaseDatabaseConfig,
+                    is_endpoint_error: Callable[[BaseException], bool] = is_endpoint_error) -> "EndpointRouter":
+        """
+        Creates the router of a database from its configuration.
+
+        Args:
+            config (BaseDatabaseConfig): The database configuration.
+            is_endpoint_error (Callable[[BaseException], bool], optional): Classifier of the errors raised
+                by queries. Defaults to the module-level `is_endpoint_error`.
+
+        Returns:
+            EndpointRouter: A router over the primary and, if configured, the replica.
+        """
+        endpoints = [Endpoint("primary", config.primary, is_replica=False)]
+        if config.replica:
+            endpoints.append(Endpoint("replica", config.replica, is_replica=True))
+        return cls(endpoints, config.routing_strategy, config.endpoint_failure_threshold, config.endpoint_cooldown,
+                   is_endpoint_error)
+
+    # PUBLIC API
+
+    @contextmanager
+    def route(self) -> Iterator[Endpoint]:
+        """
+        Selects the endpoint of a query and records its execution.
+
+        The query counts as in flight on the endpoint for the duration of the
+        ``with`` block, whose execution time is recorded as the latency of the
+        endpoint. An exception raised in the block is propagated; it counts as
+        a failure of the endpoint only if `is_endpoint_error` accepts it, other
+        errors (SQL errors, timeouts, cancellations) leave its health untouched.
+
+        Yields:
+            Endpoint: The endpoint to run the query on.
+        """
+        endpoint = self.select()
+        start = time.monotonic()
+        try:
+            yield endpoint
+        except BaseException as e:
+            self.release(endpoint, time.monotonic() - start, failed=True if self.is_endpoint_error(e) else None)
+            raise
+        self.release(endpoint, time.monotonic() - start, failed=False)
+
+    def select(self) -> Endpoint:
+        """
+        Selects the endpoint of a query according to the strategy and marks it in flight.
+
+        Every call must be followed by a call to `release` (see `route`).
+
+        Returns:
+            Endpoint: The selected endpoint.
+        """
+        now = time.monotonic()
+        with self._lock:
+            ordered = self._ordered()
+            healthy = [endpoint for endpoint in ordered if endpoint.is_healthy(now)] or ordered[:1]
+            if self.strategy == "round_robin":
+                endpoint = healthy[next(self._round_robin) % len(healthy)]
+            elif self.strategy == "least_outstanding":
+                endpoint = min(healthy, key=lambda e: (e.in_flight, e.latency_ewma or 0.0))
+            else:
+                endpoint = healthy[0]
+            endpoint.in_flight += 1
+            return endpoint
+
+    def release(self, endpoint: Endpoint, latency: float, failed: Optional[bool]) -> None:
+        """
+        Records the completion of a query on an endpoint.
+
+        Args:
+            endpoint (Endpoint): The endpoint returned by `select`.
+            latency (float): Execution time of the query in seconds.
+            failed (Optional[bool]): Whether the query failed because of the endpoint, or None if
+                it failed for a reason unrelated to the endpoint, which leaves its health untouched.
+        """
+        with self._lock:
+            endpoint.in_flight -= 1
+            endpoint.executed += 1
+            endpoint.latency_total += latency
+            endpoint.latency_max = max(endpoint.latency_max, latency)
+            if endpoint.latency_ewma is None:
+                endpoint.latency_ewma = latency
+            else:
+                endpoint.latency_ewma += Endpoint.EWMA_WEIGHT * (latency - endpoint.latency_ewma)
+            if failed is None:
+                return
+            if not failed:
+                endpoint.consecutive_failures = 0
+                endpoint.unhealthy_until = 0.0
+                return
+            endpoint.failures += 1
+            endpoint.consecutive_failures += 1
+            if endpoint.consecutive_failures >= self.failure_threshold:
+                endpoint.unhealthy_until = time.monotonic() + self.cooldown
+
+    def mark_unhealthy(self, endpoint: Endpoint) -> None:
+        """
+        Avoids an endpoint for `cooldown` seconds, e.g. when its pool cannot be created.
+
+        Args:
+            endpoint (Endpoint): The endpoint to avoid.
+        """
+        with self._lock:
+            endpoint.unhealthy_until = time.monotonic() + self.cooldown
+
+    def get_metrics(self) -> Dict[str, Dict[str, Any]]:
+        """
+        Returns a snapshot of the counters of every endpoint.
+
+        Returns:
+            Dict[str, Dict[str, Any]]: The metrics of each endpoint, keyed by endpoint name.
+        """
+        with self._lock:
+            return {endpoint.name: endpoint.get_metrics() for endpoint in self.endpoints}
+
+    # INTERNALS
+
+    def _ordered(self) -> List[Endpoint]:
+        """
+        Returns the endpoints in order of preference of the strategy.
+        """
+        if self.strategy == "replica_preferred":
+            return sorted(self.endpoints, key=lambda e: not e.is_replica)
+        return self.endpoints
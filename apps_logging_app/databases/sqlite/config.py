@@ -0,0 +1,68 @@
+from pydantic import field_validator
+from typing import Any, Dict, Optional
+
+from ..model import BaseDatabaseConfig, ConnectionConfig
+
+
+class SqliteDatabaseConfig(BaseDatabaseConfig):
+    """
+    Configuration of a local SQLite database.
+
+    SQLite runs in-process, so no credentials nor server address are needed:
+    `username`, `password` and `primary` are optional and ignored.
+
+    Attributes:
+        path (str): Path of the database file, or ``:memory:`` for an in-memory database
+            shared by all the workers of this client. Defaults to ``:memory:``.
+        init_script (Optional[str]): Path of a SQL script run once at connection, e.g. to
+            create and load reference tables. Defaults to None.
+        pragmas (Dict[str, Any]): ``PRAGMA`` settings applied to every connection, e.g.
+            ``{"journal_mode": "wal"}``. Defaults to none.
+        busy_timeout (float): Time in seconds a connection waits for a lock held by
+            another connection before failing. Defaults to 5.
+    """
+    username: Optional[str] = None
+    password: Optional[str] = None
+    primary: Optional[ConnectionConfig] = None
+    path: str = ":memory:"
+    init_script: Optional[str] = None
+    pragmas: Dict[str, Any] = {}
+    busy_timeout: float = 5
+
+    @field_validator('path')
+    def validate_path(cls, value):
+        """
+        Validates the `path` field of the SqliteDatabaseConfig.
+
+        Args:
+            cls (Type[SqliteDatabaseConfig]): The class being validated.
+            value (str): The database path to validate.
+
+        Returns:
+            str: The validated `path` value.
+
+        Raises:
+            ValueError: If `path` is empty.
+        """
+        if not value or not value.strip():
+            raise ValueError("Path cannot be empty")
+        return value
+
+    @field_validator('busy_timeout')
+    def validate_busy_timeout(cls, value):
+        """
+        Validates the `busy_timeout` field of the SqliteDatabaseConfig.
+
+        Args:
+            cls (Type[SqliteDatabaseConfig]): The class being validated.
+            value (float): The busy timeout to validate.
+
+        Returns:
+            float: The validated `busy_timeout` value.
+
+        Raises:
+            ValueError: If `busy_timeout` is less than 0.
+        """
+        if value < 0:
+            raise ValueError("Busy timeout must be greater than or equal to 0")
+        return value
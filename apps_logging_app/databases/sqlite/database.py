@@ -0,0 +1,189 @@
+from typing import Any, Dict, List
+from pathlib import Path
+import sqlite3
+import threading
+import uuid
+
+from ..registry import register_database
+from .config import SqliteDatabaseConfig
+from ..base import BaseDatabase
+from ..data import Query
+
+
+@register_database(
+    database_type="sqlite",
+    config_model=SqliteDatabaseConfig,
+)
+class SqliteDatabase(BaseDatabase):
+    """
+    Database client for a local SQLite database, file-based or in-memory.
+
+    Queries use the same ``:name`` bind parameters as the other database
+    types, so a `QueryConfig` written for Oracle runs unchanged as long as its
+    SQL is portable. Every executor worker opens its own connection on first
+    use (SQLite connections cannot be shared between threads), and all of them
+    are closed by `close()`.
+
+    An in-memory database is opened as a shared-cache URI, so that all the
+    workers see the same tables; a keeper connection, opened by `connect()`,
+    keeps it alive while the workers' connections come and go. The
+    `init_script` runs on that connection, which makes the client usable as a
+    local enrichment store: reference data loaded at start-up is then queried
+    without any network round-trip.
+
+    Deadlines and cancellation (see `Query.call_timeout_ms` and
+    `Query.cancel`) abort the running statement through
+    `sqlite3.Connection.interrupt`.
+
+    Example:
+        >>> config = SqliteDatabaseConfig(type="sqlite", name="reference", init_script="reference.sql")
+        >>> db = SqliteDatabase(config)
+    """
+
+    PROGRESS_STEPS = 10000
+    """Number of SQLite virtual machine instructions between two deadline checks."""
+
+    def __init__(self, config: SqliteDatabaseConfig) -> None:
+        """
+        Initializes a SqliteDatabase instance with the given configuration.
+
+        Args:
+            config (SqliteDatabaseConfig): The configuration for the database.
+
+        Attributes:
+            _uri (str): URI of the database, shared by all connections.
+            _keeper (sqlite3.Connection | None): Connection opened by `connect()`, keeping an
+                in-memory database alive.
+            _local (threading.local): Connection of each executor worker.
+            _connections (List[sqlite3.Connection]): Every connection opened by the workers.
+            _connections_lock (threading.Lock): Lock protecting `_connections`.
+        """
+        super().__init__(config)
+        if config.path == ":memory:":
+            self._uri = f"file:{config.type}-{config.name}-{uuid.uuid4().hex}?mode=memory&cache=shared"
+        else:
+            self._uri = Path(config.path).absolute().as_uri()
+        self._keeper: sqlite3.Connection | None = None
+        self._local = threading.local()
+        self._connections: List[sqlite3.Connection] = []
+        self._connections_lock = threading.Lock()
+
+    def is_connected(self) -> bool:
+        """
+        Returns whether the database has been opened by `connect()`.
+        """
+        return self._keeper is not None
+
+    def connect(self) -> None:
+        """
+        Opens the database and runs the `init_script`, if any.
+
+        If the database cannot be opened or the script fails, an exception is
+        raised with the error message.
+        """
+        try:
+            keeper = self._open()
+            if self.config.init_script:
+                keeper.executescript(Path(self.config.init_script).read_text())
+        except Exception as e:
+            self.logger.error(f"Client DB {self.config.type}-{self.config.name}: Failed to connect: {e}")
+            raise
+        self._keeper = keeper
+
+    def close(self) -> None:
+        """
+        Closes the connections of the workers and the keeper connection.
+        """
+        with self._connections_lock:
+            connections, self._connections = self._connections, []
+        self._local = threading.local()
+        for conn in connections:
+            conn.close()
+        if self._keeper is not None:
+            self._keeper.close()
+            self._keeper = None
+
+    # INTERNALS
+
+    def _query(self, task: Query) -> List[Dict[str, Any]]:
+        """
+        Executes the query on the connection of the current worker.
+
+        Fetch settings, streaming, result formats and stage timings behave as
+        in the Oracle clients: the rows are converted to a `QueryResult`, a
+        `ColumnarResult` or streamed in chunks, with their digest computed
+        while fetching. There is no pool, hence no ``pool_acquire`` timing.
+        """
+        with self.router.route():
+            return self._execute(self._connection(), task)
+
+    def _query_batch(self, tasks: List[Query]) -> List[List[Dict[str, Any]]]:
+        """
+        Executes a batch group statement by statement on the connection of the current worker.
+        """
+        with self.router.route():
+            conn = self._connection()
+            return [self._execute(conn, task) for task in tasks]
+
+    def _execute(self, conn: sqlite3.Connection, task: Query) -> List[Dict[str, Any]]:
+        """
+        Executes a query and fetches its result.
+
+        The deadline of the query is checked by a progress handler every
+        `PROGRESS_STEPS` instructions, and `Query.cancel` interrupts the
+        connection; both abort the statement with an `sqlite3.OperationalError`.
+        The rows are fetched and converted by `BaseDatabase._fetch`.
+        """
+        timeout_ms = task.call_timeout_ms()
+        if timeout_ms:
+            conn.set_progress_handler(lambda: task.remaining() <= 0, self.PROGRESS_STEPS)
+        task.interrupt = conn.interrupt
+        try:
+            cur = conn.cursor()
+            try:
+                return self._fetch(cur, task)
+            finally:
+                cur.close()
+        finally:
+            task.interrupt = None
+            if timeout_ms:
+                conn.set_progress_handler(None, 0)
+
+    def _is_endpoint_error(self, error: BaseException) -> bool:
+        """
+        Returns whether an error counts as a failure of the endpoint, see `BaseDatabase._is_endpoint_error`.
+
+        A statement aborted by its deadline or by `Query.cancel` raises an
+        ``OperationalError('interrupted')``, which says nothing about the
+        health of the database.
+        """
+        if isinstance(error, sqlite3.OperationalError) and "interrupted" in str(error):
+            return False
+        return super()._is_endpoint_error(error)
+
+    def _connection(self) -> sqlite3.Connection:
+        """
+        Returns the connection of the current worker, opening it on first use.
+        """
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = self._open()
+            self._local.conn = conn
+            with self._connections_lock:
+                self._connections.append(conn)
+        return conn
+
+    def _open(self) -> sqlite3.Connection:
+        """
+        Opens a connection to the database and applies the configured pragmas.
+
+        Connections run in autocommit mode: enrichment queries are reads and
+        must not keep a transaction open between two executions. Each
+        connection only runs queries in the thread that opened it, but it is
+        closed by the thread calling `close()`, hence ``check_same_thread=False``.
+        """
+        conn = sqlite3.connect(self._uri, uri=True, timeout=self.config.busy_timeout, isolation_level=None,
+                               check_same_thread=False)
+        for name, value in self.config.pragmas.items():
+            conn.execute(f"PRAGMA {name} = {value}")
+        return conn
@@ -7,6 +7,8 @@ from .agents.factory import AgentFactory
 from .agents.sasdm.agent import SasdmAgent                         # Import required to register agent, database and producer classes
 from .agents.spring.agent import SpringAgent                       # Import required to register agent, database and producer classes
 from .databases.oracle.database import OracleDatabase              # Import required to register agent, database and producer classes
+from .databases.oracle_async.database import AsyncOracleDatabase   # Import required to register agent, database and producer classes
+from .databases.sqlite.database import SqliteDatabase              # Import required to register agent, database and producer classes
 from .producers.kafka_handler.producer import KafkaHandlerProducer # Import required to register agent, database and producer classes
 
 def main():
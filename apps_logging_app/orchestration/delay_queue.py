@@ -0,0 +1,212 @@
+from collections import deque
+from typing import Any, Callable, Deque, Dict, List, Optional, Tuple
+import heapq
+import itertools
+import logging
+import threading
+import time
+
+
+class DelayedCall:
+    """
+    Handle of a callback scheduled on a `DelayQueue`.
+
+    Attributes:
+        deadline (float): Monotonic time at which the callback is due.
+        callback (Callable[[], Any]): The callback to run.
+        cancelled (bool): Whether the call was cancelled before running.
+    """
+
+    def __init__(self, deadline: float, callback: Callable[[], Any]) -> None:
+        """
+        Initializes a delayed call.
+
+        Args:
+            deadline (float): Monotonic time at which the callback is due.
+            callback (Callable[[], Any]): The callback to run.
+        """
+        self.deadline = deadline
+        self.callback = callback
+        self.cancelled = False
+
+    def cancel(self) -> None:
+        """
+        Cancels the call. It is discarded when its deadline is reached.
+        """
+        self.cancelled = True
+
+
+class DelayQueue:
+    """
+    Runs callbacks at a deadline on a single shared timer thread.
+
+    `DelayQueue` replaces ``time.sleep(backoff)`` followed by a re-enqueue:
+    instead of holding a worker thread for the whole backoff, the caller
+    schedules the re-enqueue and returns at once. All scheduled callbacks are
+    kept in a heap ordered by deadline and run one after the other by one
+    daemon thread, started on the first call to `schedule()`.
+
+    Callbacks run on the timer thread and must therefore be short and
+    non-blocking, e.g. putting an item back in a queue. Exceptions raised by a
+    callback are logged and do not stop the timer thread.
+
+    Attributes:
+        name (str): Name of the queue, used for the timer thread and in logs.
+        logger (logging.Logger): Logger instance for callback errors.
+        _heap (List[Tuple[float, int, DelayedCall]]): Scheduled calls ordered by deadline.
+        _sequence (itertools.count): Tie-breaker keeping the heap ordering stable.
+        _condition (threading.Condition): Protects the heap and wakes the timer thread.
+        _thread (Optional[threading.Thread]): The timer thread, once started.
+        scheduled (int): Number of calls scheduled.
+        fired (int): Number of calls run.
+
+    Example:
+        >>> call = DELAY_QUEUE.schedule(2.5, lambda: queue.put(task))
+        >>> call.cancel()
+    """
+
+    def __init__(self, name: str = "delay-queue") -> None:
+        """
+        Initializes an empty delay queue. The timer thread is started lazily.
+
+        Args:
+            name (str, optional): Name of the queue. Defaults to ``"delay-queue"``.
+        """
+        self.name = name
+        self.logger = logging.getLogger("__main__." + __name__)
+        self._heap: List[Tuple[float, int, DelayedCall]] = []
+        self._sequence = itertools.count()
+        self._condition = threading.Condition()
+        self._thread: Optional[threading.Thread] = None
+        self.scheduled = 0
+        self.fired = 0
+
+    # PUBLIC API
+
+    def schedule(self, delay: float, callback: Callable[[], Any]) -> DelayedCall:
+        """
+        Schedules a callback to run after a delay.
+
+        Args:
+            delay (float): Delay in seconds. Negative delays run as soon as possible.
+            callback (Callable[[], Any]): The callback to run on the timer thread.
+
+        Returns:
+            DelayedCall: A handle that can be used to cancel the call.
+        """
+        call = DelayedCall(time.monotonic() + max(delay, 0.0), callback)
+        with self._condition:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name=self.name, daemon=True)
+                self._thread.start()
+            heapq.heappush(self._heap, (call.deadline, next(self._sequence), call))
+            self.scheduled += 1
+            self._condition.notify()
+        return call
+
+    def backlog(self) -> int:
+        """
+        Returns the number of calls waiting for their deadline.
+
+        Returns:
+            int: The number of scheduled calls not yet run, cancelled ones included.
+        """
+        with self._condition:
+            return len(self._heap)
+
+    def get_metrics(self) -> Dict[str, Any]:
+        """
+        Returns a snapshot of the delay queue counters.
+
+        Returns:
+            Dict[str, Any]: Current backlog, and number of scheduled and fired calls.
+        """
+        with self._condition:
+            return {
+                "backlog": len(self._heap),
+                "scheduled": self.scheduled,
+                "fired": self.fired,
+            }
+
+    # INTERNALS
+
+    def _run(self) -> None:
+        """
+        Timer thread loop: waits for the earliest deadline and runs the due calls.
+        """
+        while True:
+            with self._condition:
+                while not self._heap or self._heap[0][0] > time.monotonic():
+                    self._condition.wait(self._heap[0][0] - time.monotonic() if self._heap else None)
+                _, _, call = heapq.heappop(self._heap)
+                if call.cancelled:
+                    continue
+                self.fired += 1
+            try:
+                call.callback()
+            except Exception as e:
+                self.logger.error(f"Delay queue {self.name}: Delayed call failed: {e}")
+
+
+class RateMeter:
+    """
+    Counts events over a sliding time window.
+
+    Attributes:
+        window (float): Length of the window in seconds.
+        _events (Deque[float]): Monotonic times of the events within the window.
+        _lock (threading.Lock): Lock protecting the events.
+
+    Example:
+        >>> retries = RateMeter(window=60)
+        >>> retries.mark()
+        >>> retries.rate()
+        0.016666666666666666
+    """
+
+    def __init__(self, window: float = 60) -> None:
+        """
+        Initializes a meter with no events.
+
+        Args:
+            window (float, optional): Length of the window in seconds. Defaults to 60.
+        """
+        self.window = window
+        self._events: Deque[float] = deque()
+        self._lock = threading.Lock()
+
+    def mark(self) -> None:
+        """
+        Records an event now.
+        """
+        now = time.monotonic()
+        with self._lock:
+            self._events.append(now)
+            self._expire(now)
+
+    def rate(self) -> float:
+        """
+        Returns the number of events per second over the window.
+
+        Returns:
+            float: Events in the window divided by its length.
+        """
+        with self._lock:
+            self._expire(time.monotonic())
+            return len(self._events) / self.window
+
+    def _expire(self, now: float) -> None:
+        """
+        Drops the events older than the window. Must be called with the lock held.
+        """
+        while self._events and self._events[0] <= now - self.window:
+            self._events.popleft()
+
+
+DELAY_QUEUE = DelayQueue()
+"""
+Process-wide delay queue shared by all database and producer instances.
+
+Failed queries and messages are put back in their queue by this delay queue
+at their backoff deadline, without holding a worker thread while waiting.
+"""
@@ -0,0 +1,51 @@
+from concurrent.futures import Future
+from typing import Any, Coroutine, Optional
+import asyncio
+import threading
+
+
+_loop: Optional[asyncio.AbstractEventLoop] = None
+_loop_lock = threading.Lock()
+
+
+def get_event_loop() -> asyncio.AbstractEventLoop:
+    """
+    Returns the process-wide asyncio event loop, starting it on first use.
+
+    The loop runs forever in a single daemon thread and is shared by every
+    asyncio-based component (e.g. `AsyncBaseDatabase` instances), so that
+    thousands of concurrent I/O operations cost one OS thread in total.
+    Code running in other threads must hand work to it with
+    `run_coroutine` or `asyncio.run_coroutine_threadsafe`.
+
+    Returns:
+        asyncio.AbstractEventLoop: The running shared event loop.
+    """
+    global _loop
+    with _loop_lock:
+        if _loop is None:
+            loop = asyncio.new_event_loop()
+            started = threading.Event()
+
+            def _run() -> None:
+                asyncio.set_event_loop(loop)
+                loop.call_soon(started.set)
+                loop.run_forever()
+
+            threading.Thread(target=_run, name="shared-event-loop", daemon=True).start()
+            started.wait()
+            _loop = loop
+        return _loop
+
+
+def run_coroutine(coro: Coroutine[Any, Any, Any]) -> Future:
+    """
+    Schedules a coroutine on the shared event loop from any thread.
+
+    Args:
+        coro (Coroutine[Any, Any, Any]): The coroutine to run.
+
+    Returns:
+        Future: A `concurrent.futures.Future` resolved with the result of the coroutine.
+    """
+    return asyncio.run_coroutine_threadsafe(coro, get_event_loop())
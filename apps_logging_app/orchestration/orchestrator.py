@@ -50,6 +50,14 @@ class BaseOrchestrator(ABC):
         self._connected = False
         self._lock = threading.Lock()
 
+    @property
+    def connected(self) -> bool:
+        """
+        bool: Whether the last connection attempt succeeded and the resource has not been
+        marked as disconnected since. Unlike `_is_connected`, it does not query the resource.
+        """
+        return self._connected
+
     def ensure_connected(self) -> None:
         """
         Ensures that the resource is connected, establishing a connection if needed.
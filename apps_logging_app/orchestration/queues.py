@@ -0,0 +1,221 @@
+from collections import deque
+from queue import Empty, Full
+from typing import Any, Callable, Deque, List, Optional
+import threading
+import time
+
+
+class PriorityLaneQueue:
+    """
+    Thread-safe FIFO queue with strict-priority lanes and an optional bound.
+
+    Items are put in one of `lanes` lanes, lane 0 having the highest priority:
+    `get()` always returns the oldest item of the highest-priority non-empty
+    lane. Within a lane, items keep their insertion order.
+
+    When `maxsize` is greater than 0, the total number of items is bounded and
+    `put()` behaves like `queue.Queue.put()`: it blocks until space is available
+    (optionally up to a timeout) or raises `queue.Full`. Two escape hatches are
+    available when the queue is full:
+        - `evict`: a predicate selecting a queued item that may be replaced by the
+          new one. The oldest matching item is removed and returned.
+        - `force`: ignore the bound, e.g. for internal retries that must never be lost.
+
+    The queue supports `task_done()` and `join()` with the same semantics as
+    `queue.Queue`, so it can replace it in dispatcher loops.
+
+    Attributes:
+        maxsize (int): Maximum number of queued items, or 0 for an unbounded queue.
+        _lanes (List[Deque[Any]]): Queued items of each lane.
+        _mutex (threading.Lock): Lock protecting the lanes and counters.
+        _not_empty (threading.Condition): Notified when an item is put.
+        _not_full (threading.Condition): Notified when an item is removed.
+        _all_tasks_done (threading.Condition): Notified when every item has been processed.
+        _unfinished_tasks (int): Number of items put and not yet marked done.
+
+    Example:
+        >>> queue = PriorityLaneQueue(maxsize=100, lanes=2)
+        >>> queue.put("refresh", lane=1)
+        >>> queue.put("error", lane=0)
+        >>> queue.get()
+        'error'
+    """
+
+    def __init__(self, maxsize: int = 0, lanes: int = 2) -> None:
+        """
+        Initializes an empty queue.
+
+        Args:
+            maxsize (int, optional): Maximum number of queued items, or 0 for no bound. Defaults to 0.
+            lanes (int, optional): Number of priority lanes. Defaults to 2.
+
+        Raises:
+            ValueError: If `maxsize` is negative or `lanes` is less than 1.
+        """
+        if maxsize < 0:
+            raise ValueError("Max size must be greater than or equal to 0")
+        if lanes < 1:
+            raise ValueError("Lanes must be greater than 0")
+        self.maxsize = maxsize
+        self._lanes: List[Deque[Any]] = [deque() for _ in range(lanes)]
+        self._mutex = threading.Lock()
+        self._not_empty = threading.Condition(self._mutex)
+        self._not_full = threading.Condition(self._mutex)
+        self._all_tasks_done = threading.Condition(self._mutex)
+        self._unfinished_tasks = 0
+
+    # PUBLIC API
+
+    def put(self, item: Any, lane: int = 0, block: bool = True, timeout: Optional[float] = None,
+            evict: Optional[Callable[[Any], bool]] = None, force: bool = False) -> Optional[Any]:
+        """
+        Puts an item at the end of a lane.
+
+        Args:
+            item (Any): The item to queue.
+            lane (int, optional): The lane of the item, 0 being the highest priority. Values
+                outside the range of lanes are clamped. Defaults to 0.
+            block (bool, optional): Wait for space when the queue is full. Defaults to True.
+            timeout (Optional[float], optional): Maximum wait in seconds when blocking. Defaults to None (no limit).
+            evict (Optional[Callable[[Any], bool]], optional): When the queue is full, the oldest
+                queued item matching this predicate is removed and replaced by `item`, without
+                blocking. If no item matches, `queue.Full` is raised. Defaults to None.
+            force (bool, optional): Put the item even if the queue is full. Defaults to False.
+
+        Returns:
+            Optional[Any]: The evicted item, or None if no item was evicted.
+
+        Raises:
+            queue.Full: If the queue is full and the item could not be queued.
+        """
+        lane = min(max(lane, 0), len(self._lanes) - 1)
+        evicted = None
+        with self._not_full:
+            if self.maxsize > 0 and not force and self._qsize() >= self.maxsize:
+                if evict is not None:
+                    evicted = self._evict(evict)
+                    if evicted is None:
+                        raise Full
+                elif not block:
+                    raise Full
+                elif timeout is None:
+                    while self._qsize() >= self.maxsize:
+                        self._not_full.wait()
+                else:
+                    deadline = time.monotonic() + timeout
+                    while self._qsize() >= self.maxsize:
+                        remaining = deadline - time.monotonic()
+                        if remaining <= 0:
+                            raise Full
+                        self._not_full.wait(remaining)
+            self._lanes[lane].append(item)
+            if evicted is None:
+                self._unfinished_tasks += 1
+            self._not_empty.notify()
+        return evicted
+
+    def get(self, block: bool = True, timeout: Optional[float] = None) -> Any:
+        """
+        Removes and returns the oldest item of the highest-priority non-empty lane.
+
+        Args:
+            block (bool, optional): Wait for an item when the queue is empty. Defaults to True.
+            timeout (Optional[float], optional): Maximum wait in seconds when blocking. Defaults to None (no limit).
+
+        Returns:
+            Any: The item.
+
+        Raises:
+            queue.Empty: If no item is available.
+        """
+        with self._not_empty:
+            if not block:
+                if not self._qsize():
+                    raise Empty
+            elif timeout is None:
+                while not self._qsize():
+                    self._not_empty.wait()
+            else:
+                deadline = time.monotonic() + timeout
+                while not self._qsize():
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        raise Empty
+                    self._not_empty.wait(remaining)
+            for items in self._lanes:
+                if items:
+                    item = items.popleft()
+                    break
+            self._not_full.notify()
+            return item
+
+    def task_done(self) -> None:
+        """
+        Marks a previously queued item as processed.
+
+        Raises:
+            ValueError: If called more times than there were items put.
+        """
+        with self._all_tasks_done:
+            unfinished = self._unfinished_tasks - 1
+            if unfinished < 0:
+                raise ValueError("task_done() called too many times")
+            self._unfinished_tasks = unfinished
+            if unfinished == 0:
+                self._all_tasks_done.notify_all()
+
+    def join(self) -> None:
+        """
+        Blocks until every queued item has been processed.
+        """
+        with self._all_tasks_done:
+            while self._unfinished_tasks:
+                self._all_tasks_done.wait()
+
+    def qsize(self) -> int:
+        """
+        Returns the total number of queued items.
+
+        Returns:
+            int: The number of items in all lanes.
+        """
+        with self._mutex:
+            return self._qsize()
+
+    def lane_sizes(self) -> List[int]:
+        """
+        Returns the number of queued items of each lane.
+
+        Returns:
+            List[int]: The size of each lane, highest priority first.
+        """
+        with self._mutex:
+            return [len(items) for items in self._lanes]
+
+    # INTERNALS
+
+    def _qsize(self) -> int:
+        """
+        Returns the total number of queued items. Must be called with the mutex held.
+        """
+        return sum(len(items) for items in self._lanes)
+
+    def _evict(self, predicate: Callable[[Any], bool]) -> Optional[Any]:
+        """
+        Removes the oldest queued item matching a predicate. Must be called with the mutex held.
+
+        Lanes are scanned from the lowest priority to the highest, so that
+        high-priority items are evicted last.
+
+        Args:
+            predicate (Callable[[Any], bool]): Selects the items that may be evicted.
+
+        Returns:
+            Optional[Any]: The removed item, or None if no item matches.
+        """
+        for items in reversed(self._lanes):
+            for index, item in enumerate(items):
+                if predicate(item):
+                    del items[index]
+                    return item
+        return None
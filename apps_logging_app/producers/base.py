@@ -1,26 +1,49 @@
 from abc import ABC, abstractmethod
 import logging
-from queue import Queue, Empty
-from threading import Thread, Event
+from queue import Empty, Full
+from threading import Thread, Event, Lock
+from typing import Any, Dict, List, Tuple
 import random 
 import time
 
 from .model import BaseProducerConfig
 from .data import Message
+from .partition import ProducerPartition, partition_for
+from .serializers import SERIALIZATION_CACHE, get_serializer
+from .spool import MessageSpool, ReplayBatch
+from ..orchestration.delay_queue import DELAY_QUEUE, RateMeter
+from ..orchestration.queues import PriorityLaneQueue
 
 class BaseProducer(ABC):
     """
     Abstract base class for message producers with asynchronous processing and retry logic.
 
     `BaseProducer` provides a framework for sending messages to external systems
-    in a reliable, thread-safe manner. It manages an internal message queue,
-    processes messages in a background worker thread, and integrates with a
+    in a reliable, thread-safe manner. It manages internal message queues,
+    processes messages in background worker threads, and integrates with a
     connection orchestrator to ensure that the producer is connected before sending.
 
     Features:
-        - Threaded message processing with a worker thread.
-        - Queue-based message buffering.
-        - Automatic retries with exponential backoff for failed messages.
+        - Threaded message processing with `config.workers` worker threads.
+        - Queue-based message buffering, one queue (`ProducerPartition`) per worker,
+          optionally bounded by `config.max_queue_size`. A full queue sheds the
+          messages of lowest severity first, so that errors are dropped last
+          (see `enqueue_message`).
+          Messages are routed by the CRC-32 of their `key`, or of their source (or
+          topic) when they have none, so messages sharing a key, and the messages
+          of a data connection without key, are sent in order by the same worker,
+          while a slow send on one worker does not hold the others.
+        - Micro-batching: each worker hands up to `config.batch_max_size` messages at a
+          time to `_send_batch`, which subclasses can override to send whole batches.
+        - Automatic retries with exponential backoff for failed messages, scheduled on
+          the shared `DELAY_QUEUE` so that the worker keeps sending other messages.
+        - Pluggable encoding of the messages (`config.serializer`, see `serializers`),
+          with the encoded payloads shared through `SERIALIZATION_CACHE`.
+        - Optional disk spool (`config.spool`, see `MessageSpool`): while the target
+          system is unreachable, messages are appended to disk instead of piling up in
+          memory, and a replay thread, which also owns the reconnection, puts them back
+          in the queues in order once the producer is connected again, and commits them
+          once they are delivered.
         - Abstract methods for connection management and message sending, allowing
           concrete subclasses to implement specific producer behavior.
         - Logging of all important events, errors, and retry attempts.
@@ -28,26 +51,50 @@ class BaseProducer(ABC):
     Attributes:
         config (BaseProducerConfig): Configuration object containing producer parameters.
         logger (logging.Logger): Logger for reporting events and errors.
-        _queue (Queue): Internal queue holding messages to be sent.
-        _stop_event (Event): Event used to signal the worker thread to stop.
-        _worker_thread (Thread): Background thread that processes messages from the queue.
+        serializer (BaseSerializer): Encoding of the messages selected by `config.serializer`.
+        _partitions (List[ProducerPartition]): Queue and counters of each worker.
+        _stop_event (Event): Event used to signal the worker threads to stop.
+        _worker_threads (List[Thread]): Background threads, one per partition, that process the messages.
         orchestrator: Optional orchestrator used to ensure reliable connectivity.
+        _retries (RateMeter): Retries scheduled over the last minute.
+        _delayed_lock (Lock): Lock protecting `delayed_retries`.
+        delayed_retries (int): Number of failed messages waiting for their backoff deadline.
+        _drops_lock (Lock): Lock protecting the drop counters.
+        dropped_messages (Dict[str, int]): Number of messages dropped by a full queue, keyed by
+            `Message.source` (``unknown`` for messages without source).
+        dropped_by_severity (Dict[str, int]): Number of dropped messages of each severity.
+        _spool (MessageSpool | None): Disk spool of the producer, if `config.spool` is set.
+        _spool_thread (Thread | None): Background thread replaying the spool, if `config.spool` is set.
+        _spill_lock (Lock): Lock serializing the appends to the spool, so that the messages
+            drained from the queues are appended in order.
+        ASYNCHRONOUS_DELIVERY (bool): Whether `_send` returns before the message is delivered,
+            the subclass then reporting each delivery to `_on_send_succeeded` or `_on_send_failed`.
+            Defaults to False: a message sent without error is delivered.
 
     Methods:
-        start(): Starts the background worker thread for message processing.
-        enqueue_message(message): Adds a message to the internal queue.
-        stop(timeout=None): Stops the worker thread and closes the producer.
+        start(): Starts the background worker threads (and spool replay thread) for message processing.
+        enqueue_message(message): Adds a message to the queue of its partition.
+        stop(timeout=None): Stops the worker threads and closes the producer.
+        get_metrics(): Returns the queue and retry counters of the producer.
         is_connected(): Abstract method to check connection status.
         connect(): Abstract method to establish a connection.
         close(): Abstract method to cleanly close the producer.
         _send(message): Abstract method to send a message to the target system.
+        _send_batch(messages): Sends a batch of messages, by default with `_send`.
+        _on_send_failed(message, error): Retry logic, also called by asynchronous
+            producers when the delivery of a message fails.
+        _on_send_succeeded(message): Delivery hook, also called by asynchronous
+            producers when the delivery of a message is acknowledged.
+        _is_connection_error(error): Whether a send error means that the target system is unreachable.
     
     """
+    ASYNCHRONOUS_DELIVERY = False
+
     def __init__(self, config: BaseProducerConfig):
         """
         Initializes the BaseProducer with the given configuration.
 
-        Sets up the internal message queue, stop event, and background worker thread
+        Sets up the internal message queues, stop event, and background worker threads
         for asynchronous message processing. Also initializes the logger and
         prepares the producer for integration with an orchestrator.
 
@@ -56,23 +103,61 @@ class BaseProducer(ABC):
                 parameters such as type, name, and maximum retries.
 
         Behavior:
-            - Creates a thread-safe queue for storing messages to be sent.
-            - Creates an Event used to signal the worker thread to stop.
-            - Initializes a daemon thread that runs the `_worker` method for message processing.
+            - Creates `config.workers` partitions, each with a thread-safe queue for storing
+                messages to be sent and its own counters.
+            - Creates an Event used to signal the worker threads to stop.
+            - Initializes one daemon thread per partition that runs the `_worker` method for message processing.
             - Sets the `orchestrator` attribute to None (can be assigned later).
+            - Initializes the retry rate meter and the delayed retry counter.
+            - Initializes the drop counters.
+            - Selects the serializer of `config.serializer`, falling back to ``json`` with a
+                warning if the library it relies on is not installed.
+            - Opens the spool of the producer under ``<config.spool.path>/<type>-<name>`` and
+                creates its replay thread, if `config.spool` is set. Messages left in the spool
+                by a previous run are replayed once the producer is connected.
             - Logs an informational message indicating the producer has been initialized.
         
         """
         self.config = config
         self.logger = logging.getLogger("__main__." +__name__)
-        self._queue = Queue()
+        self.serializer = get_serializer(self.config.serializer)
+        if not self.serializer.available():
+            self.logger.warning(f"Producer {self.config.type}-{self.config.name}: Serializer {self.config.serializer} not available, using json")
+            self.serializer = get_serializer("json")
+        self._partitions = [ProducerPartition(i, self.config.max_queue_size) for i in range(self.config.workers)]
         self._stop_event = Event()
-        self._worker_thread = Thread(
-            target=self._worker,
-            name=f"{self.config.type}-{self.config.name}-producer-worker",
-            daemon=True
-        )
+        self._worker_threads = [
+            Thread(
+                target=self._worker,
+                args=(partition,),
+                name=f"{self.config.type}-{self.config.name}-producer-worker-{partition.index}",
+                daemon=True
+            )
+            for partition in self._partitions
+        ]
         self.orchestrator = None
+        self._retries = RateMeter()
+        self._delayed_lock = Lock()
+        self.delayed_retries = 0
+        self._drops_lock = Lock()
+        self.dropped_messages: Dict[str, int] = {}
+        self.dropped_by_severity: Dict[str, int] = {"error": 0, "warning": 0, "info": 0}
+        self._spool = None
+        self._spool_thread = None
+        self._spill_lock = Lock()
+        if self.config.spool is not None:
+            self._spool = MessageSpool(
+                self.config.spool.path / f"{self.config.type}-{self.config.name}",
+                segment_bytes=self.config.spool.segment_bytes,
+                max_bytes=self.config.spool.max_bytes,
+                fsync_policy=self.config.spool.fsync_policy,
+                fsync_interval=self.config.spool.fsync_interval,
+            )
+            self._spool_thread = Thread(
+                target=self._replay,
+                name=f"{self.config.type}-{self.config.name}-producer-spool",
+                daemon=True
+            )
         self.logger.info(f"Initialized producer: {self.config.type}-{self.config.name}")
 
 
@@ -80,65 +165,155 @@ class BaseProducer(ABC):
 
     def start(self) -> None:
         """
-        Starts the background worker thread for processing queued messages.
+        Starts the background worker threads for processing queued messages.
 
         Behavior:
-            - Launches the `_worker_thread` which continuously consumes messages
-                from the internal queue and sends them using the `_send` method.
+            - Launches the `_worker_threads`, each of which continuously consumes the
+                messages of its partition and sends them using the `_send_batch` method.
+            - Launches the `_spool_thread`, if any, which connects the producer and replays
+                the spool (see `_replay`).
             - Must be called before enqueueing messages for processing.
 
         Raises:
             RuntimeError: If the thread fails to start.
         
         """
-        self._worker_thread.start()
+        for thread in self._worker_threads:
+            thread.start()
+        if self._spool_thread is not None:
+            self._spool_thread.start()
 
-    def enqueue_message(self, message: Message) -> None:
+    def enqueue_message(self, message: Message, block: bool = True) -> None:
         """
-        Adds a message to the producer's internal queue for asynchronous processing.
+        Adds a message to the producer's internal queues for asynchronous processing.
 
         Args:
             message (Message): The message object to be sent by the producer.
+            block (bool, optional): Whether the ``block`` policy may wait for space. Callers
+                running on a thread that must not stall (a database worker, an event loop)
+                pass False: a message finding its queue full is then handled at once, as
+                with ``drop_newest``. Defaults to True.
 
         Behavior:
-            - Puts the message into the thread-safe internal queue `_queue`.
+            - Appends the message to the spool instead, if there is one and the producer is
+                disconnected or the spool still holds messages to replay, so that the message
+                is not sent before the ones spilled earlier.
+            - Puts the message into the queue of its partition (see `_partition_of`).
+            - When `config.max_queue_size` is set and the queue is full, the oldest queued
+                message of lower severity (see `Message.severity`) is dropped to make room.
+                If there is none, the `config.queue_full_policy` applies:
+                    - ``block``: waits up to `config.queue_put_timeout` seconds for space,
+                      then drops the message.
+                    - ``drop_newest``: drops the message at once.
+                    - ``drop_oldest``: drops the oldest queued message of the same severity.
+            - Appends the message that would be dropped to the spool instead, if there is one,
+                after the messages queued in its partitions, so that the spool absorbs the
+                overflow in order and the queued messages are replayed from it.
+            - Counts every dropped message under its `Message.source` and severity.
             - Logs an informational message indicating the message has been queued.
 
         Raises:
-            Exception: Propagates any exception raised while adding the message to the queue,
-                such as a full queue or other unexpected errors. Logs an error before raising.
+            Exception: Propagates any unexpected exception raised while adding the message
+                to the queue. Logs an error before raising. A full queue does not raise.
         
         """
+        if self._spool is not None and (not self.orchestrator.connected or self._spool.pending()):
+            self._spill([message], after_queued=True)
+            return
+
         try:
-            self._queue.put(message)
+            dropped = self._put(self._partition_of(message).queue, message, block)
             self.logger.info(f"Putting message in queue: {message}")
+        except Full:
+            dropped = message
         except Exception as e:
             self.logger.error(f"Producer {self.config.type}-{self.config.name}: Queue full or error putting message: {e}")
             raise
 
+        if dropped is not None:
+            if self._spool is not None:
+                self._spill([dropped], after_queued=dropped is message, drain=True)
+            else:
+                self._record_drop(dropped, "Queue full")
+
     def stop(self, timeout: float | None = None) -> None:
         """
-        Stops the producer by signaling the worker thread to terminate and closing resources.
+        Stops the producer by signaling the worker threads to terminate and closing resources.
 
         Args:
-            timeout (float | None): Maximum time in seconds to wait for the worker thread
+            timeout (float | None): Maximum time in seconds to wait for the worker threads
                 to finish. If `None`, waits indefinitely.
 
         Behavior:
-            - Sets the `_stop_event` to signal the worker thread to stop processing messages.
-            - Joins the `_worker_thread`, waiting up to `timeout` seconds for it to finish.
-            - Calls the `close()` method to cleanly release resources.
+            - Sets the `_stop_event` to signal the worker threads to stop processing messages.
+            - Joins the `_worker_threads` and the `_spool_thread`, waiting up to `timeout` seconds
+                in total for them to finish.
+            - Calls the `close()` method to cleanly release resources. The deliveries failing
+                while the producer is flushed go to the spool, if there is one.
+            - Appends the messages still queued to the spool and closes it, if there is one,
+                so that they are sent after a restart. The replayed messages still queued are
+                not appended again: their replay batch is not committed, so they are read
+                again from the spool, before the messages spilled after them.
             - Logs an informational message indicating that the producer has been shut down.
 
         Notes:
-            - Any messages remaining in the queue may not be processed if the timeout is reached.
+            - Without spool, any messages remaining in the queue may not be processed if the
+                timeout is reached.
         
         """
         self._stop_event.set()
-        self._worker_thread.join(timeout=timeout)
+        deadline = time.monotonic() + timeout if timeout is not None else None
+        for thread in self._worker_threads + ([self._spool_thread] if self._spool_thread is not None else []):
+            thread.join(timeout=max(0, deadline - time.monotonic()) if deadline is not None else None)
         self.close()
+        if self._spool is not None:
+            with self._spill_lock:
+                self._append(self._drain_queues())
+            self._spool.close()
         self.logger.info(f"Producer {self.config.type}-{self.config.name}: Producer shut down")
 
+    def get_metrics(self) -> Dict[str, Any]:
+        """
+        Returns a snapshot of the queue and retry counters of this producer.
+
+        Returns:
+            Dict[str, Any]: Number of queued and in-flight messages, queue bound per worker,
+            dropped messages (total, per source and per severity), retries per second
+            over the last minute, failed messages waiting for their retry deadline,
+            number of sent batches, their average and maximum size, the average and
+            maximum time in seconds spent sending a batch, the counters of each
+            worker under ``workers`` (see `ProducerPartition.get_metrics`), and the
+            counters of the spool under ``spool`` (see `MessageSpool.get_metrics`),
+            or None without spool, the name of the serializer and the counters of
+            the process-wide `SERIALIZATION_CACHE`.
+        """
+        with self._delayed_lock:
+            delayed_retries = self.delayed_retries
+        with self._drops_lock:
+            dropped_messages = dict(self.dropped_messages)
+            dropped_by_severity = dict(self.dropped_by_severity)
+        workers = [partition.get_metrics() for partition in self._partitions]
+        sent_batches = sum(worker["sent_batches"] for worker in workers)
+        return {
+            "queued_messages": sum(worker["queued_messages"] for worker in workers),
+            "in_flight_messages": sum(worker["in_flight_messages"] for worker in workers),
+            "max_queue_size": self.config.max_queue_size,
+            "dropped_messages": sum(dropped_messages.values()),
+            "dropped_messages_by_source": dropped_messages,
+            "dropped_messages_by_severity": dropped_by_severity,
+            "retries_per_second": self._retries.rate(),
+            "delayed_retries": delayed_retries,
+            "sent_batches": sent_batches,
+            "batch_size_avg": sum(worker["batched_messages"] for worker in workers) / sent_batches if sent_batches else 0.0,
+            "batch_size_max": max(worker["batch_size_max"] for worker in workers),
+            "batch_latency_avg": sum(worker["batch_latency_total"] for worker in workers) / sent_batches if sent_batches else 0.0,
+            "batch_latency_max": max(worker["batch_latency_max"] for worker in workers),
+            "workers": workers,
+            "spool": self._spool.get_metrics() if self._spool is not None else None,
+            "serializer": self.serializer.name,
+            "serialization_cache": SERIALIZATION_CACHE.get_metrics(),
+        }
+
     @abstractmethod
     def is_connected(self) -> bool:
         """
@@ -198,24 +373,34 @@ class BaseProducer(ABC):
 
     # INTERNALS
 
-    def _worker(self) -> None:
+    def _worker(self, partition: ProducerPartition) -> None:
         """
-        Background worker method that processes messages from the internal queue.
+        Background worker method that processes the messages of a partition.
 
-        Continuously runs in a separate thread, fetching messages from `_queue`,
-        ensuring the producer is connected via the orchestrator, and sending messages
-        using the `_send` method. Implements automatic retries with exponential
-        backoff for failed messages.
+        Continuously runs in a separate thread, fetching batches of messages from
+        the queue of `partition`, ensuring the producer is connected via the orchestrator, and
+        sending them using the `_send_batch` method. Implements automatic retries
+        with exponential backoff for failed messages.
 
         Behavior:
-            - Checks connection status using `self.orchestrator.ensure_connected()`.
-            - Retrieves messages from `_queue` with a 0.5 second timeout.
-            - Attempts to send each message; on failure, logs a warning and marks the
-                orchestrator as disconnected.
-            - Retries failed messages up to `config.max_retries` using exponential
-                backoff with a random jitter.
-            - Raises an exception if the maximum retry count is reached.
-            - Calls `_queue.task_done()` after processing each message.
+            - Checks connection status using `self.orchestrator.ensure_connected()`. With a
+                spool, the connection is left to the `_replay` thread: a batch taken while the
+                producer is disconnected is appended to the spool instead of waiting.
+            - Retrieves messages from `partition.queue` with a 0.5 second timeout, then drains up
+                to `config.batch_max_size` messages, waiting at most `config.batch_linger_ms`
+                milliseconds for more (see `_next_batch`).
+            - Checks the connection once per batch and sends it with `_send_batch`,
+                recording the batch size, latency and failures on `partition`.
+            - Hands each message sent without error to `_on_send_succeeded`, unless the
+                producer reports its deliveries itself (`ASYNCHRONOUS_DELIVERY`).
+            - Hands each failed message, or every message of the batch if `_send_batch`
+                raises, to `_on_send_failed`, which retries it up to `config.max_retries`
+                times with exponential backoff, spools it or drops it (see `_on_send_failed`).
+                The worker never stops on a failed message.
+            - Calls `partition.queue.task_done()` after processing each message.
+
+        Args:
+            partition (ProducerPartition): The partition consumed by the worker.
 
         Notes:
             - This method is intended to run in a daemon thread and should not be
@@ -223,34 +408,388 @@ class BaseProducer(ABC):
             - Ensures that messages are retried in a fault-tolerant manner.
         
         """
-        self.orchestrator.ensure_connected()
+        if self._spool is None:
+            self.orchestrator.ensure_connected()
 
         while not self._stop_event.is_set():
             try:
-                message = self._queue.get(timeout=0.5)
+                message = partition.queue.get(timeout=0.5)
             except Empty:
                 continue
+            batch = self._next_batch(partition, message)
+            if self._spool is not None and not self.orchestrator.connected:
+                self._spill(batch)
+                for _ in batch:
+                    partition.queue.task_done()
+                continue
+            partition.begin_batch(len(batch))
+            latency = None
             try:
                 self.orchestrator.ensure_connected()
-                self._send(message)
-                self.logger.info(f"Producer {self.config.type}-{self.config.name}: Message sent: {message.message}")
-            except Exception:
-                self.logger.warning(f"Producer {self.config.type}-{self.config.name}: Failed to send message")
-                self.orchestrator.mark_disconnected()
-                
-                retries = message.retries
-
-                if retries < self.config.max_retries:
-                    message.retries = retries + 1
-                    backoff = (2 ** retries) + random.uniform(0, 10)
-                    self.logger.info(f"Producer {self.config.type}-{self.config.name}: Retrying message in {backoff} seconds: {message.message}")
-                    time.sleep(backoff)
-                    self._queue.put(message)
-                else:
-                    self.logger.error(f"Producer {self.config.type}-{self.config.name}: Max retry reached for message: {message.message}")
-                    raise
+                start = time.monotonic()
+                failed = self._send_batch(batch)
+                latency = time.monotonic() - start
+                self.logger.debug(f"Producer {self.config.type}-{self.config.name}: Worker {partition.index}: Batch of {len(batch)} messages sent, {len(failed)} failed")
+            except Exception as e:
+                failed = [(message, e) for message in batch]
+            partition.end_batch(len(batch), len(failed), latency)
+            try:
+                if not self.ASYNCHRONOUS_DELIVERY:
+                    failed_ids = {id(message) for message, _ in failed}
+                    for message in batch:
+                        if id(message) not in failed_ids:
+                            self._on_send_succeeded(message)
+                spilled = []
+                for message, error in failed:
+                    self._on_send_failed(message, error, spilled)
+                if spilled:
+                    self._spill(spilled)
             finally:
-                self._queue.task_done()
+                for _ in batch:
+                    partition.queue.task_done()
+
+    def _next_batch(self, partition: ProducerPartition, first: Message) -> List[Message]:
+        """
+        Collects the batch started by a message just taken from a partition.
+
+        Takes the messages already queued, up to `config.batch_max_size`, and waits
+        up to `config.batch_linger_ms` milliseconds after `first` for more.
+
+        Args:
+            partition (ProducerPartition): The partition of the worker.
+            first (Message): The first message of the batch.
+
+        Returns:
+            List[Message]: The messages of the batch, in queue order.
+        """
+        batch = [first]
+        deadline = time.monotonic() + self.config.batch_linger_ms / 1000
+        while len(batch) < self.config.batch_max_size:
+            remaining = deadline - time.monotonic()
+            try:
+                batch.append(partition.queue.get(timeout=remaining) if remaining > 0 else partition.queue.get(block=False))
+            except Empty:
+                break
+        return batch
+
+    def _put(self, queue: PriorityLaneQueue, message: Message, block: bool = True) -> Message | None:
+        """
+        Puts a message in a partition queue, shedding by severity when it is full.
+
+        Args:
+            queue (PriorityLaneQueue): The queue of the partition of the message.
+            message (Message): The message to queue.
+            block (bool, optional): Whether the ``block`` policy may wait for space. Defaults to True.
+
+        Returns:
+            Message | None: The queued message dropped to make room, or None.
+
+        Raises:
+            queue.Full: If the message itself must be dropped.
+        """
+        severity = message.severity
+        if severity > 0:
+            try:
+                return queue.put(message, evict=lambda queued: queued.severity < severity)
+            except Full:
+                pass
+        if self.config.queue_full_policy == "drop_oldest":
+            return queue.put(message, evict=lambda queued: queued.severity == severity)
+        if self.config.queue_full_policy == "drop_newest" or not block:
+            return queue.put(message, block=False)
+        return queue.put(message, timeout=self.config.queue_put_timeout)
+
+    def _record_drop(self, message: Message, reason: str) -> None:
+        """
+        Counts a dropped message.
+
+        Args:
+            message (Message): The dropped message.
+            reason (str): Why the message was dropped, for the log.
+        """
+        source = message.source or "unknown"
+        with self._drops_lock:
+            self.dropped_messages[source] = self.dropped_messages.get(source, 0) + 1
+            self.dropped_by_severity[("info", "warning", "error")[message.severity]] += 1
+        self.logger.warning(f"Producer {self.config.type}-{self.config.name}: {reason}, message dropped: {source}")
+
+    def _spill(self, messages: List[Message], after_queued: bool = False, drain: bool = False) -> None:
+        """
+        Appends messages to the spool, with the messages still queued if the producer is disconnected.
+
+        While the producer is disconnected, or when `drain` is set, the messages
+        waiting in the partition queues are drained into the spool in the same
+        append, so that the spool keeps the order in which the messages were
+        enqueued and no queued message is sent after a newer spooled one.
+
+        Args:
+            messages (List[Message]): The messages to append, in order.
+            after_queued (bool, optional): Whether `messages` were enqueued after the queued
+                messages (a new message), rather than before them (a batch taken from the
+                queues, or a message in flight). Defaults to False.
+            drain (bool, optional): Whether to drain the queues even if the producer is
+                connected. Defaults to False.
+        """
+        with self._spill_lock:
+            queued = self._drain_queues() if drain or not self.orchestrator.connected else []
+            self._append(queued + messages if after_queued else messages + queued)
+
+    def _drain_queues(self) -> List[Message]:
+        """
+        Takes every message left in the partition queues. Must be called with `_spill_lock` held.
+
+        The replayed messages are not returned but given back to the spool (see
+        `_settle`): they are still in it and are read again once the producer is
+        connected.
+
+        Returns:
+            List[Message]: The other messages, in queue order for each partition.
+        """
+        drained = []
+        for partition in self._partitions:
+            while True:
+                try:
+                    message = partition.queue.get(block=False)
+                except Empty:
+                    break
+                partition.queue.task_done()
+                if message.replay is not None:
+                    self._settle(message, aborted=True)
+                else:
+                    drained.append(message)
+        return drained
+
+    def _append(self, messages: List[Message]) -> None:
+        """
+        Appends messages to the spool, dropping those beyond its size cap.
+
+        Replayed messages are given back to the spool instead (see `_settle`).
+
+        Args:
+            messages (List[Message]): The messages to append, in order.
+        """
+        spilled = []
+        for message in messages:
+            if message.replay is not None:
+                self._settle(message, aborted=True)
+            else:
+                spilled.append(message)
+        messages = spilled
+        if not messages:
+            return
+        appended = self._spool.append(messages)
+        self.logger.debug(f"Producer {self.config.type}-{self.config.name}: {appended} messages spooled")
+        for message in messages[appended:]:
+            self._record_drop(message, "Spool full")
+
+    def _replay(self) -> None:
+        """
+        Background thread connecting the producer and replaying its spool.
+
+        Behavior:
+            - Connects the producer with `self.orchestrator.ensure_connected()`, again after
+                every disconnection, so that the workers never block on the connection.
+            - Reads up to `config.batch_max_size` messages per worker from the spool and puts
+                them in the queues of their partitions regardless of `config.max_queue_size`,
+                as one `ReplayBatch`.
+            - Commits them once every one is delivered or dropped (see `_settle`), before
+                reading the next ones, so that a crash never loses a message read back from
+                the spool and the replay runs at the pace of the deliveries.
+            - Reads them again, once the producer is connected again, if a disconnection gave
+                one back to the spool; those already delivered are then sent twice. The retry
+                counts of the messages given back are carried over to the messages read again,
+                so that `config.max_retries` still applies, and consecutive interrupted
+                replays wait with an exponential backoff (1 second, doubled up to 60).
+            - Leaves them uncommitted when the producer stops, so that they are replayed after
+                a restart.
+            - Waits for new messages while the spool is empty.
+        """
+        chunk = self.config.batch_max_size * len(self._partitions)
+        aborted_retries: List[int] = []
+        aborts = 0
+        while not self._stop_event.is_set():
+            self.orchestrator.ensure_connected()
+            messages, position = self._spool.read(chunk)
+            if not messages:
+                self._spool.commit(position)
+                self._spool.wait(0.5)
+                continue
+            batch = ReplayBatch(len(messages))
+            for message, retries in zip(messages, aborted_retries):
+                message.retries = max(message.retries, retries)
+            for message in messages:
+                message.replay = batch
+                self._partition_of(message).queue.put(message, force=True)
+            while not batch.wait(0.1):
+                if self._stop_event.is_set():
+                    return
+            if batch.aborted:
+                aborted_retries = [message.retries for message in messages]
+                backoff = min(2 ** aborts, 60)
+                aborts += 1
+                self.logger.info(f"Producer {self.config.type}-{self.config.name}: Replay of {len(messages)} spooled messages interrupted by a disconnection, reading them again in {backoff} seconds")
+                self._stop_event.wait(backoff)
+                continue
+            aborted_retries = []
+            aborts = 0
+            self._spool.commit(position, len(messages))
+            self.logger.info(f"Producer {self.config.type}-{self.config.name}: Replayed {len(messages)} spooled messages")
+
+    def _partition_of(self, message: Message) -> ProducerPartition:
+        """
+        Returns the partition of a message.
+
+        A message with a key always goes to the partition of its key, so that
+        the messages sharing a key are sent in order by the same worker. A
+        message without key goes to the partition of its `Message.source`, or
+        of its topic when it has none, so that the successive results of a data
+        connection stay in order too. Ordering is best-effort once a send fails:
+        the retried message is queued after its backoff (see `_requeue`), behind
+        the messages of the same key queued in the meantime.
+
+        Args:
+            message (Message): The message to route.
+
+        Returns:
+            ProducerPartition: The partition whose worker sends the message.
+        """
+        if len(self._partitions) == 1:
+            return self._partitions[0]
+        key = message.key if message.key is not None else message.source or message.topic
+        return self._partitions[partition_for(key, len(self._partitions))]
+
+    def _on_send_failed(self, message: Message, error: Exception, spilled: List[Message] | None = None) -> bool:
+        """
+        Schedules the retry of a message that could not be sent.
+
+        Called by `_worker` when `_send` raises, and by producers sending
+        asynchronously when the target system reports a failed delivery (e.g.
+        from a delivery callback), so that both kinds of failure go through the
+        same retry logic.
+
+        Behavior:
+            - Logs a warning, and marks the orchestrator as disconnected if the error means
+                that the target system is unreachable (see `_is_connection_error`).
+            - Logs an error and drops the message if the maximum retry count is reached,
+                so that a message the target system keeps refusing is not retried forever.
+                A dropped replayed message is settled, so that its batch can be committed.
+            - Otherwise, if there is a spool, the error is a connection error and the producer
+                is now disconnected (`mark_disconnected()` keeps it connected while `is_connected()`
+                holds, e.g. on a Kafka leader change), counts a retry and appends the message to
+                the spool: it is replayed, with its retry count, once the connection is back. A
+                replayed message is given back to the spool instead, which still holds it (see
+                `_settle`).
+            - Otherwise, retries the message up to `config.max_retries` times using exponential
+                backoff with a random jitter: the message is put back in the queue of its partition by
+                the shared `DELAY_QUEUE` at its deadline, while the worker goes on
+                with the next messages.
+
+        Args:
+            message (Message): The message that could not be sent.
+            error (Exception): The send or delivery error.
+            spilled (List[Message] | None, optional): List collecting the messages to append to
+                the spool, which the caller appends in one `_spill`, so that the failed messages
+                of a batch stay together ahead of the queued ones. Defaults to None (appended at once).
+
+        Returns:
+            bool: `True` if the message was spooled, given back to the spool or a retry was scheduled, `False` if it
+            was dropped because the maximum retry count was reached.
+        """
+        connection_error = self._is_connection_error(error)
+        self.logger.warning(f"Producer {self.config.type}-{self.config.name}: Failed to send message: {error}")
+        if connection_error:
+            self.orchestrator.mark_disconnected()
+
+        retries = message.retries
+
+        if retries < self.config.max_retries:
+            message.retries = retries + 1
+            if connection_error and self._spool is not None and not self.orchestrator.connected:
+                if message.replay is not None:
+                    self._settle(message, aborted=True)
+                elif spilled is not None:
+                    spilled.append(message)
+                else:
+                    self._spill([message])
+                return True
+            backoff = (2 ** retries) + random.uniform(0, 10)
+            self.logger.info(f"Producer {self.config.type}-{self.config.name}: Retrying message in {backoff} seconds: {message.message}")
+            self._retries.mark()
+            with self._delayed_lock:
+                self.delayed_retries += 1
+            DELAY_QUEUE.schedule(backoff, lambda message=message: self._requeue(message))
+            return True
+
+        self.logger.error(f"Producer {self.config.type}-{self.config.name}: Max retry reached for message: {message.message}")
+        self._record_drop(message, "Max retry reached")
+        self._settle(message)
+        return False
+
+    def _on_send_succeeded(self, message: Message) -> None:
+        """
+        Records the delivery of a message.
+
+        Called by `_worker` for each message sent without error, and by producers
+        sending asynchronously (`ASYNCHRONOUS_DELIVERY`) when the target system
+        acknowledges a message (e.g. from a delivery callback), so that a message
+        read back from the spool is only committed once it is delivered.
+
+        Args:
+            message (Message): The delivered message.
+        """
+        self._settle(message)
+
+    def _settle(self, message: Message, aborted: bool = False) -> None:
+        """
+        Settles a message in its `ReplayBatch`, if it was read back from the spool.
+
+        A message is settled once, when it is delivered, dropped, or given back to
+        the spool (`aborted`) because the producer disconnected before delivering it.
+
+        Args:
+            message (Message): The message.
+            aborted (bool, optional): Whether the message is given back to the spool. Defaults to False.
+        """
+        batch = message.replay
+        if batch is not None:
+            message.replay = None
+            batch.settle(aborted)
+
+    def _is_connection_error(self, error: Exception) -> bool:
+        """
+        Returns whether a send or delivery error means that the target system is unreachable.
+
+        Connection errors mark the producer disconnected and, with a spool, send the
+        message to the spool. Other errors (e.g. a message refused by the target
+        system) are retried in memory and the message is dropped after
+        `config.max_retries` retries.
+
+        The default implementation accepts `ConnectionError` and `TimeoutError`, and
+        any error raised while `is_connected()` is False. Subclasses can override it
+        to recognize the errors of their client.
+
+        Args:
+            error (Exception): The send or delivery error.
+
+        Returns:
+            bool: `True` if the error is a connection error.
+        """
+        return isinstance(error, (ConnectionError, TimeoutError)) or not self.is_connected()
+
+    def _requeue(self, message: Message) -> None:
+        """
+        Puts a failed message back in the queue once its backoff has elapsed.
+
+        Runs on the `DELAY_QUEUE` timer thread. Retried messages are queued even if
+        the queue is full, so that they are never dropped, at the tail of the queue:
+        they are sent after the messages queued during their backoff.
+
+        Args:
+            message (Message): The message to retry.
+        """
+        with self._delayed_lock:
+            self.delayed_retries -= 1
+        self._partition_of(message).queue.put(message, force=True)
 
     @abstractmethod
     def _send(self, message: Message) -> None:
@@ -268,10 +807,37 @@ class BaseProducer(ABC):
             - Called by the background `_worker` thread for each message in the queue.
             - Should raise an exception if the message cannot be sent successfully,
                 allowing the worker to handle retries.
+            - May return before the message is delivered; a delivery failure reported
+                later must then be handed to `_on_send_failed`.
 
         Raises:
             Exception: If the message cannot be sent.
         
         """
         pass
-    
\ No newline at end of file
+
+    def _send_batch(self, messages: List[Message]) -> List[Tuple[Message, Exception]]:
+        """
+        Sends a batch of messages to the target system.
+
+        The default implementation sends the messages one by one with `_send`.
+        Subclasses can override it to push the whole batch at once (e.g. a
+        single request, or one flush for the batch).
+
+        Args:
+            messages (List[Message]): The messages of the batch, in queue order.
+
+        Returns:
+            List[Tuple[Message, Exception]]: The messages that could not be sent, with
+            their error; they are retried by the worker.
+
+        Raises:
+            Exception: If the whole batch failed; every message of the batch is then retried.
+        """
+        failed = []
+        for message in messages:
+            try:
+                self._send(message)
+            except Exception as e:
+                failed.append((message, e))
+        return failed
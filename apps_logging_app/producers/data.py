@@ -1,4 +1,4 @@
-from typing import Any
+from typing import Any, Optional
 class Message:
     """
     Represents a message with a topic, type flags, content, and retry count.
@@ -13,8 +13,17 @@ class Message:
         is_warning (bool): Indicates whether the message is a warning.
         message (Any): The content of the message.
         retries (int): The number of times this message has been retried. Defaults to 0.
+        key (Optional[str]): Key of the message, rendered from the ``key_template`` of its data
+            connection. Messages with the same key are sent in order by the same producer worker,
+            and producers that support it (e.g. Kafka) use it as the record key; messages
+            without key are routed by `source`, or by topic when they have no source.
+        source (Optional[str]): Identifier of the data connection that produced the message,
+            used to count the messages dropped by a full producer queue.
+        replay (Optional[ReplayBatch]): Batch of a message read back from the producer spool,
+            settled once the message is delivered (see `spool.ReplayBatch`). None otherwise.
     """
-    def __init__(self, topic: str, is_error: bool, is_warning: bool, message: Any) -> None:
+    def __init__(self, topic: str, is_error: bool, is_warning: bool, message: Any, key: Optional[str] = None,
+                 source: Optional[str] = None) -> None:
         """
         Initializes a Message instance with the given topic, flags, and content.
 
@@ -23,6 +32,8 @@ class Message:
             is_error (bool): Whether the message represents an error.
             is_warning (bool): Whether the message represents a warning.
             message (Any): The content of the message.
+            key (Optional[str], optional): Key of the message. Defaults to None (routed by source, then topic).
+            source (Optional[str], optional): Identifier of the originating data connection. Defaults to None.
 
         Attributes:
             topic (str): The topic or category of the message.
@@ -30,12 +41,30 @@ class Message:
             is_warning (bool): Indicates if the message is a warning.
             message (Any): The content of the message.
             retries (int): The number of times this message has been retried. Initialized to 0.
+            key (Optional[str]): Key of the message.
+            source (Optional[str]): Identifier of the originating data connection.
+            replay (Optional[ReplayBatch]): Replay batch of the message. Initialized to None.
         """
         self.topic = topic
         self.is_error = is_error
         self.is_warning = is_warning
         self.message = message
         self.retries = 0
+        self.key = key
+        self.source = source
+        self.replay = None
+
+    @property
+    def severity(self) -> int:
+        """
+        int: 2 for an error, 1 for a warning, 0 for an informational message. A full
+        producer queue sheds the messages of lowest severity first.
+        """
+        if self.is_error:
+            return 2
+        if self.is_warning:
+            return 1
+        return 0
 
     def __repr__(self) -> str:
         return (
@@ -44,6 +73,8 @@ class Message:
             f"is_error={self.is_error!r}, "
             f"is_warning={self.is_warning!r}, "
             f"message={self.message!r}, "
-            f"retries={self.retries!r}"
+            f"retries={self.retries!r}, "
+            f"key={self.key!r}, "
+            f"source={self.source!r}"
             f")"
         )
\ No newline at end of file
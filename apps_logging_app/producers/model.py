@@ -1,5 +1,57 @@
+from pathlib import Path
 from pydantic import BaseModel, field_validator
-from typing import List
+from typing import List, Literal, Optional
+
+from .serializers import SERIALIZER_REGISTRY
+
+
+class SpoolConfig(BaseModel):
+    """
+    Configuration model for the disk spool of a producer.
+
+    When configured, the messages that cannot be sent while the target system
+    is unreachable are appended to segment files under `path` instead of being
+    kept in memory, and are replayed in order once the producer reconnects,
+    including after a restart (see `MessageSpool`).
+
+    Attributes:
+        path (Path): Directory of the spools. Each producer writes to its own
+            ``<type>-<name>`` subdirectory. Created if missing.
+        segment_bytes (int, optional): Size in bytes from which a segment file is closed
+            and a new one started. Defaults to 16 MiB.
+        max_bytes (int, optional): Maximum total size in bytes of the spool of a producer.
+            Messages spilled beyond it are dropped. Defaults to 1 GiB.
+        fsync_policy (str, optional): When appended messages are flushed to disk: ``always``
+            after every append, ``interval`` at most every `fsync_interval` seconds, or
+            ``never`` (left to the operating system). Defaults to ``interval``.
+        fsync_interval (float, optional): Interval in seconds of the ``interval`` policy. Defaults to 1.
+    """
+    path: Path
+    segment_bytes: int = 16 * 1024 * 1024
+    max_bytes: int = 1024 * 1024 * 1024
+    fsync_policy: Literal["always", "interval", "never"] = "interval"
+    fsync_interval: float = 1
+
+    @field_validator('segment_bytes', 'max_bytes', 'fsync_interval')
+    def validate_positive(cls, value, info):
+        """
+        Validates that the `segment_bytes`, `max_bytes` and `fsync_interval` fields are greater than 0.
+
+        Args:
+            cls (Type[SpoolConfig]): The class being validated.
+            value (float): The value provided for the field.
+            info (ValidationInfo): Information about the field being validated.
+
+        Returns:
+            float: The validated value.
+
+        Raises:
+            ValueError: If `value` is less than or equal to 0.
+        """
+        if value <= 0:
+            raise ValueError(f"{info.field_name.replace('_', ' ').capitalize()} must be greater than 0")
+        return value
+
 
 class BaseProducerConfig(BaseModel):
     """
@@ -14,11 +66,36 @@ class BaseProducerConfig(BaseModel):
         name (str): The name of the producer.
         topics (List[str], optional): A list of topics that this producer can handle. Defaults to None.
         max_retries (int, optional): Maximum number of retries for producer operations. Defaults to 5.
+        workers (int, optional): Number of worker threads, each sending the messages of its own queue.
+            Messages are routed by key, or by source (then topic) when they have none. Defaults to 1.
+        max_queue_size (int, optional): Maximum number of messages waiting in the queue of each worker.
+            Defaults to 0 (unbounded).
+        queue_full_policy (str, optional): Behaviour of `enqueue_message` when the queue is full and holds no
+            message of lower severity than the new one: ``block`` waits up to `queue_put_timeout` seconds for
+            space, then drops the new message; ``drop_newest`` drops the new message at once; ``drop_oldest``
+            drops the oldest queued message of the same severity. Defaults to ``block``.
+        queue_put_timeout (float, optional): Maximum wait in seconds of the ``block`` policy. Defaults to 5.
+        batch_max_size (int, optional): Maximum number of messages handed together to `BaseProducer._send_batch`.
+            Defaults to 100.
+        batch_linger_ms (float, optional): Time in milliseconds the worker waits for more messages after the
+            first one of a batch. Defaults to 0 (only the messages already queued are batched).
+        serializer (str, optional): Name of the encoding of the messages in `SERIALIZER_REGISTRY`:
+            ``json``, ``orjson``, ``msgpack`` or ``compact``. Defaults to ``json``.
+        spool (SpoolConfig, optional): Disk spool of the messages that cannot be sent while the target
+            system is unreachable, or that overflow a full queue. Defaults to None (no spool).
     """
     type: str
     name: str
     topics: List[str] = None
     max_retries: int = 5
+    workers: int = 1
+    max_queue_size: int = 0
+    queue_full_policy: Literal["block", "drop_newest", "drop_oldest"] = "block"
+    queue_put_timeout: float = 5
+    batch_max_size: int = 100
+    batch_linger_ms: float = 0
+    serializer: str = "json"
+    spool: Optional[SpoolConfig] = None
     
     @field_validator('max_retries')
     def validate_max_retries(cls, value):
@@ -41,3 +118,117 @@ class BaseProducerConfig(BaseModel):
         if value <= 0:
             raise ValueError("Max retries must be greater than 0")
         return value
+
+    @field_validator('serializer')
+    def validate_serializer(cls, value):
+        """
+        Validates that the `serializer` field names a registered serializer.
+
+        Args:
+            cls (Type[BaseProducerConfig]): The class being validated.
+            value (str): The value provided for `serializer`.
+
+        Returns:
+            str: The validated `serializer` value.
+
+        Raises:
+            ValueError: If no serializer is registered under `value`.
+        """
+        if value not in SERIALIZER_REGISTRY:
+            raise ValueError(f"Serializer must be one of: {', '.join(SERIALIZER_REGISTRY)}")
+        return value
+
+    @field_validator('workers')
+    def validate_workers(cls, value):
+        """
+        Validates that the `workers` field is greater than 0.
+
+        Args:
+            cls (Type[BaseProducerConfig]): The class being validated.
+            value (int): The value provided for `workers`.
+
+        Returns:
+            int: The validated `workers` value.
+
+        Raises:
+            ValueError: If `value` is less than or equal to 0.
+        """
+        if value <= 0:
+            raise ValueError("Workers must be greater than 0")
+        return value
+
+    @field_validator('max_queue_size')
+    def validate_max_queue_size(cls, value):
+        """
+        Validates that the `max_queue_size` field is not negative (0 means unbounded).
+
+        Args:
+            cls (Type[BaseProducerConfig]): The class being validated.
+            value (int): The value provided for `max_queue_size`.
+
+        Returns:
+            int: The validated `max_queue_size` value.
+
+        Raises:
+            ValueError: If `value` is less than 0.
+        """
+        if value < 0:
+            raise ValueError("Max queue size must be greater than or equal to 0")
+        return value
+
+    @field_validator('queue_put_timeout')
+    def validate_queue_put_timeout(cls, value):
+        """
+        Validates that the `queue_put_timeout` field is greater than 0.
+
+        Args:
+            cls (Type[BaseProducerConfig]): The class being validated.
+            value (float): The value provided for `queue_put_timeout`.
+
+        Returns:
+            float: The validated `queue_put_timeout` value.
+
+        Raises:
+            ValueError: If `value` is less than or equal to 0.
+        """
+        if value <= 0:
+            raise ValueError("Queue put timeout must be greater than 0")
+        return value
+
+    @field_validator('batch_max_size')
+    def validate_batch_max_size(cls, value):
+        """
+        Validates that the `batch_max_size` field is greater than 0.
+
+        Args:
+            cls (Type[BaseProducerConfig]): The class being validated.
+            value (int): The value provided for `batch_max_size`.
+
+        Returns:
+            int: The validated `batch_max_size` value.
+
+        Raises:
+            ValueError: If `value` is less than or equal to 0.
+        """
+        if value <= 0:
+            raise ValueError("Batch max size must be greater than 0")
+        return value
+
+    @field_validator('batch_linger_ms')
+    def validate_batch_linger_ms(cls, value):
+        """
+        Validates that the `batch_linger_ms` field is not negative.
+
+        Args:
+            cls (Type[BaseProducerConfig]): The class being validated.
+            value (float): The value provided for `batch_linger_ms`.
+
+        Returns:
+            float: The validated `batch_linger_ms` value.
+
+        Raises:
+            ValueError: If `value` is less than 0.
+        """
+        if value < 0:
+            raise ValueError("Batch linger must be greater than or equal to 0")
+        return value
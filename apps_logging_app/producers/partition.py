@@ -0,0 +1,125 @@
+from threading import Lock
+from typing import Any, Dict, Optional
+import zlib
+
+from ..orchestration.queues import PriorityLaneQueue
+
+
+def partition_for(key: str, partitions: int) -> int:
+    """
+    Returns the partition of a message key.
+
+    The CRC-32 of the key is stable across processes and restarts (unlike
+    ``hash()``), so a key always maps to the same worker for a given number of
+    partitions.
+
+    Args:
+        key (str): The message key.
+        partitions (int): Number of partitions.
+
+    Returns:
+        int: The partition index, between 0 and ``partitions - 1``.
+
+    Example:
+        >>> partition_for("oracle_topic", 4)
+        1
+    """
+    return zlib.crc32(key.encode("utf-8")) % partitions
+
+
+class ProducerPartition:
+    """
+    Queue and counters of one worker of a producer.
+
+    Each worker of a `BaseProducer` consumes its own partition, so a slow send
+    or a full batch on one partition does not delay the messages of the others,
+    and messages with the same key, always routed to the same partition, are
+    sent in order (until a send fails, see `BaseProducer._partition_of`).
+
+    Attributes:
+        index (int): Index of the partition.
+        queue (PriorityLaneQueue): Messages waiting to be sent by the worker, in a single FIFO
+            lane bounded by `maxsize`.
+        in_flight (int): Messages currently handed to `_send_batch` by the worker.
+        sent_messages (int): Messages sent by the worker, failed ones excluded.
+        failed_messages (int): Messages whose send failed on the worker.
+        sent_batches (int): Batches handed to `_send_batch` that returned.
+        batched_messages (int): Messages of the batches counted in `sent_batches`.
+        batch_size_max (int): Largest batch handed to `_send_batch`.
+        batch_latency_total (float): Total time in seconds spent in `_send_batch`.
+        batch_latency_max (float): Longest time in seconds spent in `_send_batch` for a batch.
+        _lock (Lock): Lock protecting the counters.
+    """
+
+    def __init__(self, index: int, maxsize: int = 0) -> None:
+        """
+        Initializes an empty partition.
+
+        Args:
+            index (int): Index of the partition.
+            maxsize (int, optional): Maximum number of queued messages, or 0 for no bound. Defaults to 0.
+        """
+        self.index = index
+        self.queue = PriorityLaneQueue(maxsize=maxsize, lanes=1)
+        self.in_flight = 0
+        self.sent_messages = 0
+        self.failed_messages = 0
+        self.sent_batches = 0
+        self.batched_messages = 0
+        self.batch_size_max = 0
+        self.batch_latency_total = 0.0
+        self.batch_latency_max = 0.0
+        self._lock = Lock()
+
+    def begin_batch(self, size: int) -> None:
+        """
+        Marks a batch as handed to `_send_batch`.
+
+        Args:
+            size (int): Number of messages of the batch.
+        """
+        with self._lock:
+            self.in_flight = size
+
+    def end_batch(self, size: int, failed: int, latency: Optional[float]) -> None:
+        """
+        Records the outcome of a batch.
+
+        Args:
+            size (int): Number of messages of the batch.
+            failed (int): Number of messages that could not be sent.
+            latency (Optional[float]): Time in seconds spent in `_send_batch`, or None if it raised.
+        """
+        with self._lock:
+            self.in_flight = 0
+            self.sent_messages += size - failed
+            self.failed_messages += failed
+            if latency is None:
+                return
+            self.sent_batches += 1
+            self.batched_messages += size
+            self.batch_size_max = max(self.batch_size_max, size)
+            self.batch_latency_total += latency
+            self.batch_latency_max = max(self.batch_latency_max, latency)
+
+    def get_metrics(self) -> Dict[str, Any]:
+        """
+        Returns a snapshot of the partition counters.
+
+        Returns:
+            Dict[str, Any]: Queued and in-flight messages, sent and failed messages,
+            sent batches and their messages, and the maximum batch size, total and
+            maximum batch latency.
+        """
+        with self._lock:
+            return {
+                "queued_messages": self.queue.qsize(),
+                "in_flight_messages": self.in_flight,
+                "sent_messages": self.sent_messages,
+                "failed_messages": self.failed_messages,
+                "sent_batches": self.sent_batches,
+                "batched_messages": self.batched_messages,
+                "batch_size_max": self.batch_size_max,
+                "batch_latency_total": self.batch_latency_total,
+                "batch_latency_max": self.batch_latency_max,
+            }
@@ -0,0 +1,510 @@
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from datetime import date, datetime, time
+from decimal import Decimal
+from threading import Lock
+from typing import Any, Callable, Dict, Hashable, List, Optional, Tuple, Type
+import json
+import struct
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+
+def to_primitive(value: Any) -> Any:
+    """
+    Converts a value the JSON and msgpack encoders cannot handle to a primitive one.
+
+    Query rows returned by Oracle carry ``datetime`` and ``Decimal`` values:
+    dates and times are converted to their ISO 8601 text, decimals to their
+    exact text (not to a float, which would lose digits), and any other value
+    to ``str(value)``.
+
+    Args:
+        value (Any): The value to convert.
+
+    Returns:
+        Any: The converted value.
+
+    Example:
+        >>> to_primitive(Decimal("12.50"))
+        '12.50'
+        >>> to_primitive(datetime(2024, 1, 31, 8, 30))
+        '2024-01-31T08:30:00'
+    """
+    if isinstance(value, (datetime, date, time)):
+        return value.isoformat()
+    if isinstance(value, (set, frozenset, tuple)):
+        return list(value)
+    return str(value)
+
+
+class BaseSerializer(ABC):
+    """
+    Abstract base class of the encodings of the messages sent by producers.
+
+    A serializer turns the value sent by a producer (a dictionary, or a list of
+    query rows) into bytes. Serializers are stateless and shared: `get_serializer`
+    returns one instance per name.
+
+    Attributes:
+        name (str): Name of the serializer in `SERIALIZER_REGISTRY`, set by `register_serializer`.
+        content_type (str): MIME type of the encoded bytes.
+    """
+    name: str
+    content_type: str = "application/octet-stream"
+
+    @classmethod
+    def available(cls) -> bool:
+        """
+        Returns whether the library the serializer relies on is installed.
+        """
+        return True
+
+    @abstractmethod
+    def dumps(self, value: Any) -> bytes:
+        """
+        Encodes a value.
+
+        Args:
+            value (Any): The value to encode.
+
+        Returns:
+            bytes: The encoded value.
+        """
+        pass
+
+    @abstractmethod
+    def loads(self, data: bytes) -> Any:
+        """
+        Decodes bytes produced by `dumps`. Values converted by `to_primitive` are decoded as text.
+
+        Args:
+            data (bytes): The encoded value.
+
+        Returns:
+            Any: The decoded value.
+        """
+        pass
+
+
+SERIALIZER_REGISTRY: Dict[str, Type[BaseSerializer]] = {}
+"""
+Global registry mapping serializer names to serializer classes.
+
+The registry is populated via the :func:`register_serializer` decorator at
+import time, and the serializer of a producer is selected by the
+``serializer`` field of its configuration.
+"""
+
+
+def register_serializer(name: str) -> Callable[[Type[BaseSerializer]], Type[BaseSerializer]]:
+    """
+    Register a serializer class under a name.
+
+    Args:
+        name (str): Unique name used to select the serializer in producer configurations.
+
+    Returns:
+        Callable[[Type[BaseSerializer]], Type[BaseSerializer]]: A class decorator that registers the serializer.
+
+    Raises:
+        AssertionError: If the decorated class is not a subclass of :class:`BaseSerializer`.
+    """
+
+    def decorator(serializer_class: Type[BaseSerializer]) -> Type[BaseSerializer]:
+        assert issubclass(serializer_class, BaseSerializer)
+        SERIALIZER_REGISTRY[name] = serializer_class
+        serializer_class.name = name
+        return serializer_class
+
+    return decorator
+
+
+_INSTANCES: Dict[str, BaseSerializer] = {}
+
+
+def get_serializer(name: str) -> BaseSerializer:
+    """
+    Returns the shared instance of a registered serializer.
+
+    Args:
+        name (str): Name of the serializer.
+
+    Returns:
+        BaseSerializer: The serializer instance.
+
+    Raises:
+        ValueError: If no serializer is registered under `name`.
+    """
+    if name not in SERIALIZER_REGISTRY:
+        raise ValueError(f"Unknown serializer: {name}")
+    if name not in _INSTANCES:
+        _INSTANCES[name] = SERIALIZER_REGISTRY[name]()
+    return _INSTANCES[name]
+
+
+@register_serializer("json")
+class JsonSerializer(BaseSerializer):
+    """
+    JSON encoding with the standard library, compact separators and UTF-8 text.
+
+    ``datetime``, ``Decimal`` and other values the standard encoder rejects are
+    converted by `to_primitive`.
+    """
+    content_type = "application/json"
+
+    def dumps(self, value: Any) -> bytes:
+        return json.dumps(value, default=to_primitive, separators=(",", ":"), ensure_ascii=False).encode("utf-8")
+
+    def loads(self, data: bytes) -> Any:
+        return json.loads(data)
+
+
+@register_serializer("orjson")
+class OrjsonSerializer(BaseSerializer):
+    """
+    JSON encoding with `orjson`, several times faster than the standard library.
+
+    ``datetime``, ``date`` and ``time`` are encoded natively in ISO 8601;
+    ``Decimal`` and other unsupported values are converted by `to_primitive`.
+    The output is compatible with `JsonSerializer`. Integers beyond 64 bits,
+    which orjson rejects, fall back to the standard library for that value.
+    """
+    content_type = "application/json"
+
+    @classmethod
+    def available(cls) -> bool:
+        return orjson is not None
+
+    def dumps(self, value: Any) -> bytes:
+        try:
+            return orjson.dumps(value, default=to_primitive, option=orjson.OPT_NON_STR_KEYS)
+        except TypeError:
+            return get_serializer("json").dumps(value)
+
+    def loads(self, data: bytes) -> Any:
+        return orjson.loads(data)
+
+
+@register_serializer("msgpack")
+class MsgpackSerializer(BaseSerializer):
+    """
+    MessagePack encoding with `msgpack`, a binary JSON-like format.
+
+    ``datetime``, ``Decimal`` and other unsupported values are converted by `to_primitive`.
+    """
+    content_type = "application/msgpack"
+
+    @classmethod
+    def available(cls) -> bool:
+        return msgpack is not None
+
+    def dumps(self, value: Any) -> bytes:
+        return msgpack.packb(value, default=to_primitive, use_bin_type=True)
+
+    def loads(self, data: bytes) -> Any:
+        return msgpack.unpackb(data, raw=False, strict_map_key=False)
+
+
+@register_serializer("compact")
+class CompactSerializer(BaseSerializer):
+    """
+    Compact binary encoding with schemas, needing no third-party library.
+
+    Query results are lists of rows sharing the same columns: instead of
+    repeating the column names in every row, like JSON and msgpack, the first
+    row with a given set of keys defines a schema (its key names, written once)
+    and the next rows only reference the schema by number and carry their
+    values. Integers are variable-length (zigzag) encoded, and ``datetime``,
+    ``date`` and ``Decimal`` values have their own type tags, so they are
+    decoded with their type instead of as text.
+
+    An encoded value is the format `VERSION` byte followed by a tagged value:
+
+        - ``NONE``, ``FALSE``, ``TRUE``: no data.
+        - ``INT``: zigzag varint. ``FLOAT``: 8-byte big-endian double.
+        - ``STR``, ``BYTES``, ``DECIMAL``, ``DATETIME``, ``DATE``, ``TIME``: varint length and
+          UTF-8 text (ISO 8601 for dates and times) or raw bytes.
+        - ``LIST``: varint item count and the items.
+        - ``SCHEMA``: varint key count, the keys as ``STR`` data, then the values in key order;
+          the schema gets the next number, starting from 0.
+        - ``ROW``: varint schema number, then the values in the key order of the schema.
+
+    Schemas are numbered per encoded value, so every value decodes on its own.
+    The encoder is pure Python: it produces the smallest messages for query
+    rows, at a higher CPU cost than the C-accelerated JSON encoders (see
+    ``benchmarks/serializers.py``).
+    """
+    content_type = "application/x-apps-logging-compact"
+
+    VERSION = 1
+    NONE, FALSE, TRUE, INT, FLOAT, STR, BYTES, DECIMAL, DATETIME, DATE, TIME, LIST, SCHEMA, ROW = range(14)
+    FLOAT_STRUCT = struct.Struct(">d")
+
+    def dumps(self, value: Any) -> bytes:
+        out = bytearray((self.VERSION,))
+        self._write(out, value, {})
+        return bytes(out)
+
+    def loads(self, data: bytes) -> Any:
+        if not data or data[0] != self.VERSION:
+            raise ValueError(f"Unsupported compact encoding version: {data[:1]!r}")
+        value, _ = self._read(data, 1, [])
+        return value
+
+    def _write(self, out: bytearray, value: Any, schemas: Dict[Tuple[str, ...], int]) -> None:
+        """
+        Appends a tagged value to `out`, defining or referencing the schemas of its dictionaries.
+        """
+        if value is None:
+            out.append(self.NONE)
+        elif value is True:
+            out.append(self.TRUE)
+        elif value is False:
+            out.append(self.FALSE)
+        elif isinstance(value, int):
+            out.append(self.INT)
+            self._write_varint(out, (value << 1) if value >= 0 else ((-value << 1) - 1))
+        elif isinstance(value, float):
+            out.append(self.FLOAT)
+            out += self.FLOAT_STRUCT.pack(value)
+        elif isinstance(value, str):
+            out.append(self.STR)
+            self._write_bytes(out, value.encode("utf-8"))
+        elif isinstance(value, dict):
+            keys = tuple(key if isinstance(key, str) else str(key) for key in value)
+            schema = schemas.get(keys)
+            if schema is None:
+                schemas[keys] = len(schemas)
+                out.append(self.SCHEMA)
+                self._write_varint(out, len(keys))
+                for key in keys:
+                    self._write_bytes(out, key.encode("utf-8"))
+            else:
+                out.append(self.ROW)
+                self._write_varint(out, schema)
+            for item in value.values():
+                self._write(out, item, schemas)
+        elif isinstance(value, (list, tuple)):
+            out.append(self.LIST)
+            self._write_varint(out, len(value))
+            for item in value:
+                self._write(out, item, schemas)
+        elif isinstance(value, (bytes, bytearray)):
+            out.append(self.BYTES)
+            self._write_bytes(out, bytes(value))
+        elif isinstance(value, Decimal):
+            out.append(self.DECIMAL)
+            self._write_bytes(out, str(value).encode("ascii"))
+        elif isinstance(value, datetime):
+            out.append(self.DATETIME)
+            self._write_bytes(out, value.isoformat().encode("ascii"))
+        elif isinstance(value, date):
+            out.append(self.DATE)
+            self._write_bytes(out, value.isoformat().encode("ascii"))
+        elif isinstance(value, time):
+            out.append(self.TIME)
+            self._write_bytes(out, value.isoformat().encode("ascii"))
+        else:
+            self._write(out, to_primitive(value), schemas)
+
+    def _read(self, data: bytes, pos: int, schemas: List[Tuple[str, ...]]) -> Tuple[Any, int]:
+        """
+        Decodes the tagged value at `pos`.
+
+        Returns:
+            Tuple[Any, int]: The value and the position following it.
+        """
+        tag = data[pos]
+        pos += 1
+        if tag == self.NONE:
+            return None, pos
+        if tag == self.TRUE:
+            return True, pos
+        if tag == self.FALSE:
+            return False, pos
+        if tag == self.INT:
+            n, pos = self._read_varint(data, pos)
+            return (n >> 1) if not n & 1 else -((n + 1) >> 1), pos
+        if tag == self.FLOAT:
+            return self.FLOAT_STRUCT.unpack_from(data, pos)[0], pos + self.FLOAT_STRUCT.size
+        if tag in (self.STR, self.BYTES, self.DECIMAL, self.DATETIME, self.DATE, self.TIME):
+            raw, pos = self._read_bytes(data, pos)
+            if tag == self.BYTES:
+                return raw, pos
+            text = raw.decode("utf-8")
+            decode = {
+                self.STR: str,
+                self.DECIMAL: Decimal,
+                self.DATETIME: datetime.fromisoformat,
+                self.DATE: date.fromisoformat,
+                self.TIME: time.fromisoformat,
+            }[tag]
+            return decode(text), pos
+        if tag == self.LIST:
+            count, pos = self._read_varint(data, pos)
+            items = []
+            for _ in range(count):
+                item, pos = self._read(data, pos, schemas)
+                items.append(item)
+            return items, pos
+        if tag == self.SCHEMA:
+            count, pos = self._read_varint(data, pos)
+            keys = []
+            for _ in range(count):
+                raw, pos = self._read_bytes(data, pos)
+                keys.append(raw.decode("utf-8"))
+            schemas.append(tuple(keys))
+            keys = schemas[-1]
+        elif tag == self.ROW:
+            schema, pos = self._read_varint(data, pos)
+            keys = schemas[schema]
+        else:
+            raise ValueError(f"Invalid compact encoding tag {tag} at offset {pos - 1}")
+        row = {}
+        for key in keys:
+            row[key], pos = self._read(data, pos, schemas)
+        return row, pos
+
+    @staticmethod
+    def _write_varint(out: bytearray, n: int) -> None:
+        while n > 0x7F:
+            out.append((n & 0x7F) | 0x80)
+            n >>= 7
+        out.append(n)
+
+    @staticmethod
+    def _read_varint(data: bytes, pos: int) -> Tuple[int, int]:
+        n = shift = 0
+        while True:
+            byte = data[pos]
+            pos += 1
+            n |= (byte & 0x7F) << shift
+            if byte < 0x80:
+                return n, pos
+            shift += 7
+
+    def _write_bytes(self, out: bytearray, raw: bytes) -> None:
+        self._write_varint(out, len(raw))
+        out += raw
+
+    def _read_bytes(self, data: bytes, pos: int) -> Tuple[bytes, int]:
+        length, pos = self._read_varint(data, pos)
+        return bytes(data[pos:pos + length]), pos + length
+
+
+class SerializationCache:
+    """
+    Thread-safe LRU cache of the encoded values of message payloads, bounded in entries and bytes.
+
+    The payload of a query result can be sent several times: to several topics
+    or producers when identical queries are collapsed or served from the query
+    result cache (which hand the same result object to every caller), and again
+    on every retry. The cache keys an encoded value on the identity of its
+    payload, so such a payload is encoded once per serializer.
+
+    Every entry holds a reference to its payload, so that the identity of a
+    cached payload cannot be reused by another object while the entry lives.
+    Payloads are treated as read-only once sent, like cached query results.
+    Since an entry keeps its payload alive, the cache is also bounded by the
+    total size of the encoded values, which stands for the size of the
+    payloads it holds: the least recently used entries are evicted beyond
+    `max_bytes`, and a value larger than a quarter of it is not cached at all.
+
+    Attributes:
+        max_entries (int): Maximum number of entries kept in the cache.
+        max_bytes (int): Maximum total size in bytes of the encoded values kept in the cache.
+        _entries (OrderedDict): Payload and encoded value of each key, in LRU order.
+        _bytes (int): Total size in bytes of the encoded values kept in the cache.
+        _lock (Lock): Lock protecting entries and counters.
+        hits (int): Number of encodings served from the cache.
+        misses (int): Number of values encoded.
+
+    Example:
+        >>> cache = SerializationCache(max_entries=256, max_bytes=16 * 1024 * 1024)
+        >>> rows = [{"task_cd": "A1"}]
+        >>> cache.serialize(get_serializer("json"), {"is_error": False, "message": rows}, rows, False)
+        b'{"is_error":false,"message":[{"task_cd":"A1"}]}'
+    """
+
+    def __init__(self, max_entries: int = 256, max_bytes: int = 16 * 1024 * 1024) -> None:
+        """
+        Initializes an empty cache.
+
+        Args:
+            max_entries (int, optional): Maximum number of entries kept in the cache. Defaults to 256.
+            max_bytes (int, optional): Maximum total size in bytes of the encoded values kept in
+                the cache. Defaults to 16 MiB.
+
+        Raises:
+            ValueError: If `max_entries` or `max_bytes` is less than or equal to 0.
+        """
+        if max_entries <= 0:
+            raise ValueError("Max entries must be greater than 0")
+        if max_bytes <= 0:
+            raise ValueError("Max bytes must be greater than 0")
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._entries: "OrderedDict[Hashable, Tuple[Any, bytes]]" = OrderedDict()
+        self._bytes = 0
+        self._lock = Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def serialize(self, serializer: BaseSerializer, value: Any, payload: Any, variant: Optional[Hashable] = None) -> bytes:
+        """
+        Returns the encoded value built around a payload, encoding it on the first call only.
+
+        Args:
+            serializer (BaseSerializer): The serializer encoding the value.
+            value (Any): The value to encode, e.g. an envelope holding the payload.
+            payload (Any): The payload identifying the value.
+            variant (Optional[Hashable], optional): Anything else the value depends on,
+                e.g. the envelope fields. Defaults to None.
+
+        Returns:
+            bytes: The encoded value.
+        """
+        key = (serializer.name, id(payload), variant)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] is payload:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+            self.misses += 1
+
+        data = serializer.dumps(value)
+        if len(data) > self.max_bytes // 4:
+            return data
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self._bytes -= len(previous[1])
+            self._entries[key] = (payload, data)
+            self._bytes += len(data)
+            while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+                self._bytes -= len(self._entries.popitem(last=False)[1][1])
+        return data
+
+    def get_metrics(self) -> Dict[str, Any]:
+        """
+        Returns a snapshot of the cache counters.
+
+        Returns:
+            Dict[str, Any]: Current number of entries and their size in bytes, hits and misses.
+        """
+        with self._lock:
+            return {"entries": len(self._entries), "bytes": self._bytes, "hits": self.hits, "misses": self.misses}
+
+
+SERIALIZATION_CACHE = SerializationCache()
+"""Process-wide cache of encoded message payloads, shared by all producers."""
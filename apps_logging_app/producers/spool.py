@@ -0,0 +1,458 @@
+from pathlib import Path
+from threading import Event, Lock
+from typing import Any, Dict, List, Tuple
+import json
+import logging
+import os
+import struct
+import time
+import zlib
+
+from .data import Message
+
+
+RECORD_HEADER = struct.Struct(">II")
+"""Header of a spool record: payload length and CRC-32 of the payload, big-endian."""
+
+
+class MessageSpool:
+    """
+    Append-only disk spool (write-ahead log) of the messages of a producer.
+
+    Messages that cannot be sent while the target system is unreachable are
+    appended to the spool instead of being kept in memory or dropped, and are
+    read back in order once the producer is connected again.
+
+    The spool is a directory of segment files, ``<index>.seg``, written one
+    after the other. Every record is a `RECORD_HEADER` (payload length and
+    CRC-32) followed by the JSON payload of one message. A segment is closed
+    when it reaches `segment_bytes`, and deleted once all its records have been
+    read back and committed. The read position is kept in ``cursor.json``,
+    replaced atomically on every commit, so that the messages still in the
+    spool are replayed after a restart. Delivery is at-least-once: the messages
+    read back are only committed once they are delivered (see `ReplayBatch`),
+    so those not yet delivered when the process stops are replayed again.
+
+    Durability of the appended records depends on `fsync_policy`:
+        - ``always``: every append is flushed to disk before returning.
+        - ``interval``: appends are flushed to disk at most every `fsync_interval` seconds,
+          so a crash of the machine loses at most that much of the spool.
+        - ``never``: flushing is left to the operating system.
+
+    A record torn by a crash at the end of the last segment is truncated on
+    open; a corrupted record found while reading skips the rest of its segment.
+
+    Attributes:
+        path (Path): Directory of the segments and of the cursor file.
+        segment_bytes (int): Size in bytes from which a segment is closed and a new one started.
+        max_bytes (int): Maximum total size in bytes of the segments; appends beyond it are rejected.
+        fsync_policy (str): ``always``, ``interval`` or ``never``.
+        fsync_interval (float): Interval in seconds between two flushes of the ``interval`` policy.
+        logger (logging.Logger): Logger instance for spool operations.
+        _lock (Lock): Lock serializing appends, reads and commits.
+        _appended (Event): Set when records are appended, cleared when the spool is read to its end.
+        _sizes (Dict[int, int]): Size in bytes of each segment, keyed by segment index.
+        _file: Segment file open for appending.
+        _last_sync (float): Monotonic time of the last flush to disk.
+        _cursor (Tuple[int, int]): Committed read position, as ``(segment index, offset)``.
+        spilled_messages (int): Messages appended since the spool was opened.
+        replayed_messages (int): Messages read back and committed since the spool was opened.
+        rejected_messages (int): Messages rejected because the spool was full.
+        corrupted_segments (int): Segments whose end was skipped because of a corrupted record.
+
+    Example:
+        >>> spool = MessageSpool(Path("spool/kafka_handler-kafka-producer"), segment_bytes=16 * 1024 * 1024,
+        ...                      max_bytes=1024 * 1024 * 1024)
+        >>> spool.append([message])
+        1
+        >>> messages, position = spool.read(100)
+        >>> spool.commit(position)
+    """
+
+    SEGMENT_SUFFIX = ".seg"
+    CURSOR_FILE = "cursor.json"
+
+    def __init__(self, path: Path, segment_bytes: int, max_bytes: int, fsync_policy: str = "interval",
+                 fsync_interval: float = 1) -> None:
+        """
+        Opens (and creates if needed) the spool directory.
+
+        Args:
+            path (Path): Directory of the spool. Created if missing.
+            segment_bytes (int): Size in bytes from which a segment is closed.
+            max_bytes (int): Maximum total size in bytes of the segments.
+            fsync_policy (str, optional): ``always``, ``interval`` or ``never``. Defaults to ``interval``.
+            fsync_interval (float, optional): Interval in seconds of the ``interval`` policy. Defaults to 1.
+        """
+        self.path = Path(path)
+        self.segment_bytes = segment_bytes
+        self.max_bytes = max_bytes
+        self.fsync_policy = fsync_policy
+        self.fsync_interval = fsync_interval
+        self.logger = logging.getLogger("__main__." + __name__)
+        self._lock = Lock()
+        self._appended = Event()
+        self.spilled_messages = 0
+        self.replayed_messages = 0
+        self.rejected_messages = 0
+        self.corrupted_segments = 0
+
+        self.path.mkdir(parents=True, exist_ok=True)
+        self._sizes: Dict[int, int] = {
+            int(segment.stem): segment.stat().st_size for segment in self.path.glob(f"*{self.SEGMENT_SUFFIX}")
+        }
+        self._cursor = self._load_cursor()
+        for index in [index for index in self._sizes if index < self._cursor[0]]:
+            self._segment_path(index).unlink(missing_ok=True)
+            del self._sizes[index]
+        if not self._sizes:
+            self._sizes[self._cursor[0]] = 0
+            self._cursor = (self._cursor[0], 0)
+        self._truncate_torn_tail()
+        self._file = open(self._segment_path(self._write_index()), "ab")
+        self._last_sync = time.monotonic()
+        if self.pending():
+            self._appended.set()
+            self.logger.info(f"Spool {self.path}: {self.pending_bytes()} bytes to replay")
+
+    # PUBLIC API
+
+    def append(self, messages: List[Message]) -> int:
+        """
+        Appends messages at the end of the spool.
+
+        Args:
+            messages (List[Message]): The messages to append, in order.
+
+        Returns:
+            int: The number of messages appended. Appending stops at the first message
+            that does not fit in `max_bytes`; that one and the next ones are rejected.
+        """
+        appended = 0
+        with self._lock:
+            for message in messages:
+                record = self._encode(message)
+                if sum(self._sizes.values()) + len(record) > self.max_bytes:
+                    break
+                index = self._write_index()
+                if self._sizes[index] and self._sizes[index] + len(record) > self.segment_bytes:
+                    index = self._roll()
+                self._file.write(record)
+                self._sizes[index] += len(record)
+                appended += 1
+            if appended:
+                self._file.flush()
+                self._sync()
+            self.spilled_messages += appended
+            self.rejected_messages += len(messages) - appended
+        if appended:
+            self._appended.set()
+        return appended
+
+    def read(self, max_messages: int) -> Tuple[List[Message], Tuple[int, int]]:
+        """
+        Reads the next messages after the committed position, without committing them.
+
+        Args:
+            max_messages (int): Maximum number of messages to read.
+
+        Returns:
+            Tuple[List[Message], Tuple[int, int]]: The messages read, in append order, and the
+            position following the last one, to pass to `commit` once they are handed over.
+        """
+        messages: List[Message] = []
+        with self._lock:
+            index, offset = self._cursor
+            while len(messages) < max_messages:
+                if offset >= self._sizes.get(index, 0):
+                    if index == self._write_index():
+                        break
+                    index, offset = index + 1, 0
+                    continue
+                offset = self._read_segment(index, offset, max_messages - len(messages), messages)
+            if not messages and (index, offset) == self._end():
+                self._appended.clear()
+        return messages, (index, offset)
+
+    def commit(self, position: Tuple[int, int], count: int = 0) -> None:
+        """
+        Moves the committed position forward and deletes the segments fully read.
+
+        Args:
+            position (Tuple[int, int]): A position returned by `read`.
+            count (int, optional): Number of messages committed, added to `replayed_messages`. Defaults to 0.
+        """
+        with self._lock:
+            if position == self._cursor:
+                return
+            self._cursor = position
+            self._write_cursor()
+            for index in [index for index in self._sizes if index < position[0]]:
+                self._segment_path(index).unlink(missing_ok=True)
+                del self._sizes[index]
+            self.replayed_messages += count
+
+    def pending(self) -> bool:
+        """
+        Returns whether the spool holds messages not committed yet.
+        """
+        with self._lock:
+            return self._cursor != self._end()
+
+    def pending_bytes(self) -> int:
+        """
+        Returns the size in bytes of the records not committed yet.
+        """
+        with self._lock:
+            return sum(self._sizes.values()) - self._cursor[1]
+
+    def wait(self, timeout: float) -> bool:
+        """
+        Waits until messages are appended, or the spool holds messages to read.
+
+        Args:
+            timeout (float): Maximum wait in seconds.
+
+        Returns:
+            bool: `True` if there may be messages to read, `False` on timeout.
+        """
+        return self._appended.wait(timeout)
+
+    def get_metrics(self) -> Dict[str, Any]:
+        """
+        Returns a snapshot of the spool counters.
+
+        Returns:
+            Dict[str, Any]: Number of segments, total and pending size in bytes, and the
+            spilled, replayed and rejected messages and corrupted segments since the spool was opened.
+        """
+        with self._lock:
+            return {
+                "segments": len(self._sizes),
+                "size_bytes": sum(self._sizes.values()),
+                "pending_bytes": sum(self._sizes.values()) - self._cursor[1],
+                "spilled_messages": self.spilled_messages,
+                "replayed_messages": self.replayed_messages,
+                "rejected_messages": self.rejected_messages,
+                "corrupted_segments": self.corrupted_segments,
+            }
+
+    def close(self) -> None:
+        """
+        Flushes the last segment to disk and closes it.
+        """
+        with self._lock:
+            if self._file.closed:
+                return
+            self._file.flush()
+            if self.fsync_policy != "never":
+                os.fsync(self._file.fileno())
+            self._file.close()
+
+    # INTERNALS
+
+    def _read_segment(self, index: int, offset: int, max_messages: int, messages: List[Message]) -> int:
+        """
+        Reads up to `max_messages` records of a segment from `offset`. Must be called with the lock held.
+
+        Returns:
+            int: The offset following the last record read, or the segment size if a
+            corrupted record was found.
+        """
+        size = self._sizes[index]
+        with open(self._segment_path(index), "rb") as segment:
+            segment.seek(offset)
+            while offset < size and max_messages > 0:
+                header = segment.read(RECORD_HEADER.size)
+                length, crc = RECORD_HEADER.unpack(header) if len(header) == RECORD_HEADER.size else (0, 0)
+                payload = segment.read(length)
+                try:
+                    if len(header) < RECORD_HEADER.size or len(payload) < length or zlib.crc32(payload) != crc:
+                        raise ValueError("invalid record")
+                    messages.append(self._decode(payload))
+                except Exception as e:
+                    self.corrupted_segments += 1
+                    self.logger.error(f"Spool {self.path}: Skipping the end of segment {index} from offset {offset}: {e}")
+                    return size
+                offset += RECORD_HEADER.size + length
+                max_messages -= 1
+        return offset
+
+    def _truncate_torn_tail(self) -> None:
+        """
+        Truncates the last segment after its last complete record, left by a crash during an append.
+        """
+        index = self._write_index()
+        offset = self._cursor[1] if index == self._cursor[0] else 0
+        size = self._sizes[index]
+        with open(self._segment_path(index), "ab+") as segment:
+            segment.seek(offset)
+            while offset < size:
+                header = segment.read(RECORD_HEADER.size)
+                if len(header) < RECORD_HEADER.size:
+                    break
+                length, crc = RECORD_HEADER.unpack(header)
+                payload = segment.read(length)
+                if len(payload) < length or zlib.crc32(payload) != crc:
+                    break
+                offset += RECORD_HEADER.size + length
+            if offset < size:
+                self.logger.warning(f"Spool {self.path}: Truncating {size - offset} bytes of torn record in segment {index}")
+                segment.truncate(offset)
+                self._sizes[index] = offset
+
+    def _roll(self) -> int:
+        """
+        Closes the segment being written and starts the next one. Must be called with the lock held.
+
+        Returns:
+            int: The index of the new segment.
+        """
+        self._file.flush()
+        if self.fsync_policy != "never":
+            os.fsync(self._file.fileno())
+        self._file.close()
+        index = self._write_index() + 1
+        self._sizes[index] = 0
+        self._file = open(self._segment_path(index), "ab")
+        return index
+
+    def _sync(self) -> None:
+        """
+        Flushes the segment being written to disk according to `fsync_policy`. Must be called with the lock held.
+        """
+        now = time.monotonic()
+        if self.fsync_policy == "always" or (self.fsync_policy == "interval" and now - self._last_sync >= self.fsync_interval):
+            os.fsync(self._file.fileno())
+            self._last_sync = now
+
+    def _load_cursor(self) -> Tuple[int, int]:
+        """
+        Returns the committed position stored in the cursor file, or the start of the first segment.
+        """
+        first = min(self._sizes, default=0)
+        try:
+            cursor = json.loads((self.path / self.CURSOR_FILE).read_text())
+            index, offset = int(cursor["segment"]), int(cursor["offset"])
+        except FileNotFoundError:
+            return first, 0
+        except Exception as e:
+            self.logger.error(f"Spool {self.path}: Unreadable cursor, replaying from the first segment: {e}")
+            return first, 0
+        if index not in self._sizes:
+            return (first, 0) if first > index else (index, 0)
+        return index, min(offset, self._sizes[index])
+
+    def _write_cursor(self) -> None:
+        """
+        Replaces the cursor file with the committed position. Must be called with the lock held.
+        """
+        tmp = self.path / f"{self.CURSOR_FILE}.tmp"
+        with open(tmp, "w") as cursor:
+            json.dump({"segment": self._cursor[0], "offset": self._cursor[1]}, cursor)
+            cursor.flush()
+            if self.fsync_policy == "always":
+                os.fsync(cursor.fileno())
+        os.replace(tmp, self.path / self.CURSOR_FILE)
+
+    def _write_index(self) -> int:
+        """
+        Returns the index of the segment being written.
+        """
+        return max(self._sizes)
+
+    def _end(self) -> Tuple[int, int]:
+        """
+        Returns the position following the last record. Must be called with the lock held.
+        """
+        index = self._write_index()
+        return index, self._sizes[index]
+
+    def _segment_path(self, index: int) -> Path:
+        """
+        Returns the path of a segment.
+        """
+        return self.path / f"{index:012d}{self.SEGMENT_SUFFIX}"
+
+    @staticmethod
+    def _encode(message: Message) -> bytes:
+        """
+        Returns the spool record of a message. Values that are not JSON serializable are stored as strings.
+        """
+        payload = json.dumps({
+            "topic": message.topic,
+            "is_error": message.is_error,
+            "is_warning": message.is_warning,
+            "message": message.message,
+            "key": message.key,
+            "source": message.source,
+            "retries": message.retries,
+        }, default=str).encode("utf-8")
+        return RECORD_HEADER.pack(len(payload), zlib.crc32(payload)) + payload
+
+    @staticmethod
+    def _decode(payload: bytes) -> Message:
+        """
+        Returns the message of a spool record payload, with the retry count it was spilled with.
+        """
+        record = json.loads(payload)
+        message = Message(record["topic"], record["is_error"], record["is_warning"], record["message"],
+                          key=record["key"], source=record["source"])
+        message.retries = record.get("retries", 0)
+        return message
+
+
+class ReplayBatch:
+    """
+    Messages read back from a spool and not committed yet.
+
+    Every message of the batch is settled once: when it is delivered, dropped
+    after its last retry, or given back to the spool because the producer
+    disconnected before delivering it. The batch is committed once all its
+    messages are settled, unless one was given back (`aborted`): it is then
+    read again from the same position after the reconnection, and the
+    messages already delivered are sent twice.
+
+    Attributes:
+        aborted (bool): Whether a message was given back to the spool.
+        _lock (Lock): Lock protecting the counters.
+        _pending (int): Messages not settled yet.
+        _settled (Event): Set once every message is settled.
+    """
+
+    def __init__(self, size: int) -> None:
+        """
+        Args:
+            size (int): Number of messages of the batch.
+        """
+        self.aborted = False
+        self._lock = Lock()
+        self._pending = size
+        self._settled = Event()
+        if size <= 0:
+            self._settled.set()
+
+    def settle(self, aborted: bool = False) -> None:
+        """
+        Settles one message of the batch.
+
+        Args:
+            aborted (bool, optional): Whether the message was given back to the spool. Defaults to False.
+        """
+        with self._lock:
+            self._pending -= 1
+            self.aborted = self.aborted or aborted
+            if self._pending <= 0:
+                self._settled.set()
+
+    def wait(self, timeout: float) -> bool:
+        """
+        Waits until every message of the batch is settled.
+
+        Args:
+            timeout (float): Maximum wait in seconds.
+
+        Returns:
+            bool: `True` if the batch is settled, `False` on timeout.
+        """
+        return self._settled.wait(timeout)
@@ -1,5 +1,8 @@
 import os
 import platform
+import hashlib
+import json
+from typing import Any, Optional
 
 def get_file_id(path: str):
     """Return a platform-dependent identifier for a file.
@@ -40,3 +43,84 @@ def get_file_id(path: str):
     else:
         return (stat.st_size, stat.st_mtime)
 
+
+
+
+class ResultDigest:
+    """Incremental, order-sensitive content digest for query and match results.
+
+    The digest is fed one row (or one dictionary) at a time, so it can be
+    computed while rows are being fetched from a cursor instead of in a
+    second pass over the materialized result. Each item is serialized to a
+    canonical JSON form (sorted keys, non-JSON types rendered with ``str``)
+    before being hashed, so two results with equal content always produce
+    the same digest, across threads and across process restarts.
+
+    Comparing two digests replaces a deep element-by-element comparison of
+    large result sets with a comparison of two short strings.
+
+    Attributes:
+        rows (int): Number of items fed into the digest so far.
+
+    Example:
+        >>> digest = ResultDigest()
+        >>> for row in rows:
+        ...     digest.update(row)
+        >>> digest.hexdigest()
+        '5f0c...'
+    """
+
+    def __init__(self) -> None:
+        """
+        Initializes an empty digest.
+        """
+        self._hash = hashlib.blake2b(digest_size=16)
+        self.rows = 0
+
+    def update(self, item: Any) -> None:
+        """
+        Feeds a single row or dictionary into the digest.
+
+        Args:
+            item (Any): The item to hash. Typically a row dictionary or a tuple of column values.
+        """
+        self._hash.update(json.dumps(item, sort_keys=True, default=str, separators=(",", ":")).encode("utf-8"))
+        self._hash.update(b"\n")
+        self.rows += 1
+
+    def hexdigest(self) -> str:
+        """
+        Returns the digest of all items fed so far.
+
+        Returns:
+            str: Hexadecimal digest string.
+        """
+        return self._hash.hexdigest()
+
+
+def compute_digest(data: Any) -> Optional[str]:
+    """Return the content digest of a query or match result.
+
+    Lists are hashed row by row, exactly as `ResultDigest` does while rows
+    are fetched, so a digest computed here on a materialized list is equal to
+    the one computed incrementally by a database client for the same rows.
+    Any other value is hashed as a single item.
+
+    Args:
+        data (Any): The result to hash. ``None`` is not hashed.
+
+    Returns:
+        Optional[str]: The hexadecimal digest, or ``None`` if `data` is ``None``.
+    """
+    if data is None:
+        return None
+    digest = getattr(data, "digest", None)
+    if digest is not None:
+        return digest
+    result_digest = ResultDigest()
+    if isinstance(data, list):
+        for item in data:
+            result_digest.update(item)
+    else:
+        result_digest.update(data)
+    return result_digest.hexdigest()
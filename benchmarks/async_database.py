@@ -0,0 +1,125 @@
+"""
+Benchmark of the threaded `BaseDatabase` against the asyncio `AsyncBaseDatabase`.
+
+Both clients execute the same number of distinct queries against a simulated
+database with a fixed per-query latency, and the benchmark reports the total
+time, the throughput and the number of threads alive at the peak.
+
+The simulated latency stands in for the network round-trip and the server
+time of a real query, which is where both clients spend their time.
+
+Usage:
+    python -m benchmarks.async_database --queries 2000 --latency 0.05 --workers 20
+"""
+import argparse
+import asyncio
+import threading
+import time
+from typing import Any, Dict, List
+
+from apps_logging_app.databases.async_base import AsyncBaseDatabase
+from apps_logging_app.databases.base import BaseDatabase
+from apps_logging_app.databases.data import Query, QueryResult
+from apps_logging_app.databases.model import BaseDatabaseConfig
+from apps_logging_app.databases.orchestrator import DatabaseOrchestrator
+
+
+class SimulatedThreadedDatabase(BaseDatabase):
+    """
+    Threaded client whose queries block their worker for `latency` seconds.
+    """
+    latency = 0.05
+
+    def is_connected(self) -> bool:
+        return True
+
+    def connect(self) -> None:
+        pass
+
+    def close(self) -> None:
+        pass
+
+    def _query(self, task: Query) -> List[Dict[str, Any]]:
+        time.sleep(self.latency)
+        return QueryResult([task.params])
+
+
+class SimulatedAsyncDatabase(AsyncBaseDatabase):
+    """
+    Asyncio client whose queries await for `latency` seconds.
+    """
+    latency = 0.05
+
+    def is_connected(self) -> bool:
+        return True
+
+    def connect(self) -> None:
+        pass
+
+    def close(self) -> None:
+        pass
+
+    async def _query_async(self, task: Query) -> List[Dict[str, Any]]:
+        await asyncio.sleep(self.latency)
+        return QueryResult([task.params])
+
+
+def run(database_class: type, queries: int, latency: float, max_workers: int) -> Dict[str, float]:
+    """
+    Runs `queries` distinct queries on a new database client and measures them.
+
+    Args:
+        database_class (type): The simulated client class.
+        queries (int): Number of queries to execute.
+        latency (float): Simulated latency of each query, in seconds.
+        max_workers (int): Maximum number of queries in flight.
+
+    Returns:
+        Dict[str, float]: Elapsed seconds, queries per second and peak thread count.
+    """
+    config = BaseDatabaseConfig(
+        type="simulated",
+        name=database_class.__name__,
+        username="benchmark",
+        password="benchmark",
+        primary={"host": "localhost", "port": 1521, "service_name": None},
+        max_workers=max_workers,
+    )
+    database_class.latency = latency
+    database = database_class(config)
+    database.orchestrator = DatabaseOrchestrator(database)
+    database.start()
+
+    peak_threads = threading.active_count()
+    start = time.perf_counter()
+    futures = [database.enqueue_query(Query("SELECT :id FROM dual", {"id": i})) for i in range(queries)]
+    for future in futures:
+        future.result()
+        peak_threads = max(peak_threads, threading.active_count())
+    elapsed = time.perf_counter() - start
+    database.stop()
+
+    return {"elapsed": elapsed, "throughput": queries / elapsed, "peak_threads": peak_threads}
+
+
+def main() -> None:
+    """
+    Parses the command line and prints the results of both clients.
+    """
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--queries", type=int, default=2000, help="number of queries (default: 2000)")
+    parser.add_argument("--latency", type=float, default=0.05, help="simulated query latency in seconds (default: 0.05)")
+    parser.add_argument("--workers", type=int, default=20, help="max_workers of the threaded client (default: 20)")
+    args = parser.parse_args()
+
+    results = {
+        f"threaded (max_workers={args.workers})": run(SimulatedThreadedDatabase, args.queries, args.latency, args.workers),
+        f"async (max_workers={args.queries})": run(SimulatedAsyncDatabase, args.queries, args.latency, args.queries),
+    }
+    print(f"{args.queries} queries, {args.latency * 1000:.0f} ms simulated latency")
+    for name, result in results.items():
+        print(f"{name:<32} {result['elapsed']:8.2f} s {result['throughput']:10.0f} queries/s {result['peak_threads']:6d} threads")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,199 @@
+"""
+Benchmark of the Kafka producer with asynchronous sends against a flush after every message.
+
+Both producers send the same number of messages to an in-process stand-in of
+the Kafka client, whose sender thread acknowledges the accumulated records
+once per simulated broker round-trip, like a real producer sending one batch
+per request. The benchmark reports the time until every message is
+acknowledged and the throughput.
+
+Flushing after every message waits one round-trip per message; sending
+asynchronously lets the records of many messages share a round-trip.
+
+The producer is imported from its deployed location,
+``apps_logging_app.producers.kafka_handler``.
+
+Usage:
+    python -m benchmarks.kafka_producer --messages 5000 --latency 0.002
+"""
+import argparse
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from apps_logging_app.producers.data import Message
+from apps_logging_app.producers.kafka_handler import producer as kafka_producer
+from apps_logging_app.producers.kafka_handler.config import KafkaHandlerConfig
+from apps_logging_app.producers.kafka_handler.producer import KafkaHandlerProducer
+from apps_logging_app.producers.orchestrator import ProducerOrchestrator
+
+
+class StandInFuture:
+    """
+    Delivery future of a record, with the callback API of kafka-python's ``FutureRecordMetadata``.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._done = False
+        self._exception: Optional[Exception] = None
+        self._callbacks: List[Tuple[Callable[..., None], Tuple[Any, ...]]] = []
+        self._errbacks: List[Tuple[Callable[..., None], Tuple[Any, ...]]] = []
+
+    def add_callback(self, fn: Callable[..., None], *args: Any) -> None:
+        with self._lock:
+            if not self._done:
+                self._callbacks.append((fn, args))
+                return
+        if self._exception is None:
+            fn(*args, None)
+
+    def add_errback(self, fn: Callable[..., None], *args: Any) -> None:
+        with self._lock:
+            if not self._done:
+                self._errbacks.append((fn, args))
+                return
+        if self._exception is not None:
+            fn(*args, self._exception)
+
+    def resolve(self, exception: Optional[Exception] = None) -> None:
+        with self._lock:
+            self._done = True
+            self._exception = exception
+        if exception is None:
+            for fn, args in self._callbacks:
+                fn(*args, None)
+        else:
+            for fn, args in self._errbacks:
+                fn(*args, exception)
+
+
+class StandInKafkaProducer:
+    """
+    In-process stand-in of kafka-python's ``KafkaProducer``.
+
+    Records are serialized by `send` and accumulated; a sender thread takes up
+    to `max_batch` records per simulated broker round-trip of `latency` seconds
+    and then resolves their futures.
+    """
+    DEFAULT_CONFIG: Dict[str, Any] = {}
+    latency = 0.002
+    max_batch = 500
+
+    def __init__(self, bootstrap_servers: List[str], value_serializer: Optional[Callable[[Any], bytes]] = None,
+                 **kwargs: Any) -> None:
+        self._serializer = value_serializer or (lambda v: v)
+        self._cond = threading.Condition()
+        self._records: List[StandInFuture] = []
+        self._in_flight = 0
+        self._closed = False
+        self._sender = threading.Thread(target=self._run, daemon=True)
+        self._sender.start()
+
+    def bootstrap_connected(self) -> bool:
+        return True
+
+    def send(self, topic: str, value: Any = None, key: Any = None) -> StandInFuture:
+        self._serializer(value)
+        future = StandInFuture()
+        with self._cond:
+            self._records.append(future)
+            self._cond.notify_all()
+        return future
+
+    def flush(self, timeout: Optional[float] = None) -> None:
+        with self._cond:
+            self._cond.wait_for(lambda: not self._records and not self._in_flight, timeout)
+
+    def close(self) -> None:
+        self.flush()
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+
+    def _run(self) -> None:
+        while True:
+            with self._cond:
+                self._cond.wait_for(lambda: self._records or self._closed)
+                if self._closed:
+                    return
+                batch, self._records = self._records[:self.max_batch], self._records[self.max_batch:]
+                self._in_flight = len(batch)
+            time.sleep(self.latency)
+            for future in batch:
+                future.resolve()
+            with self._cond:
+                self._in_flight = 0
+                self._cond.notify_all()
+
+
+class FlushPerMessageProducer(KafkaHandlerProducer):
+    """
+    Kafka producer waiting for the delivery of every message, as before asynchronous sends.
+    """
+
+    def _send(self, message: Message) -> None:
+        super()._send(message)
+        self.producer.flush()
+
+
+def run(producer_class: type, messages: int) -> Dict[str, float]:
+    """
+    Sends `messages` messages with a new producer and waits for their delivery.
+
+    Args:
+        producer_class (type): The producer class.
+        messages (int): Number of messages to send.
+
+    Returns:
+        Dict[str, float]: Elapsed seconds and messages per second.
+    """
+    config = KafkaHandlerConfig(
+        type="kafka_handler",
+        name=producer_class.__name__,
+        brokers=["localhost:9092"],
+        security_protocol="PLAINTEXT",
+        ssl_cafile="",
+        ssl_certfile="",
+        ssl_keyfile="",
+        ssl_password="",
+        topic="benchmark",
+    )
+    producer = producer_class(config)
+    producer.orchestrator = ProducerOrchestrator(producer)
+    producer.start()
+
+    payload = {"task_cd": "BENCHMARK", "delivered": 0, "status": "OK"}
+    start = time.perf_counter()
+    for i in range(messages):
+        producer.enqueue_message(Message("benchmark", False, False, {**payload, "delivered": i}))
+    while producer.get_metrics()["delivered_messages"] < messages:
+        time.sleep(0.001)
+    elapsed = time.perf_counter() - start
+    producer.stop()
+
+    return {"elapsed": elapsed, "throughput": messages / elapsed}
+
+
+def main() -> None:
+    """
+    Parses the command line and prints the results of both producers.
+    """
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--messages", type=int, default=5000, help="number of messages (default: 5000)")
+    parser.add_argument("--latency", type=float, default=0.002, help="simulated broker round-trip in seconds (default: 0.002)")
+    args = parser.parse_args()
+
+    StandInKafkaProducer.latency = args.latency
+    kafka_producer.KafkaProducer = StandInKafkaProducer
+    results = {
+        "flush per message": run(FlushPerMessageProducer, args.messages),
+        "asynchronous sends": run(KafkaHandlerProducer, args.messages),
+    }
+    print(f"{args.messages} messages, {args.latency * 1000:.1f} ms simulated round-trip")
+    for name, result in results.items():
+        print(f"{name:<24} {result['elapsed']:8.2f} s {result['throughput']:10.0f} messages/s")
+
+
+if __name__ == "__main__":
+    main()
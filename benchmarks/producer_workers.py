@@ -0,0 +1,99 @@
+"""
+Benchmark of the producer throughput as a function of its number of workers.
+
+A stand-in producer, whose sends block for a fixed latency like a synchronous
+call to a remote sink, sends the same keyed messages with 1, 2, 4 and 8
+workers. The benchmark reports the throughput, the speedup over a single
+worker, and whether every key was delivered in order.
+
+Usage:
+    python -m benchmarks.producer_workers --messages 2000 --latency 0.002 --keys 64
+"""
+import argparse
+import threading
+import time
+from typing import Dict, List
+
+from apps_logging_app.producers.base import BaseProducer
+from apps_logging_app.producers.data import Message
+from apps_logging_app.producers.model import BaseProducerConfig
+from apps_logging_app.producers.orchestrator import ProducerOrchestrator
+
+
+class StandInSinkProducer(BaseProducer):
+    """
+    Producer whose sends block their worker for `latency` seconds.
+    """
+    latency = 0.002
+
+    def __init__(self, config: BaseProducerConfig) -> None:
+        super().__init__(config)
+        self.sent: Dict[str, List[int]] = {}
+        self._sent_lock = threading.Lock()
+
+    def is_connected(self) -> bool:
+        return True
+
+    def connect(self) -> None:
+        pass
+
+    def close(self) -> None:
+        pass
+
+    def _send(self, message: Message) -> None:
+        time.sleep(self.latency)
+        with self._sent_lock:
+            self.sent.setdefault(message.key, []).append(message.message)
+
+
+def run(workers: int, messages: int, keys: int) -> Dict[str, float]:
+    """
+    Sends `messages` messages over `keys` keys with a new producer and waits for them.
+
+    Args:
+        workers (int): Number of producer workers.
+        messages (int): Number of messages to send.
+        keys (int): Number of distinct message keys.
+
+    Returns:
+        Dict[str, float]: Elapsed seconds, messages per second, and 1 if every key was sent in order.
+    """
+    config = BaseProducerConfig(type="stand_in", name=f"workers-{workers}", workers=workers)
+    producer = StandInSinkProducer(config)
+    producer.orchestrator = ProducerOrchestrator(producer)
+    producer.start()
+
+    start = time.perf_counter()
+    for i in range(messages):
+        producer.enqueue_message(Message("benchmark", False, False, i, key=f"key-{i % keys}"))
+    while sum(len(sent) for sent in producer.sent.values()) < messages:
+        time.sleep(0.001)
+    elapsed = time.perf_counter() - start
+    producer.stop()
+
+    ordered = all(sent == sorted(sent) for sent in producer.sent.values())
+    return {"elapsed": elapsed, "throughput": messages / elapsed, "ordered": ordered}
+
+
+def main() -> None:
+    """
+    Parses the command line and prints the results for each number of workers.
+    """
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--messages", type=int, default=2000, help="number of messages (default: 2000)")
+    parser.add_argument("--latency", type=float, default=0.002, help="simulated send latency in seconds (default: 0.002)")
+    parser.add_argument("--keys", type=int, default=64, help="number of distinct message keys (default: 64)")
+    args = parser.parse_args()
+
+    StandInSinkProducer.latency = args.latency
+    print(f"{args.messages} messages, {args.keys} keys, {args.latency * 1000:.1f} ms simulated send latency")
+    baseline = None
+    for workers in (1, 2, 4, 8):
+        result = run(workers, args.messages, args.keys)
+        baseline = baseline or result["throughput"]
+        print(f"{workers} workers {result['elapsed']:8.2f} s {result['throughput']:10.0f} messages/s "
+              f"x{result['throughput'] / baseline:5.2f} {'in order' if result['ordered'] else 'OUT OF ORDER'}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,115 @@
+"""
+Benchmark of the message serializers of the producers.
+
+Every available serializer encodes the same messages, shaped like the query
+results sent by the agents: an envelope holding a list of rows with text,
+integer, ``Decimal``, ``datetime`` and null columns. The benchmark reports the
+encoded bytes and the CPU time per message, then the CPU time per message when
+each payload is fanned out to several topics, with and without the
+`SerializationCache`.
+
+Usage:
+    python -m benchmarks.serializers --messages 2000 --rows 20 --topics 3
+"""
+import argparse
+import time
+from datetime import datetime, timedelta
+from decimal import Decimal
+from typing import Any, Dict, List
+
+from apps_logging_app.producers.serializers import SERIALIZER_REGISTRY, SerializationCache, get_serializer
+
+
+def make_payloads(messages: int, rows: int) -> List[List[Dict[str, Any]]]:
+    """
+    Builds query-result-like payloads.
+
+    Args:
+        messages (int): Number of payloads.
+        rows (int): Number of rows per payload.
+
+    Returns:
+        List[List[Dict[str, Any]]]: The payloads.
+    """
+    start = datetime(2024, 1, 1, 8, 0, 0)
+    return [
+        [
+            {
+                "task_cd": f"TASK_{i % 50:04d}",
+                "run_id": i * rows + j,
+                "status": ("OK", "KO", "RUNNING")[j % 3],
+                "elapsed": Decimal(f"{(i + j) % 1000}.{j % 100:02d}"),
+                "started_at": start + timedelta(seconds=i * rows + j),
+                "error_msg": None if j % 3 else f"ORA-{j:05d}: error on task {i}",
+            }
+            for j in range(rows)
+        ]
+        for i in range(messages)
+    ]
+
+
+def run(name: str, payloads: List[List[Dict[str, Any]]], topics: int) -> Dict[str, float]:
+    """
+    Encodes the payloads with a serializer.
+
+    Args:
+        name (str): Name of the serializer.
+        payloads (List[List[Dict[str, Any]]]): The payloads.
+        topics (int): Number of topics each payload is sent to in the fan-out runs.
+
+    Returns:
+        Dict[str, float]: Average bytes per message, and CPU microseconds per message
+        for a single send, for `topics` sends without cache and with cache.
+    """
+    serializer = get_serializer(name)
+    envelopes = [{"is_error": False, "message": payload} for payload in payloads]
+
+    start = time.process_time()
+    encoded = [serializer.dumps(envelope) for envelope in envelopes]
+    single = time.process_time() - start
+    serializer.loads(encoded[0])
+
+    start = time.process_time()
+    for envelope in envelopes:
+        for _ in range(topics):
+            serializer.dumps(envelope)
+    fan_out = time.process_time() - start
+
+    cache = SerializationCache(max_entries=len(payloads))
+    start = time.process_time()
+    for envelope in envelopes:
+        for _ in range(topics):
+            cache.serialize(serializer, envelope, envelope["message"], False)
+    cached = time.process_time() - start
+
+    return {
+        "bytes": sum(len(data) for data in encoded) / len(encoded),
+        "single_us": single / len(payloads) * 1e6,
+        "fan_out_us": fan_out / len(payloads) * 1e6,
+        "cached_us": cached / len(payloads) * 1e6,
+    }
+
+
+def main() -> None:
+    """
+    Parses the command line and prints the results of every available serializer.
+    """
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--messages", type=int, default=2000, help="number of messages (default: 2000)")
+    parser.add_argument("--rows", type=int, default=20, help="rows per message (default: 20)")
+    parser.add_argument("--topics", type=int, default=3, help="topics per message in the fan-out runs (default: 3)")
+    args = parser.parse_args()
+
+    payloads = make_payloads(args.messages, args.rows)
+    print(f"{args.messages} messages of {args.rows} rows, fan-out to {args.topics} topics")
+    print(f"{'serializer':<10} {'bytes/msg':>10} {'CPU us/msg':>11} {f'x{args.topics} uncached':>13} {f'x{args.topics} cached':>11}")
+    for name, serializer_class in SERIALIZER_REGISTRY.items():
+        if not serializer_class.available():
+            print(f"{name:<10} not installed")
+            continue
+        result = run(name, payloads, args.topics)
+        print(f"{name:<10} {result['bytes']:10.0f} {result['single_us']:11.1f} {result['fan_out_us']:13.1f} {result['cached_us']:11.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,6 +1,34 @@
+from pydantic import field_validator
+
 from ..base import BaseDatabaseConfig
 
 
 class OracleDatabaseConfig(BaseDatabaseConfig):
-    # No field changes for now
-    pass
+    """
+    Configuration of an Oracle database.
+
+    Attributes:
+        stmtcachesize (int): Number of parsed statements cached per pooled connection.
+            Agents re-run the same few statements with different binds, so keeping
+            them cached avoids a re-parse on every execution. Defaults to 40.
+    """
+    stmtcachesize: int = 40
+
+    @field_validator('stmtcachesize')
+    def validate_stmtcachesize(cls, value):
+        """
+        Validates the `stmtcachesize` field of the OracleDatabaseConfig.
+
+        Args:
+            cls (Type[OracleDatabaseConfig]): The class being validated.
+            value (int): The statement cache size to validate.
+
+        Returns:
+            int: The validated `stmtcachesize` value.
+
+        Raises:
+            ValueError: If `stmtcachesize` is less than 0.
+        """
+        if value < 0:
+            raise ValueError("Statement cache size must be greater than or equal to 0")
+        return value
@@ -1,16 +1,20 @@
 
-from typing import Dict, Any, Optional, List
+from typing import Dict, Any, List
+from threading import Lock
 from ..registry import register_database
 from .config import OracleDatabaseConfig
 from ..base import BaseDatabase
-from ..model import QueryTask
+from ..routing import Endpoint
+from ..data import Query
+from ..metrics import stage_timer
+from .mixin import OracleMixin
 import oracledb
 
 @register_database(
     database_type="oracle",
     config_model=OracleDatabaseConfig,
 )
-class OracleDatabase(BaseDatabase):
+class OracleDatabase(OracleMixin, BaseDatabase):
     def __init__(self, config: OracleDatabaseConfig) -> None:
         """
         Initializes an OracleDatabase instance with the given configuration.
@@ -18,48 +22,26 @@ class OracleDatabase(BaseDatabase):
         Args:
             config (OracleDatabaseConfig): The configuration for the database.
 
-        """
-        super().__init__(config)
+        Attributes:
+            pools (Dict[str, oracledb.ConnectionPool]): One connection pool per endpoint
+                (``primary`` and ``replica``), created by `connect()`.
+            _pools_lock (Lock): Lock protecting the creation of the pools.
 
-    def _build_dsn(self) -> str:
         """
-        Builds a DSN string for connecting to the database.
-
-        The DSN string will contain the primary host and port, as well as the
-        replica host and port if specified.
+        super().__init__(config)
+        self.pools: Dict[str, oracledb.ConnectionPool] = {}
+        self._pools_lock = Lock()
 
-        Returns:
-            str: The DSN string for connecting to the database.
-        """
-        addresses = [
-            f"(ADDRESS=(PROTOCOL=TCP)(HOST={self.config.primary.host})(PORT={self.config.primary.port}))"
-        ]
-
-        if self.config.replica:
-            addresses.append(
-                f"(ADDRESS=(PROTOCOL=TCP)(HOST={self.config.replica.host})(PORT={self.config.replica.port}))"
-            )
-
-        address_list = "".join(addresses)
-
-        return f"""
-        (DESCRIPTION=
-            (ADDRESS_LIST=
-                (LOAD_BALANCE=OFF)
-                (FAILOVER=ON)
-                {address_list}
-            )
-            (CONNECT_DATA=
-                (SERVICE_NAME={self.config.primary.service_name})
-            )
-        )
-        """
+    def close(self) -> None:
+        with self._pools_lock:
+            pools, self.pools = self.pools, {}
+        for pool in pools.values():
+            pool.close()
 
-    def connect(self) -> None:
+    def _get_pool(self, endpoint: Endpoint) -> oracledb.ConnectionPool:
         """
-        Connects to the Oracle Database using the built DSN string and configuration.
+        Returns the connection pool of an endpoint, creating it if needed.
 
-        Connects to the Oracle Database using the built DSN string and configuration.
         The connection pool is created with the following parameters:
 
         - min: 1
@@ -67,35 +49,95 @@ class OracleDatabase(BaseDatabase):
         - increment: self.config.max_workers/2
         - timeout: 60
         - ping_interval: 60
+        - stmtcachesize: self.config.stmtcachesize
 
         If the connection fails, an exception is raised with the error message.
         """
-        self.dsn = self._build_dsn()
-        try:
-            self.pool = oracledb.create_pool(
-                user=self.config.username,
-                password=self.config.password,
-                dsn=self.dsn,
-                min=1,
-                max=self.config.max_workers + 1,
-                increment=self.config.max_workers/2,
-                timeout=60,
-                ping_interval=60
-            )
-        except Exception as e:
-            self.logger.error(f"Client DB {self.config.type}-{self.config.name}: Failed to connect: {e}")
-            raise
+        pool = self.pools.get(endpoint.name)
+        if pool is not None:
+            return pool
+        with self._pools_lock:
+            pool = self.pools.get(endpoint.name)
+            if pool is not None:
+                return pool
+            try:
+                pool = oracledb.create_pool(
+                    user=self.config.username,
+                    password=self.config.password,
+                    dsn=self._build_dsn(endpoint.connection),
+                    min=1,
+                    max=self.config.max_workers + 1,
+                    increment=self.config.max_workers/2,
+                    timeout=60,
+                    ping_interval=60,
+                    stmtcachesize=self.config.stmtcachesize
+                )
+            except Exception as e:
+                self.logger.error(f"Client DB {self.config.type}-{self.config.name}: Failed to connect to {endpoint.name}: {e}")
+                raise
+            self.pools[endpoint.name] = pool
+            return pool
+
+    def _query(self, task: Query) -> List[Dict[str, Any]]:
+        """
+        Executes the query and returns its rows as a `QueryResult`.
 
-    def close(self) -> None:
-        self.pool.close()
+        The content digest of the result is computed row by row while the rows
+        are converted, so agents can detect unchanged results without comparing
+        them element by element. The query runs on the endpoint selected by
+        the `router`. The pool acquisition, execute and fetch stages are timed
+        on `task.timings`.
+        """
+        with self.router.route() as endpoint:
+            with stage_timer(task, "pool_acquire"):
+                conn = self._get_pool(endpoint).acquire()
+            with conn:
+                with conn.cursor() as cur:
+                    return self._execute(cur, task)
 
-    def _query(self, task: QueryTask) -> List[Dict[str, Any]]:
-        try:
-            with self.pool.acquire() as conn:
+    def _query_batch(self, tasks: List[Query]) -> List[List[Dict[str, Any]]]:
+        """
+        Executes a batch group on a single pooled connection and cursor.
+
+        Oracle does not return result sets from ``executemany``, so a batch group
+        without ``in_list_template`` is executed statement by statement. Reusing
+        one connection and one cursor avoids a pool acquisition per query and
+        lets the driver reuse the parsed statement for every bind set.
+        """
+        results = []
+        with self.router.route() as endpoint:
+            with stage_timer(tasks[0], "pool_acquire"):
+                conn = self._get_pool(endpoint).acquire()
+            for task in tasks[1:]:
+                task.timings["pool_acquire"] = tasks[0].timings["pool_acquire"]
+            with conn:
                 with conn.cursor() as cur:
-                    cur.execute(task.query, task.params or {})
-                    columns = [col[0].lower() for col in cur.description]
-                    rows = cur.fetchall()
-                    return [dict(zip(columns, row)) for row in rows]
-        except Exception:
-            raise
+                    for task in tasks:
+                        results.append(self._execute(cur, task))
+        return results
+
+    def _execute(self, cur: oracledb.Cursor, task: Query) -> List[Dict[str, Any]]:
+        """
+        Executes a query on a cursor and fetches its result.
+
+        The cursor is tuned with the `arraysize` and `prefetchrows` of the query
+        before execution (see `OracleMixin._tune_cursor`), then the rows are
+        fetched and converted by `BaseDatabase._fetch`: a `QueryResult` of row
+        dictionaries, a `ColumnarResult` that keeps the row tuples returned by
+        the driver as is, or chunks handed to a `ResultStream` for a streamed
+        query (see `Query.streaming`), so that memory stays bounded by the
+        chunk size.
+
+        The deadline of the query is enforced with the ``call_timeout`` of the
+        connection, set before every execution since pooled connections are
+        shared, and `Query.cancel` aborts the running statement with
+        ``Connection.cancel()``.
+        """
+        conn = cur.connection
+        conn.call_timeout = task.call_timeout_ms()
+        task.interrupt = conn.cancel
+        self._tune_cursor(cur, task)
+        try:
+            return self._fetch(cur, task)
+        finally:
+            task.interrupt = None
@@ -0,0 +1,90 @@
+from typing import Any
+from ..model import ConnectionConfig
+from ..data import Query
+import oracledb
+
+
+class OracleMixin:
+    """
+    Connection and result helpers shared by the Oracle clients.
+
+    `OracleDatabase` and `AsyncOracleDatabase` differ in how they acquire
+    connections and run statements, but build their DSNs, create the pools of
+    their endpoints and tune their cursors the same way. The mixin must come
+    before the database base class, and the class using it must provide
+    `config`, `router` and `_get_pool`.
+    """
+
+    # Errors raised when a statement is interrupted by its call timeout or by `Query.cancel`
+    INTERRUPT_ERROR_CODES = ("ORA-01013", "ORA-03156", "DPY-4024")
+
+    def _build_dsn(self, connection: ConnectionConfig) -> str:
+        """
+        Builds a DSN string for connecting to one endpoint of the database.
+
+        Failover between the primary and the replica is no longer delegated to
+        the driver: each endpoint has its own pool and the `router` decides
+        where each query runs. An endpoint without service name uses the
+        service name of the primary.
+
+        Args:
+            connection (ConnectionConfig): The address of the endpoint.
+
+        Returns:
+            str: The DSN string for connecting to the endpoint.
+        """
+        service_name = connection.service_name or self.config.primary.service_name
+
+        return f"""
+        (DESCRIPTION=
+            (ADDRESS=(PROTOCOL=TCP)(HOST={connection.host})(PORT={connection.port}))
+            (CONNECT_DATA=
+                (SERVICE_NAME={service_name})
+            )
+        )
+        """
+
+    def connect(self) -> None:
+        """
+        Connects to the Oracle Database using the built DSN strings and configuration.
+
+        One connection pool is created per endpoint (see `_get_pool`). An
+        endpoint whose pool cannot be created is marked unhealthy, so queries
+        are routed to the other one, and its pool is created again on first
+        use once its cooldown has elapsed. An exception is raised only if no
+        pool can be created.
+        """
+        errors = []
+        for endpoint in self.router.endpoints:
+            try:
+                self._get_pool(endpoint)
+            except Exception as e:
+                self.router.mark_unhealthy(endpoint)
+                errors.append(e)
+        if len(errors) == len(self.router.endpoints):
+            raise errors[0]
+
+    def _is_endpoint_error(self, error: BaseException) -> bool:
+        """
+        Returns whether an error counts as a failure of the endpoint, see `BaseDatabase._is_endpoint_error`.
+
+        python-oracledb raises an ``OperationalError`` when a statement is
+        interrupted by its call timeout or cancelled, which says nothing about
+        the health of the endpoint.
+        """
+        if isinstance(error, oracledb.Error) and error.args:
+            if getattr(error.args[0], "full_code", None) in self.INTERRUPT_ERROR_CODES:
+                return False
+        return super()._is_endpoint_error(error)
+
+    def _tune_cursor(self, cur: Any, task: Query) -> None:
+        """
+        Sets the `arraysize` and `prefetchrows` of a query on a cursor, before execution.
+
+        ``prefetchrows`` rows come back with the execute round-trip and the
+        remaining rows are fetched ``arraysize`` at a time.
+        """
+        if task.arraysize:
+            cur.arraysize = task.arraysize
+        if task.prefetchrows is not None:
+            cur.prefetchrows = task.prefetchrows
@@ -0,0 +1,38 @@
+from pydantic import model_validator
+
+from ..oracle.config import OracleDatabaseConfig
+
+
+class AsyncOracleDatabaseConfig(OracleDatabaseConfig):
+    """
+    Configuration of an Oracle database accessed through the asyncio driver.
+
+    With the asyncio driver `max_workers` bounds the number of queries in
+    flight, not the number of threads, and can be set far above the number of
+    database connections: queries wait for a pooled connection on the event
+    loop without holding a thread.
+
+    Attributes:
+        pool_min (int): Minimum number of connections of the pool of each endpoint. Defaults to 1.
+        pool_max (int): Maximum number of connections of the pool of each endpoint. Defaults to 20.
+    """
+    max_workers: int = 1000
+    pool_min: int = 1
+    pool_max: int = 20
+
+    @model_validator(mode='after')
+    def validate_pool_size(self) -> "AsyncOracleDatabaseConfig":
+        """
+        Validates the pool size settings of the AsyncOracleDatabaseConfig.
+
+        Returns:
+            AsyncOracleDatabaseConfig: The validated instance.
+
+        Raises:
+            ValueError: If `pool_min` is less than 0, or `pool_max` is less than 1 or than `pool_min`.
+        """
+        if self.pool_min < 0:
+            raise ValueError("Pool min must be greater than or equal to 0")
+        if self.pool_max < 1 or self.pool_max < self.pool_min:
+            raise ValueError("Pool max must be greater than 0 and greater than or equal to pool min")
+        return self
@@ -0,0 +1,122 @@
+from typing import Dict, Any, List
+from threading import Lock
+from ..registry import register_database
+from .config import AsyncOracleDatabaseConfig
+from ..async_base import AsyncBaseDatabase
+from ..data import Query, ResultBuilder
+from ..metrics import stage_timer
+from ..oracle.mixin import OracleMixin
+from ..routing import Endpoint
+import oracledb
+
+@register_database(
+    database_type="oracle_async",
+    config_model=AsyncOracleDatabaseConfig,
+)
+class AsyncOracleDatabase(OracleMixin, AsyncBaseDatabase):
+    """
+    Oracle client running queries over the asyncio API of python-oracledb.
+
+    Queries are coroutines on the shared event loop and wait for a connection
+    of an `AsyncConnectionPool` (``pool_min`` to ``pool_max`` connections per
+    endpoint) without holding a thread, so thousands of queries can be in
+    flight with a single event loop thread. Queries are routed over the
+    primary and replica pools as in `OracleDatabase`, with the DSNs, pool
+    creation and cursor settings of `OracleMixin`.
+    """
+
+    def __init__(self, config: AsyncOracleDatabaseConfig) -> None:
+        """
+        Initializes an AsyncOracleDatabase instance with the given configuration.
+
+        Args:
+            config (AsyncOracleDatabaseConfig): The configuration for the database.
+
+        Attributes:
+            pools (Dict[str, oracledb.AsyncConnectionPool]): One connection pool per endpoint, created by `connect()`.
+            _pools_lock (Lock): Lock protecting the creation of the pools.
+        """
+        super().__init__(config)
+        self.pools = {}
+        self._pools_lock = Lock()
+
+    def is_connected(self) -> bool:
+        """
+        Returns whether at least one connection pool has been created.
+        """
+        return bool(self.pools)
+
+    def _get_pool(self, endpoint: Endpoint) -> oracledb.AsyncConnectionPool:
+        """
+        Returns the asyncio connection pool of an endpoint, creating it if needed.
+
+        The pool is created with the following parameters:
+
+        - min: self.config.pool_min
+        - max: self.config.pool_max
+        - increment: 1
+        - timeout: 60
+        - ping_interval: 60
+        - stmtcachesize: self.config.stmtcachesize
+
+        If the pool cannot be created, an exception is raised with the error message.
+        """
+        pool = self.pools.get(endpoint.name)
+        if pool is not None:
+            return pool
+        with self._pools_lock:
+            pool = self.pools.get(endpoint.name)
+            if pool is not None:
+                return pool
+            try:
+                pool = oracledb.create_pool_async(
+                    user=self.config.username,
+                    password=self.config.password,
+                    dsn=self._build_dsn(endpoint.connection),
+                    min=self.config.pool_min,
+                    max=self.config.pool_max,
+                    increment=1,
+                    timeout=60,
+                    ping_interval=60,
+                    stmtcachesize=self.config.stmtcachesize
+                )
+            except Exception as e:
+                self.logger.error(f"Client DB {self.config.type}-{self.config.name}: Failed to connect to {endpoint.name}: {e}")
+                raise
+            self.pools[endpoint.name] = pool
+            return pool
+
+    def close(self) -> None:
+        """
+        Closes the connection pools, waiting for them on the event loop.
+        """
+        with self._pools_lock:
+            pools, self.pools = self.pools, {}
+        for pool in pools.values():
+            self._run_sync(pool.close())
+
+    async def _query_async(self, task: Query) -> List[Dict[str, Any]]:
+        """
+        Executes the query on a pooled connection and returns its result.
+
+        Fetch settings, call timeouts, result formats, streaming, incremental
+        digests and stage timings behave as in `OracleDatabase._query`: the
+        cursor is tuned by `OracleMixin._tune_cursor` and the rows are
+        converted by a `ResultBuilder`, only the driver calls are awaited.
+        """
+        with self.router.route() as endpoint:
+            with stage_timer(task, "pool_acquire"):
+                conn = await self._get_pool(endpoint).acquire()
+            async with conn:
+                conn.call_timeout = task.call_timeout_ms()
+                with conn.cursor() as cur:
+                    self._tune_cursor(cur, task)
+                    with stage_timer(task, "execute"):
+                        await cur.execute(task.query, task.params or {})
+                    columns = self._columns(task.query, cur.description)
+
+                    with stage_timer(task, "fetch"):
+                        result = ResultBuilder(task, columns)
+                        while rows := await cur.fetchmany(result.fetch_rows):
+                            result.feed(rows)
+                        return result.close()
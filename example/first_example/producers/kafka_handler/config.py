@@ -1,20 +1,23 @@
 from ..base import BaseProducerConfig
 from pydantic import field_validator
-from typing import List
+from typing import List, Literal, Optional
 
 class KafkaHandlerConfig(BaseProducerConfig):
     brokers: List[str]
     security_protocol: str = "SSL"
-    ssl_cafile: str
-    ssl_certfile: str
-    ssl_keyfile: str
-    ssl_password: str
+    ssl_cafile: Optional[str] = None
+    ssl_certfile: Optional[str] = None
+    ssl_keyfile: Optional[str] = None
+    ssl_password: Optional[str] = None
     topic: str
     acks: str = "all"
     retries: int = 3
     batch_size: int = 16384
     linger_ms: int = 5
     buffer_memory: int = 33554432
+    compression_type: Optional[Literal["gzip", "snappy", "lz4", "zstd"]] = None
+    max_in_flight: int = 5
+    max_pending_messages: int = 10000
 
     # Field validator brokers
     @field_validator('brokers')
@@ -42,9 +45,16 @@ class KafkaHandlerConfig(BaseProducerConfig):
             raise ValueError(f"Acks must be one of {valid_acks}")
         return v
     
+    # Field validator max_in_flight, max_pending_messages
+    @field_validator('max_in_flight', 'max_pending_messages')
+    def validate_strictly_positive_int(cls, v, info):
+        if v <= 0:
+            raise ValueError(f"{info.field_name} must be greater than 0")
+        return v
+
     # Field validator retries, batch_size, linger_ms, buffer_memory
     @field_validator('retries', 'batch_size', 'linger_ms', 'buffer_memory')
-    def validate_positive_int(cls, v, field):
+    def validate_positive_int(cls, v, info):
         if v < 0:
-            raise ValueError(f"{field.name} must be a non-negative integer")
+            raise ValueError(f"{info.field_name} must be a non-negative integer")
         return v
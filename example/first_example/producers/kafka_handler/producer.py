@@ -1,39 +1,195 @@
 from ..base import BaseProducer
 from ..registry import register_producer
+from ..data import Message
+from ..serializers import SERIALIZATION_CACHE
 from .config import KafkaHandlerConfig
-from typing import Dict, Any
+from typing import Dict, Any, List, Tuple
+from threading import Lock
 from kafka import KafkaProducer
 from kafka.admin import KafkaAdminClient, NewTopic
-import json
-from kafka.errors import NodeNotReadyError, TopicAlreadyExistsError
+from kafka import codec
+from kafka.errors import KafkaError, KafkaTimeoutError, NodeNotReadyError, TopicAlreadyExistsError
 
 @register_producer(
     producer_type="kafka_handler",
     config_model=KafkaHandlerConfig,
 )
 class KafkaHandlerProducer(BaseProducer):
+    """
+    Producer sending messages to a Kafka topic.
+
+    Messages are sent asynchronously: `_send_batch` hands each message of a
+    worker batch to the ``KafkaProducer``, which batches records according to
+    ``batch_size`` and ``linger_ms``, and returns at once. The outcome of each send is reported by
+    a delivery callback: an acknowledged delivery is reported to
+    `BaseProducer._on_send_succeeded`, and a failed one goes through the retry
+    logic of `BaseProducer._on_send_failed`. Retriable Kafka errors (broker or
+    leader unavailable, request timeouts) and client timeouts are connection
+    errors (see `_is_connection_error`); the other errors, such as a record
+    too large, are retried in memory and dropped after ``max_retries``.
+
+    The producer is only flushed on `close()` and when `max_pending_messages`
+    messages are waiting for their delivery report, which bounds the number of
+    messages held in memory by the client.
+
+    Every setting of `KafkaHandlerConfig` is passed to the ``KafkaProducer``
+    (see `connect()`).
+
+    Message values are encoded by the serializer of the configuration (see
+    `BaseProducer.serializer`) before being handed to the client, through the
+    `SERIALIZATION_CACHE`, so that a payload sent to several topics or retried
+    is encoded once.
+
+    The `Message.key` of a message, rendered from the ``key_template`` of its
+    data connection, is sent as the record key, encoded in UTF-8: Kafka then
+    writes all the messages of a key (e.g. of a task) to the same partition,
+    so that consumers can scale with the partitions of the topic while the
+    messages of each key stay in order. Messages without key are spread over
+    the partitions by the client.
+
+    Attributes:
+        producer (KafkaProducer): The Kafka client, created by `connect()`.
+        _deliveries_lock (Lock): Lock protecting the delivery counters.
+        pending_deliveries (int): Messages sent and not yet acknowledged or failed.
+        delivered_messages (int): Messages acknowledged by the brokers.
+        failed_deliveries (int): Deliveries reported as failed by the Kafka client.
+        flushes (int): Flushes forced by `max_pending_messages`.
+    """
+    ASYNCHRONOUS_DELIVERY = True
+
     def __init__(self, config: KafkaHandlerConfig):
         super().__init__(config)
+        self.producer = None
+        self._deliveries_lock = Lock()
+        self.pending_deliveries = 0
+        self.delivered_messages = 0
+        self.failed_deliveries = 0
+        self.flushes = 0
+
+    def is_connected(self) -> bool:
+        return self.producer is not None and self.producer.bootstrap_connected()
+
+    COMPRESSION_CODECS = {
+        "gzip": codec.has_gzip,
+        "snappy": codec.has_snappy,
+        "lz4": codec.has_lz4,
+        "zstd": codec.has_zstd,
+    }
 
     def connect(self):
+        """
+        Creates the Kafka client with the batching, compression, acknowledgment,
+        retry and security settings of the configuration.
+
+        A `compression_type` whose codec library is not installed is logged and
+        messages are sent uncompressed. `buffer_memory` is only passed to the
+        client versions that still accept it (kafka-python removed it in 2.1).
+        """
+        compression_type = self.config.compression_type
+        if compression_type and not self.COMPRESSION_CODECS[compression_type]():
+            self.logger.warning(f"Producer {self.config.type}-{self.config.name}: Compression codec {compression_type} not available, sending uncompressed messages")
+            compression_type = None
+        options = {}
+        if "buffer_memory" in KafkaProducer.DEFAULT_CONFIG:
+            options["buffer_memory"] = self.config.buffer_memory
         try:
             self.producer = KafkaProducer(
                 bootstrap_servers=self.config.brokers,
-                value_serializer=lambda v: json.dumps(v).encode("utf-8")
+                security_protocol=self.config.security_protocol,
+                ssl_cafile=self.config.ssl_cafile,
+                ssl_certfile=self.config.ssl_certfile,
+                ssl_keyfile=self.config.ssl_keyfile,
+                ssl_password=self.config.ssl_password,
+                acks=self.config.acks if self.config.acks == "all" else int(self.config.acks),
+                retries=self.config.retries,
+                batch_size=self.config.batch_size,
+                linger_ms=self.config.linger_ms,
+                compression_type=compression_type,
+                max_in_flight_requests_per_connection=self.config.max_in_flight,
+                **options
             )
         except Exception as e:
             self.logger.critical(f"Impossibile creare KafkaProducer: {e}")
             raise
 
     def close(self) -> None:
+        if self.producer is None:
+            return
         self.producer.flush()
         self.producer.close()
 
-    def _send(self, is_error: bool, message: Any) -> None:
-        try:
-            self.producer.send(self.config.topic, value={"is_error": is_error, "message": message})
-            self.logger.info(f"Producer {self.config.type}-{self.config.name}: Message {message} sent to Kafka")
+    def get_metrics(self) -> Dict[str, Any]:
+        """
+        Returns the queue and retry counters of the producer and its delivery counters.
+        """
+        with self._deliveries_lock:
+            return {
+                **super().get_metrics(),
+                "pending_deliveries": self.pending_deliveries,
+                "delivered_messages": self.delivered_messages,
+                "failed_deliveries": self.failed_deliveries,
+                "flushes": self.flushes,
+            }
+
+    def _send_batch(self, messages: List[Message]) -> List[Tuple[Message, Exception]]:
+        """
+        Hands a batch of messages to the Kafka client, then flushes it if
+        `max_pending_messages` deliveries are pending.
+        """
+        failed = super()._send_batch(messages)
+        with self._deliveries_lock:
+            pending = self.pending_deliveries
+        if pending >= self.config.max_pending_messages:
             self.producer.flush()
-        except Exception:
-            raise
-        
\ No newline at end of file
+            with self._deliveries_lock:
+                self.flushes += 1
+        return failed
+
+    def _send(self, message: Message) -> None:
+        """
+        Hands a message to the Kafka client without waiting for its delivery, keyed by `Message.key`.
+
+        Raises:
+            Exception: If the client refuses the message, e.g. when its buffer stays
+                full for ``max_block_ms``; the worker then retries it.
+        """
+        value = SERIALIZATION_CACHE.serialize(
+            self.serializer,
+            {"is_error": message.is_error, "message": message.message},
+            message.message,
+            message.is_error
+        )
+        key = message.key.encode("utf-8") if message.key is not None else None
+        future = self.producer.send(self.config.topic, value=value, key=key)
+        with self._deliveries_lock:
+            self.pending_deliveries += 1
+        future.add_callback(self._on_delivered, message)
+        future.add_errback(self._on_delivery_failed, message)
+
+    def _on_delivered(self, message: Message, metadata: Any) -> None:
+        """
+        Delivery callback of an acknowledged message.
+        """
+        with self._deliveries_lock:
+            self.pending_deliveries -= 1
+            self.delivered_messages += 1
+        self.logger.debug(f"Producer {self.config.type}-{self.config.name}: Message {message.message} delivered to Kafka")
+        self._on_send_succeeded(message)
+
+    def _on_delivery_failed(self, message: Message, error: Exception) -> None:
+        """
+        Delivery callback of a failed message, which is retried by `_on_send_failed`.
+        """
+        with self._deliveries_lock:
+            self.pending_deliveries -= 1
+            self.failed_deliveries += 1
+        self._on_send_failed(message, error)
+
+    def _is_connection_error(self, error: Exception) -> bool:
+        """
+        Returns whether an error means that the brokers are unreachable: a retriable
+        Kafka error, or a client timeout (e.g. a buffer full for ``max_block_ms``).
+        """
+        if isinstance(error, KafkaError):
+            return error.retriable or isinstance(error, KafkaTimeoutError)
+        return super()._is_connection_error(error)
@@ -0,0 +1,135 @@
+import time
+
+from apps_logging_app.producers import base
+from apps_logging_app.producers.base import BaseProducer
+from apps_logging_app.producers.data import Message
+from apps_logging_app.producers.model import BaseProducerConfig
+from apps_logging_app.producers.orchestrator import ProducerOrchestrator
+from apps_logging_app.producers.spool import ReplayBatch
+
+
+class StubProducer(BaseProducer):
+    def __init__(self, config):
+        super().__init__(config)
+        self.up = True
+        self.failing = False
+        self.sends = 0
+
+    def is_connected(self):
+        return self.up
+
+    def connect(self):
+        if not self.up:
+            raise ConnectionError("down")
+
+    def close(self):
+        pass
+
+    def _send(self, message):
+        self.sends += 1
+        if self.failing:
+            raise ConnectionError("not leader")
+
+
+def make_producer(tmp_path, max_retries=2):
+    producer = StubProducer(BaseProducerConfig(type="stub", name="p", max_retries=max_retries,
+                                               spool={"path": tmp_path, "fsync_policy": "never"}))
+    producer.orchestrator = ProducerOrchestrator(producer)
+    producer.orchestrator.ensure_connected()
+    return producer
+
+
+def spooled(producer):
+    messages, _ = producer._spool.read(100)
+    return [(message.message, message.retries) for message in messages]
+
+
+def test_refused_message_dropped_after_max_retries_without_spilling(tmp_path):
+    producer = make_producer(tmp_path)
+    message = Message("topic", False, False, "poison")
+    message.retries = 2
+
+    assert producer._on_send_failed(message, ValueError("refused")) is False
+
+    assert producer.orchestrator.connected
+    assert not producer._spool.pending()
+    assert producer.get_metrics()["dropped_messages"] == 1
+    producer._spool.close()
+
+
+def test_connection_error_spills_with_retry_count_and_queued_messages_in_order(tmp_path):
+    producer = make_producer(tmp_path)
+    for i in range(3):
+        producer.enqueue_message(Message("topic", False, False, i))
+    producer.up = False
+    in_flight = Message("topic", False, False, "in flight")
+
+    assert producer._on_send_failed(in_flight, ConnectionError("down")) is True
+
+    assert not producer.orchestrator.connected
+    assert spooled(producer) == [("in flight", 1), (0, 0), (1, 0), (2, 0)]
+    producer._spool.close()
+
+
+def test_connection_error_at_max_retries_drops_message(tmp_path):
+    producer = make_producer(tmp_path)
+    message = Message("topic", False, False, "last")
+    message.retries = 2
+
+    assert producer._on_send_failed(message, ConnectionError("down")) is False
+
+    assert not producer._spool.pending()
+    producer._spool.close()
+
+
+def test_replayed_message_given_back_to_spool_on_connection_error(tmp_path):
+    producer = make_producer(tmp_path)
+    producer.up = False
+    producer.orchestrator.mark_disconnected()
+    producer.enqueue_message(Message("topic", False, False, "spooled"))
+    (message,), _ = producer._spool.read(1)
+    batch = message.replay = ReplayBatch(1)
+
+    assert producer._on_send_failed(message, ConnectionError("down")) is True
+
+    assert batch.wait(0) and batch.aborted
+    assert spooled(producer) == [("spooled", 0)]
+    producer._spool.close()
+
+
+def test_replayed_message_retried_in_memory_while_still_connected(tmp_path):
+    producer = make_producer(tmp_path)
+    message = Message("topic", False, False, "replayed")
+    batch = message.replay = ReplayBatch(1)
+
+    assert producer._on_send_failed(message, ConnectionError("not leader")) is True
+
+    assert producer.orchestrator.connected
+    assert message.retries == 1 and not batch.wait(0)
+    assert producer.get_metrics()["delayed_retries"] == 1
+
+    message.retries = 2
+    assert producer._on_send_failed(message, ConnectionError("not leader")) is False
+
+    assert batch.wait(0) and not batch.aborted
+    assert producer.get_metrics()["dropped_messages"] == 1
+    producer._spool.close()
+
+
+def test_replay_failing_while_connected_is_bounded_by_max_retries(tmp_path, monkeypatch):
+    monkeypatch.setattr(base.random, "uniform", lambda a, b: 0)
+    spool = make_producer(tmp_path)._spool
+    spool.append([Message("topic", False, False, "replayed")])
+    spool.close()
+    producer = make_producer(tmp_path, max_retries=1)
+    producer.failing = True
+
+    producer.start()
+    deadline = time.monotonic() + 10
+    while producer._spool.pending() and time.monotonic() < deadline:
+        time.sleep(0.05)
+    producer.stop(timeout=1)
+
+    assert producer.sends == 2
+    assert producer.get_metrics()["dropped_messages"] == 1
+    assert producer._spool.get_metrics()["replayed_messages"] == 1
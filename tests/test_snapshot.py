@@ -0,0 +1,84 @@
+from datetime import date, datetime
+from decimal import Decimal
+
+from apps_logging_app.agents.data import WorkingDataConnection
+from apps_logging_app.agents.incremental import merge_incremental_result
+from apps_logging_app.agents.model import QueryIncrementalConfig
+from apps_logging_app.agents.snapshot import WorkingStateSnapshot
+
+
+def make_entry():
+    entry = WorkingDataConnection("conn", "kafka_handler", "kafka-producer", topic="topic")
+    entry.list_data_dict_query_result = [
+        {"task_cd": "A1", "delivered": Decimal(10), "day": date(2024, 1, 31), "at": datetime(2024, 1, 31, 8, 30)},
+    ]
+    entry.watermark = Decimal(42)
+    return entry
+
+
+def test_restored_results_keep_their_types(tmp_path):
+    snapshot = WorkingStateSnapshot(tmp_path / "agents.db", "agent")
+    snapshot.save([make_entry()], [])
+    snapshot.close()
+
+    (restored,), _ = WorkingStateSnapshot(tmp_path / "agents.db", "agent").load()
+
+    assert restored.list_data_dict_query_result == make_entry().list_data_dict_query_result
+    assert restored.watermark == Decimal(42)
+
+
+def test_sum_merge_after_restore(tmp_path):
+    snapshot = WorkingStateSnapshot(tmp_path / "agents.db", "agent")
+    snapshot.save([make_entry()], [])
+    (restored,), _ = WorkingStateSnapshot(tmp_path / "agents.db", "agent").load()
+
+    merged, _ = merge_incremental_result(restored.list_data_dict_query_result,
+                                         [{"task_cd": "A1", "delivered": 2}],
+                                         QueryIncrementalConfig(key_columns=["task_cd"]))
+
+    assert merged[0]["delivered"] == Decimal(12)
+
+
+def test_tagged_looking_rows_are_left_alone(tmp_path):
+    entry = make_entry()
+    entry.list_data_dict_query_result = [{"__type__": "unknown", "value": "x"}]
+    snapshot = WorkingStateSnapshot(tmp_path / "agents.db", "agent")
+    snapshot.save([entry], [])
+
+    (restored,), _ = WorkingStateSnapshot(tmp_path / "agents.db", "agent").load()
+
+    assert restored.list_data_dict_query_result == [{"__type__": "unknown", "value": "x"}]
+
+
+def test_save_writes_only_changed_entries(tmp_path, monkeypatch):
+    entries = [make_entry(), make_entry()]
+    snapshot = WorkingStateSnapshot(tmp_path / "agents.db", "agent")
+    snapshot.save(entries, [])
+    encoded = []
+    monkeypatch.setattr(WorkingDataConnection, "to_dict",
+                        lambda self, to_dict=WorkingDataConnection.to_dict: encoded.append(self.id) or to_dict(self))
+
+    snapshot.save(entries, [])
+    assert encoded == []
+
+    entries[1].list_data_dict_query_result = [{"task_cd": "A1", "delivered": Decimal(12)}]
+    entries[1].list_data_dict_query_result_digest = "changed"
+    snapshot.save(entries, [])
+    assert encoded == [entries[1].id]
+
+    restored, _ = WorkingStateSnapshot(tmp_path / "agents.db", "agent").load()
+    results = {entry.id: entry.list_data_dict_query_result for entry in restored}
+    assert results[entries[1].id] == [{"task_cd": "A1", "delivered": Decimal(12)}]
+
+
+def test_restored_entries_are_not_written_again(tmp_path, monkeypatch):
+    WorkingStateSnapshot(tmp_path / "agents.db", "agent").save([make_entry()], [])
+    snapshot = WorkingStateSnapshot(tmp_path / "agents.db", "agent")
+    entries, _ = snapshot.load()
+    encoded = []
+    monkeypatch.setattr(WorkingDataConnection, "to_dict",
+                        lambda self, to_dict=WorkingDataConnection.to_dict: encoded.append(self.id) or to_dict(self))
+
+    snapshot.save(entries, [])
+
+    assert encoded == []
@@ -0,0 +1,127 @@
+from apps_logging_app.producers.data import Message
+from apps_logging_app.producers.spool import RECORD_HEADER, MessageSpool, ReplayBatch
+
+
+def make_message(value, retries=0):
+    message = Message("topic", False, False, {"i": value}, key=str(value % 3), source="agent/conn")
+    message.retries = retries
+    return message
+
+
+def open_spool(path, segment_bytes=1024 * 1024):
+    return MessageSpool(path, segment_bytes=segment_bytes, max_bytes=1024 * 1024 * 1024, fsync_policy="never")
+
+
+def test_replay_order_across_segments(tmp_path):
+    spool = open_spool(tmp_path, segment_bytes=200)
+    assert spool.append([make_message(i) for i in range(20)]) == 20
+    assert len(list(tmp_path.glob("*.seg"))) > 1
+
+    replayed = []
+    while True:
+        messages, position = spool.read(3)
+        if not messages:
+            break
+        replayed.extend(message.message["i"] for message in messages)
+        spool.commit(position, len(messages))
+
+    assert replayed == list(range(20))
+    assert not spool.pending()
+    assert spool.get_metrics()["replayed_messages"] == 20
+    assert len(list(tmp_path.glob("*.seg"))) == 1
+    spool.close()
+
+
+def test_read_without_commit_is_read_again(tmp_path):
+    spool = open_spool(tmp_path)
+    spool.append([make_message(i) for i in range(5)])
+
+    first, _ = spool.read(3)
+    again, _ = spool.read(3)
+
+    assert [message.message for message in again] == [message.message for message in first]
+    spool.close()
+
+
+def test_record_keeps_message_fields_and_retries(tmp_path):
+    spool = open_spool(tmp_path)
+    spool.append([make_message(4, retries=3)])
+
+    (message,), _ = spool.read(1)
+
+    assert (message.topic, message.message, message.key, message.source, message.retries) == \
+        ("topic", {"i": 4}, "1", "agent/conn", 3)
+    spool.close()
+
+
+def test_cursor_recovered_after_reopen(tmp_path):
+    spool = open_spool(tmp_path, segment_bytes=200)
+    spool.append([make_message(i) for i in range(10)])
+    messages, position = spool.read(4)
+    spool.commit(position, len(messages))
+    spool.read(3)
+    spool.close()
+
+    spool = open_spool(tmp_path, segment_bytes=200)
+    messages, _ = spool.read(100)
+
+    assert spool.pending()
+    assert [message.message["i"] for message in messages] == list(range(4, 10))
+    spool.close()
+
+
+def test_torn_tail_truncated_on_open(tmp_path):
+    spool = open_spool(tmp_path)
+    spool.append([make_message(i) for i in range(3)])
+    spool.close()
+    segment = max(tmp_path.glob("*.seg"))
+    size = segment.stat().st_size
+    with open(segment, "ab") as file:
+        file.write(RECORD_HEADER.pack(100, 0) + b'{"topic"')
+
+    spool = open_spool(tmp_path)
+
+    assert segment.stat().st_size == size
+    messages, _ = spool.read(100)
+    assert [message.message["i"] for message in messages] == [0, 1, 2]
+    spool.append([make_message(3)])
+    messages, _ = spool.read(100)
+    assert [message.message["i"] for message in messages] == [0, 1, 2, 3]
+    assert spool.get_metrics()["corrupted_segments"] == 0
+    spool.close()
+
+
+def test_corrupted_record_skips_rest_of_segment(tmp_path):
+    spool = open_spool(tmp_path, segment_bytes=200)
+    spool.append([make_message(i) for i in range(6)])
+    spool.close()
+    first = min(tmp_path.glob("*.seg"))
+    data = bytearray(first.read_bytes())
+    data[RECORD_HEADER.size] ^= 0xFF
+    first.write_bytes(bytes(data))
+
+    spool = open_spool(tmp_path, segment_bytes=200)
+    messages, _ = spool.read(100)
+
+    assert messages and messages[0].message["i"] > 0
+    assert spool.get_metrics()["corrupted_segments"] == 1
+    spool.close()
+
+
+def test_append_stops_at_max_bytes(tmp_path):
+    spool = MessageSpool(tmp_path, segment_bytes=1024, max_bytes=300, fsync_policy="never")
+
+    appended = spool.append([make_message(i) for i in range(10)])
+
+    assert 0 < appended < 10
+    assert spool.get_metrics()["rejected_messages"] == 10 - appended
+    spool.close()
+
+
+def test_replay_batch_settled_and_aborted():
+    batch = ReplayBatch(2)
+    batch.settle()
+    assert not batch.wait(0)
+    batch.settle(aborted=True)
+    assert batch.wait(0)
+    assert batch.aborted